@@ -72,11 +72,18 @@ module i2c_master (
     output wire        bus_control,
     output wire        bus_active,
     output wire        missed_ack,
+    output wire        hs_active,
+    output wire        hs_pullup,
 
     /*
      * Configuration
      */
     input  wire [15:0] prescale,
+    input  wire [15:0] prescale_high,
+    input  wire        hs_mode,
+    input  wire [2:0]  hs_master_code,
+    input  wire [15:0] hs_prescale,
+    input  wire [15:0] hs_prescale_high,
     input  wire        stop_on_idle
 );
 
@@ -134,11 +141,39 @@ bus_active
 missed_ack
     strobed when a slave ack is missed
 
+hs_active
+    module is in high-speed mode (after master code, until stop)
+
+hs_pullup
+    enable for an external SCL current-source pull-up, high while SCL
+    is released for a rising edge in high-speed mode
+
 Parameters:
 
 prescale
     set prescale to 1/4 of the minimum clock period in units
     of input clk cycles (prescale = Fclk / (FI2Cclk * 4))
+    SCL low time is 2 * prescale, data setup/hold and start/stop
+    timing are prescale
+
+prescale_high
+    SCL high time in units of input clk cycles, 0 for 2 * prescale
+    set for an asymmetric SCL clock, for example in fast-mode plus
+    (tLOW = 0.5 us, tHIGH = 0.26 us minimum)
+
+hs_mode
+    enter high-speed mode on start from an idle bus: send master code
+    00001xxx with prescale timing, then a repeated start and the transfer
+    with hs_prescale timing, return to normal timing after stop
+
+hs_master_code
+    master code bits (xxx)
+
+hs_prescale
+    prescale for high-speed mode
+
+hs_prescale_high
+    SCL high time for high-speed mode, 0 for 2 * hs_prescale
 
 stop_on_idle
     automatically issue stop when command input is not valid
@@ -194,7 +229,9 @@ localparam [4:0]
     STATE_WRITE_2 = 4'd8,
     STATE_WRITE_3 = 4'd9,
     STATE_READ = 4'd10,
-    STATE_STOP = 4'd11;
+    STATE_STOP = 4'd11,
+    STATE_HS_CODE_1 = 4'd12,
+    STATE_HS_CODE_2 = 4'd13;
 
 reg [4:0] state_reg = STATE_IDLE, state_next;
 
@@ -223,6 +260,7 @@ reg phy_stop_bit;
 reg phy_write_bit;
 reg phy_read_bit;
 reg phy_release_bus;
+reg phy_hs_enter;
 
 reg phy_tx_data;
 
@@ -263,6 +301,14 @@ reg busy_reg = 1'b0;
 reg bus_active_reg = 1'b0;
 reg bus_control_reg = 1'b0, bus_control_next;
 reg missed_ack_reg = 1'b0, missed_ack_next;
+reg hs_active_reg = 1'b0, hs_active_next;
+
+// bit timing for current mode
+wire [15:0] prescale_int = hs_active_reg ? hs_prescale : prescale;
+wire [15:0] prescale_high_int = hs_active_reg ? hs_prescale_high : prescale_high;
+wire [16:0] scl_high_int = prescale_high_int != 0 ? prescale_high_int : prescale_int << 1;
+
+wire [7:0] hs_code = {5'b00001, hs_master_code};
 
 assign s_axis_cmd_ready = s_axis_cmd_ready_reg;
 
@@ -281,6 +327,8 @@ assign busy = busy_reg;
 assign bus_active = bus_active_reg;
 assign bus_control = bus_control_reg;
 assign missed_ack = missed_ack_reg;
+assign hs_active = hs_active_reg;
+assign hs_pullup = hs_active_reg & scl_o_reg & delay_scl_reg;
 
 wire scl_posedge = scl_i_reg & ~last_scl_i_reg;
 wire scl_negedge = ~scl_i_reg & last_scl_i_reg;
@@ -299,6 +347,7 @@ always @* begin
     phy_read_bit = 1'b0;
     phy_tx_data = 1'b0;
     phy_release_bus = 1'b0;
+    phy_hs_enter = 1'b0;
 
     addr_next = addr_reg;
     data_next = data_reg;
@@ -348,7 +397,12 @@ always @* begin
                         end else begin
                             phy_start_bit = 1'b1;
                             bit_count_next = 4'd8;
-                            state_next = STATE_ADDRESS_1;
+                            if (hs_mode) begin
+                                // send master code first
+                                state_next = STATE_HS_CODE_1;
+                            end else begin
+                                state_next = STATE_ADDRESS_1;
+                            end
                         end
                     end else begin
                         // invalid or unspecified - ignore
@@ -472,7 +526,12 @@ always @* begin
                     // bus is idle, take control
                     phy_start_bit = 1'b1;
                     bit_count_next = 4'd8;
-                    state_next = STATE_ADDRESS_1;
+                    if (hs_mode) begin
+                        // send master code first
+                        state_next = STATE_HS_CODE_1;
+                    end else begin
+                        state_next = STATE_ADDRESS_1;
+                    end
                 end
             end
             STATE_START: begin
@@ -592,6 +651,28 @@ always @* begin
                 phy_stop_bit = 1'b1;
                 state_next = STATE_IDLE;
             end
+            STATE_HS_CODE_1: begin
+                // send high-speed mode master code
+                bit_count_next = bit_count_reg - 1;
+                if (bit_count_reg > 0) begin
+                    // write master code bit
+                    phy_write_bit = 1'b1;
+                    phy_tx_data = hs_code[bit_count_reg-1];
+                    state_next = STATE_HS_CODE_1;
+                end else begin
+                    // read ack bit
+                    phy_read_bit = 1'b1;
+                    state_next = STATE_HS_CODE_2;
+                end
+            end
+            STATE_HS_CODE_2: begin
+                // master code is not acknowledged
+                // switch to high-speed timing, repeated start
+                phy_hs_enter = 1'b1;
+                phy_start_bit = 1'b1;
+                bit_count_next = 4'd8;
+                state_next = STATE_ADDRESS_1;
+            end
         endcase
     end
 end
@@ -609,6 +690,7 @@ always @* begin
     sda_o_next = sda_o_reg;
 
     bus_control_next = bus_control_reg;
+    hs_active_next = hs_active_reg | phy_hs_enter;
 
     if (phy_release_bus) begin
         // release bus and return to idle state
@@ -617,6 +699,7 @@ always @* begin
         delay_scl_next = 1'b0;
         delay_sda_next = 1'b0;
         delay_next = 1'b0;
+        hs_active_next = 1'b0;
         phy_state_next = PHY_STATE_IDLE;
     end else if (delay_scl_reg) begin
         // wait for SCL to match command
@@ -638,7 +721,7 @@ always @* begin
                 scl_o_next = 1'b1;
                 if (phy_start_bit) begin
                     sda_o_next = 1'b0;
-                    delay_next = prescale;
+                    delay_next = prescale_int;
                     phy_state_next = PHY_STATE_START_1;
                 end else begin
                     phy_state_next = PHY_STATE_IDLE;
@@ -648,19 +731,19 @@ always @* begin
                 // bus active
                 if (phy_start_bit) begin
                     sda_o_next = 1'b1;
-                    delay_next = prescale;
+                    delay_next = prescale_int;
                     phy_state_next = PHY_STATE_REPEATED_START_1;
                 end else if (phy_write_bit) begin
                     sda_o_next = phy_tx_data;
-                    delay_next = prescale;
+                    delay_next = prescale_int;
                     phy_state_next = PHY_STATE_WRITE_BIT_1;
                 end else if (phy_read_bit) begin
                     sda_o_next = 1'b1;
-                    delay_next = prescale;
+                    delay_next = prescale_int;
                     phy_state_next = PHY_STATE_READ_BIT_1;
                 end else if (phy_stop_bit) begin
                     sda_o_next = 1'b0;
-                    delay_next = prescale;
+                    delay_next = prescale_int;
                     phy_state_next = PHY_STATE_STOP_1;
                 end else begin
                     phy_state_next = PHY_STATE_ACTIVE;
@@ -676,7 +759,7 @@ always @* begin
 
                 scl_o_next = 1'b1;
                 delay_scl_next = 1'b1;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_REPEATED_START_2;
             end
             PHY_STATE_REPEATED_START_2: begin
@@ -688,7 +771,7 @@ always @* begin
                 //
 
                 sda_o_next = 1'b0;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_START_1;
             end
             PHY_STATE_START_1: begin
@@ -700,7 +783,7 @@ always @* begin
                 //
 
                 scl_o_next = 1'b0;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_START_2;
             end
             PHY_STATE_START_2: begin
@@ -723,7 +806,7 @@ always @* begin
 
                 scl_o_next = 1'b1;
                 delay_scl_next = 1'b1;
-                delay_next = prescale << 1;
+                delay_next = scl_high_int;
                 phy_state_next = PHY_STATE_WRITE_BIT_2;
             end
             PHY_STATE_WRITE_BIT_2: begin
@@ -734,7 +817,7 @@ always @* begin
                 // scl __/    \__
 
                 scl_o_next = 1'b0;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_WRITE_BIT_3;
             end
             PHY_STATE_WRITE_BIT_3: begin
@@ -755,7 +838,7 @@ always @* begin
 
                 scl_o_next = 1'b1;
                 delay_scl_next = 1'b1;
-                delay_next = prescale;
+                delay_next = scl_high_int >> 1;
                 phy_state_next = PHY_STATE_READ_BIT_2;
             end
             PHY_STATE_READ_BIT_2: begin
@@ -766,7 +849,7 @@ always @* begin
                 // scl __/    \__
 
                 phy_rx_data_next = sda_i_reg;
-                delay_next = prescale;
+                delay_next = scl_high_int - (scl_high_int >> 1);
                 phy_state_next = PHY_STATE_READ_BIT_3;
             end
             PHY_STATE_READ_BIT_3: begin
@@ -777,7 +860,7 @@ always @* begin
                 // scl __/    \__
 
                 scl_o_next = 1'b0;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_READ_BIT_4;
             end
             PHY_STATE_READ_BIT_4: begin
@@ -798,7 +881,7 @@ always @* begin
 
                 scl_o_next = 1'b1;
                 delay_scl_next = 1'b1;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_STOP_2;
             end
             PHY_STATE_STOP_2: begin
@@ -809,7 +892,7 @@ always @* begin
                 // scl _______/
 
                 sda_o_next = 1'b1;
-                delay_next = prescale;
+                delay_next = prescale_int;
                 phy_state_next = PHY_STATE_STOP_3;
             end
             PHY_STATE_STOP_3: begin
@@ -820,6 +903,7 @@ always @* begin
                 // scl _______/
 
                 bus_control_next = 1'b0;
+                hs_active_next = 1'b0;
                 phy_state_next = PHY_STATE_IDLE;
             end
         endcase
@@ -875,6 +959,7 @@ always @(posedge clk) begin
 
     bus_control_reg <= bus_control_next;
     missed_ack_reg <= missed_ack_next;
+    hs_active_reg <= hs_active_next;
 
     if (rst) begin
         state_reg <= STATE_IDLE;
@@ -891,6 +976,7 @@ always @(posedge clk) begin
         bus_active_reg <= 1'b0;
         bus_control_reg <= 1'b0;
         missed_ack_reg <= 1'b0;
+        hs_active_reg <= 1'b0;
     end
 end
 
@@ -33,6 +33,9 @@ module i2c_master_axil #
 (
     parameter DEFAULT_PRESCALE = 1,
     parameter FIXED_PRESCALE = 0,
+    parameter DEFAULT_PRESCALE_HIGH = 0,
+    parameter DEFAULT_HS_PRESCALE = 1,
+    parameter DEFAULT_HS_PRESCALE_HIGH = 0,
     parameter CMD_FIFO = 1,
     parameter CMD_FIFO_DEPTH = 32,
     parameter WRITE_FIFO = 1,
@@ -47,7 +50,7 @@ module i2c_master_axil #
     /*
      * Host interface
      */
-    input  wire [3:0]  s_axil_awaddr,
+    input  wire [5:0]  s_axil_awaddr,
     input  wire [2:0]  s_axil_awprot,
     input  wire        s_axil_awvalid,
     output wire        s_axil_awready,
@@ -58,7 +61,7 @@ module i2c_master_axil #
     output wire [1:0]  s_axil_bresp,
     output wire        s_axil_bvalid,
     input  wire        s_axil_bready,
-    input  wire [3:0]  s_axil_araddr,
+    input  wire [5:0]  s_axil_araddr,
     input  wire [2:0]  s_axil_arprot,
     input  wire        s_axil_arvalid,
     output wire        s_axil_arready,
@@ -75,7 +78,13 @@ module i2c_master_axil #
     output wire        i2c_scl_t,
     input  wire        i2c_sda_i,
     output wire        i2c_sda_o,
-    output wire        i2c_sda_t
+    output wire        i2c_sda_t,
+    output wire        i2c_hs_pullup,
+
+    /*
+     * Interrupt
+     */
+    output wire        irq
 );
 /*
 
@@ -101,6 +110,12 @@ Registers:
 | 0x04  | Command       |
 | 0x08  | Data          |
 | 0x0C  | Prescale      |
+| 0x10  | Interrupt     |
+| 0x14  | FIFO Thresh   |
+| 0x18  | Data Packed   |
+| 0x1C  | Data Pk Last  |
+| 0x20  | Timing        |
+| 0x24  | HS Prescale   |
 
 Status register:
 
@@ -209,6 +224,144 @@ set prescale to 1/4 of the minimum clock period in units of input clk cycles
 
 prescale = Fclk / (FI2Cclk * 4)
 
+Interrupt register:
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x10  | Interrupt     |     -     |     -     |     -     |     -     | wr_th_en  | rd_th_en  | m_ack_en  |  done_en  |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x10  | Interrupt     |     -     |     -     |     -     |     -     |   wr_th   |   rd_th   |   m_ack   |   done    |
+
+done: set when all commands have completed (command FIFO empty and not busy); write 1 to clear
+m_ack: set when an ACK pulse from a slave device is not seen; write 1 to clear
+rd_th: high when the read data FIFO holds at least rd_thresh bytes (and is not empty)
+wr_th: high when the write data FIFO holds at most wr_thresh bytes
+*_en: interrupt enables; irq output is high when any enabled interrupt is active
+
+FIFO threshold register:
+
+| Addr  | Name          |   Bit 31  |   Bit 30  |   Bit 29  |   Bit 28  |   Bit 27  |   Bit 26  |   Bit 25  |   Bit 24  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x14  | FIFO Thresh   |                                         wr_thresh[15:8]                                       |
+
+| Addr  | Name          |   Bit 23  |   Bit 22  |   Bit 21  |   Bit 20  |   Bit 19  |   Bit 18  |   Bit 17  |   Bit 16  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x14  | FIFO Thresh   |                                         wr_thresh[7:0]                                        |
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x14  | FIFO Thresh   |                                         rd_thresh[15:8]                                       |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x14  | FIFO Thresh   |                                         rd_thresh[7:0]                                        |
+
+rd_thresh: read data FIFO level for rd_th interrupt
+wr_thresh: write data FIFO level for wr_th interrupt
+
+Packed data register:
+
+| Addr  | Name          |   Bit 31  |   Bit 30  |   Bit 29  |   Bit 28  |   Bit 27  |   Bit 26  |   Bit 25  |   Bit 24  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x18  | Data Packed   |                                          data_3[7:0]                                          |
+
+| Addr  | Name          |   Bit 23  |   Bit 22  |   Bit 21  |   Bit 20  |   Bit 19  |   Bit 18  |   Bit 17  |   Bit 16  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x18  | Data Packed   |                                          data_2[7:0]                                          |
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x18  | Data Packed   |                                          data_1[7:0]                                          |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x18  | Data Packed   |                                          data_0[7:0]                                          |
+
+data_0 to data_3: up to four data bytes, data_0 first
+
+write: pushes the bytes with write strobes set, starting from data_0, until the first
+    byte with strobe clear (byte count = 1 to 4); further writes are held off until the
+    bytes have been transferred to the write data FIFO
+read: pops up to four bytes (limited by the read data FIFO level), unused bytes read as 0;
+    byte count and data_last flags are available in the packed data status register
+
+Packed data status register (read):
+
+| Addr  | Name          |   Bit 31  |   Bit 30  |   Bit 29  |   Bit 28  |   Bit 27  |   Bit 26  |   Bit 25  |   Bit 24  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x1C  | Data Pk Last  |     -     |     -     |     -     |     -     |     -     |     -     |     -     |     -     |
+
+| Addr  | Name          |   Bit 23  |   Bit 22  |   Bit 21  |   Bit 20  |   Bit 19  |   Bit 18  |   Bit 17  |   Bit 16  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x1C  | Data Pk Last  |                   pk_last[3:0]                    |     -     |          pk_count[2:0]            |
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x1C  | Data Pk Last  |                                        rd_level[15:8]                                         |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x1C  | Data Pk Last  |                                        rd_level[7:0]                                          |
+
+rd_level: number of bytes in the read data FIFO
+pk_count: number of bytes returned by the last packed data read
+pk_last: data_last flags of the bytes returned by the last packed data read
+
+Writing 0x1C is the same as writing 0x18, with data_last set on the final byte.
+
+Reading the packed data register while rd_level is at least 4 always returns 4 bytes.
+
+Timing register:
+
+| Addr  | Name          |   Bit 31  |   Bit 30  |   Bit 29  |   Bit 28  |   Bit 27  |   Bit 26  |   Bit 25  |   Bit 24  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x20  | Timing        |     -     |     -     |     -     |     -     |     -     |     -     |     -     |     -     |
+
+| Addr  | Name          |   Bit 23  |   Bit 22  |   Bit 21  |   Bit 20  |   Bit 19  |   Bit 18  |   Bit 17  |   Bit 16  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x20  | Timing        |     -     |            hs_code[2:0]           |     -     |     -     | hs_active |  hs_mode  |
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x20  | Timing        |                                      prescale_high[15:8]                                      |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x20  | Timing        |                                      prescale_high[7:0]                                       |
+
+prescale_high: SCL high time in input clk cycles, 0 for 2 * prescale (symmetric clock)
+hs_mode: enter high-speed mode on start from an idle bus (master code, repeated start)
+hs_active: high-speed mode active (until stop)
+hs_code: master code bits (00001xxx)
+
+Low time is 2 * prescale, so for an asymmetric clock (fast-mode plus):
+
+prescale = Fclk * tLOW / 2
+prescale_high = Fclk * tHIGH
+
+HS prescale register:
+
+| Addr  | Name          |   Bit 31  |   Bit 30  |   Bit 29  |   Bit 28  |   Bit 27  |   Bit 26  |   Bit 25  |   Bit 24  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x24  | HS Prescale   |                                    hs_prescale_high[15:8]                                     |
+
+| Addr  | Name          |   Bit 23  |   Bit 22  |   Bit 21  |   Bit 20  |   Bit 19  |   Bit 18  |   Bit 17  |   Bit 16  |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x24  | HS Prescale   |                                    hs_prescale_high[7:0]                                      |
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x24  | HS Prescale   |                                      hs_prescale[15:8]                                        |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x24  | HS Prescale   |                                      hs_prescale[7:0]                                         |
+
+hs_prescale: prescale value for high-speed mode
+hs_prescale_high: SCL high time for high-speed mode, 0 for 2 * hs_prescale
+
 Commands:
 
 read
@@ -322,6 +475,11 @@ reg data_out_ready_reg = 1'b0, data_out_ready_next;
 wire data_out_last;
 
 reg [15:0] prescale_reg = DEFAULT_PRESCALE, prescale_next;
+reg [15:0] prescale_high_reg = DEFAULT_PRESCALE_HIGH, prescale_high_next;
+reg [15:0] hs_prescale_reg = DEFAULT_HS_PRESCALE, hs_prescale_next;
+reg [15:0] hs_prescale_high_reg = DEFAULT_HS_PRESCALE_HIGH, hs_prescale_high_next;
+reg hs_mode_reg = 1'b0, hs_mode_next;
+reg [2:0] hs_master_code_reg = 3'd0, hs_master_code_next;
 
 reg missed_ack_reg = 1'b0, missed_ack_next;
 
@@ -357,6 +515,7 @@ wire busy_int;
 wire bus_control_int;
 wire bus_active_int;
 wire missed_ack_int;
+wire hs_active_int;
 
 wire cmd_fifo_empty = !cmd_valid_int;
 wire cmd_fifo_full = !cmd_ready;
@@ -368,6 +527,40 @@ wire read_fifo_full = !data_out_ready_int;
 reg cmd_fifo_overflow_reg = 1'b0, cmd_fifo_overflow_next;
 reg write_fifo_overflow_reg = 1'b0, write_fifo_overflow_next;
 
+reg [15:0] write_fifo_count_reg = 16'd0;
+reg [15:0] read_fifo_count_reg = 16'd0;
+
+reg [15:0] read_fifo_thresh_reg = 16'd0, read_fifo_thresh_next;
+reg [15:0] write_fifo_thresh_reg = 16'd0, write_fifo_thresh_next;
+
+reg [3:0] irq_enable_reg = 4'd0, irq_enable_next;
+reg irq_done_reg = 1'b0, irq_done_next;
+reg irq_missed_ack_reg = 1'b0, irq_missed_ack_next;
+reg irq_reg = 1'b0;
+
+reg [1:0] idle_reg = 2'b11;
+
+// all commands completed; qualified over two cycles as busy lags the command handshake
+wire idle_int = cmd_fifo_empty && !busy_int;
+wire done_int = idle_int && idle_reg[0] && !idle_reg[1];
+
+wire irq_read_thresh = read_fifo_count_reg != 0 && read_fifo_count_reg >= read_fifo_thresh_reg;
+wire irq_write_thresh = write_fifo_count_reg <= write_fifo_thresh_reg;
+
+wire [3:0] irq_status = {irq_write_thresh, irq_read_thresh, irq_missed_ack_reg, irq_done_reg};
+
+reg [31:0] write_pack_data_reg = 32'd0, write_pack_data_next;
+reg [2:0] write_pack_count_reg = 3'd0, write_pack_count_next;
+reg write_pack_last_reg = 1'b0, write_pack_last_next;
+
+reg read_pack_active_reg = 1'b0, read_pack_active_next;
+reg [31:0] read_pack_data_reg = 32'd0, read_pack_data_next;
+reg [2:0] read_pack_count_reg = 3'd0, read_pack_count_next;
+reg [2:0] read_pack_index_reg = 3'd0, read_pack_index_next;
+reg [3:0] read_pack_last_reg = 4'd0, read_pack_last_next;
+
+assign irq = irq_reg;
+
 generate
 
 if (CMD_FIFO) begin
@@ -519,20 +712,52 @@ always @* begin
     data_out_ready_next = 1'b0;
 
     prescale_next = prescale_reg;
+    prescale_high_next = prescale_high_reg;
+    hs_prescale_next = hs_prescale_reg;
+    hs_prescale_high_next = hs_prescale_high_reg;
+    hs_mode_next = hs_mode_reg;
+    hs_master_code_next = hs_master_code_reg;
 
     missed_ack_next = missed_ack_reg || missed_ack_int;
 
     cmd_fifo_overflow_next = cmd_fifo_overflow_reg;
     write_fifo_overflow_next = write_fifo_overflow_reg;
 
-    if (s_axil_awvalid && s_axil_wvalid && !s_axil_bvalid) begin
+    read_fifo_thresh_next = read_fifo_thresh_reg;
+    write_fifo_thresh_next = write_fifo_thresh_reg;
+
+    irq_enable_next = irq_enable_reg;
+    irq_done_next = irq_done_reg || done_int;
+    irq_missed_ack_next = irq_missed_ack_reg || missed_ack_int;
+
+    write_pack_data_next = write_pack_data_reg;
+    write_pack_count_next = write_pack_count_reg;
+    write_pack_last_next = write_pack_last_reg;
+
+    read_pack_active_next = read_pack_active_reg;
+    read_pack_data_next = read_pack_data_reg;
+    read_pack_count_next = read_pack_count_reg;
+    read_pack_index_next = read_pack_index_reg;
+    read_pack_last_next = read_pack_last_reg;
+
+    if (write_pack_count_reg != 0 && !data_in_valid_next) begin
+        // transfer packed data to write FIFO
+        data_in_next = write_pack_data_reg[7:0];
+        data_in_last_next = write_pack_last_reg && write_pack_count_reg == 1;
+        data_in_valid_next = 1'b1;
+
+        write_pack_data_next = write_pack_data_reg >> 8;
+        write_pack_count_next = write_pack_count_reg - 1;
+    end
+
+    if (s_axil_awvalid && s_axil_wvalid && !s_axil_bvalid && write_pack_count_reg == 0) begin
         // write operation
         s_axil_awready_next = 1'b1;
         s_axil_wready_next = 1'b1;
         s_axil_bvalid_next = 1'b1;
 
-        case ({s_axil_awaddr[3:2], 2'b00})
-            4'h0: begin
+        case ({s_axil_awaddr[5:2], 2'b00})
+            6'h00: begin
                 // status register
                 if (s_axil_wstrb[0]) begin
                     if (s_axil_wdata[3]) begin
@@ -548,7 +773,7 @@ always @* begin
                     end
                 end
             end
-            4'h4: begin
+            6'h04: begin
                 // command
                 if (s_axil_wstrb[0]) begin
                     cmd_address_next = s_axil_wdata[6:0];
@@ -564,7 +789,7 @@ always @* begin
                     cmd_fifo_overflow_next = cmd_fifo_overflow_next || (cmd_valid_next && !cmd_ready);
                 end
             end
-            4'h8: begin
+            6'h08: begin
                 // data
                 if (s_axil_wstrb[0]) begin
                     data_in_next = s_axil_wdata[7:0];
@@ -581,7 +806,7 @@ always @* begin
                     write_fifo_overflow_next = write_fifo_overflow_next || !data_in_ready;
                 end
             end
-            4'hC: begin
+            6'h0C: begin
                 // prescale
                 if (!FIXED_PRESCALE && s_axil_wstrb[0]) begin
                     prescale_next[7:0] = s_axil_wdata[7:0];
@@ -590,6 +815,80 @@ always @* begin
                     prescale_next[15:8] = s_axil_wdata[15:8];
                 end
             end
+            6'h10: begin
+                // interrupt
+                if (s_axil_wstrb[0]) begin
+                    if (s_axil_wdata[0]) begin
+                        irq_done_next = done_int;
+                    end
+                    if (s_axil_wdata[1]) begin
+                        irq_missed_ack_next = missed_ack_int;
+                    end
+                end
+                if (s_axil_wstrb[1]) begin
+                    irq_enable_next = s_axil_wdata[11:8];
+                end
+            end
+            6'h14: begin
+                // FIFO threshold
+                if (s_axil_wstrb[0]) begin
+                    read_fifo_thresh_next[7:0] = s_axil_wdata[7:0];
+                end
+                if (s_axil_wstrb[1]) begin
+                    read_fifo_thresh_next[15:8] = s_axil_wdata[15:8];
+                end
+                if (s_axil_wstrb[2]) begin
+                    write_fifo_thresh_next[7:0] = s_axil_wdata[23:16];
+                end
+                if (s_axil_wstrb[3]) begin
+                    write_fifo_thresh_next[15:8] = s_axil_wdata[31:24];
+                end
+            end
+            6'h18, 6'h1C: begin
+                // packed data
+                write_pack_data_next = s_axil_wdata;
+                write_pack_last_next = s_axil_awaddr[2];
+
+                if (s_axil_wstrb[0]) begin
+                    if (s_axil_wstrb[1]) begin
+                        if (s_axil_wstrb[2]) begin
+                            write_pack_count_next = s_axil_wstrb[3] ? 3'd4 : 3'd3;
+                        end else begin
+                            write_pack_count_next = 3'd2;
+                        end
+                    end else begin
+                        write_pack_count_next = 3'd1;
+                    end
+                end
+            end
+            6'h20: begin
+                // timing
+                if (!FIXED_PRESCALE && s_axil_wstrb[0]) begin
+                    prescale_high_next[7:0] = s_axil_wdata[7:0];
+                end
+                if (!FIXED_PRESCALE && s_axil_wstrb[1]) begin
+                    prescale_high_next[15:8] = s_axil_wdata[15:8];
+                end
+                if (s_axil_wstrb[2]) begin
+                    hs_mode_next = s_axil_wdata[16];
+                    hs_master_code_next = s_axil_wdata[22:20];
+                end
+            end
+            6'h24: begin
+                // HS prescale
+                if (!FIXED_PRESCALE && s_axil_wstrb[0]) begin
+                    hs_prescale_next[7:0] = s_axil_wdata[7:0];
+                end
+                if (!FIXED_PRESCALE && s_axil_wstrb[1]) begin
+                    hs_prescale_next[15:8] = s_axil_wdata[15:8];
+                end
+                if (!FIXED_PRESCALE && s_axil_wstrb[2]) begin
+                    hs_prescale_high_next[7:0] = s_axil_wdata[23:16];
+                end
+                if (!FIXED_PRESCALE && s_axil_wstrb[3]) begin
+                    hs_prescale_high_next[15:8] = s_axil_wdata[31:24];
+                end
+            end
         endcase
     end
 
@@ -599,8 +898,8 @@ always @* begin
         s_axil_rvalid_next = 1'b1;
         s_axil_rdata_next = 32'd0;
 
-        case ({s_axil_araddr[3:2], 2'b00})
-            4'h0: begin
+        case ({s_axil_araddr[5:2], 2'b00})
+            6'h00: begin
                 // status
                 s_axil_rdata_next[0]  = busy_int;
                 s_axil_rdata_next[1]  = bus_control_int;
@@ -619,7 +918,7 @@ always @* begin
                 s_axil_rdata_next[14] = read_fifo_empty;
                 s_axil_rdata_next[15] = read_fifo_full;
             end
-            4'h4: begin
+            6'h04: begin
                 // command
                 s_axil_rdata_next[6:0] = cmd_address_reg;
                 s_axil_rdata_next[7]  = 1'b0;
@@ -632,17 +931,69 @@ always @* begin
                 s_axil_rdata_next[14] = 1'b0;
                 s_axil_rdata_next[15] = 1'b0;
             end
-            4'h8: begin
+            6'h08: begin
                 // data
                 s_axil_rdata_next[7:0] = data_out;
                 s_axil_rdata_next[8] = data_out_valid;
                 s_axil_rdata_next[9] = data_out_last;
                 data_out_ready_next = data_out_valid;
             end
-            4'hC: begin
+            6'h0C: begin
                 // prescale
                 s_axil_rdata_next = prescale_reg;
             end
+            6'h10: begin
+                // interrupt
+                s_axil_rdata_next[3:0] = irq_status;
+                s_axil_rdata_next[11:8] = irq_enable_reg;
+            end
+            6'h14: begin
+                // FIFO threshold
+                s_axil_rdata_next[15:0] = read_fifo_thresh_reg;
+                s_axil_rdata_next[31:16] = write_fifo_thresh_reg;
+            end
+            6'h18: begin
+                // packed data, collect bytes before responding
+                s_axil_arready_next = 1'b0;
+                s_axil_rvalid_next = 1'b0;
+
+                if (!read_pack_active_reg) begin
+                    read_pack_active_next = 1'b1;
+                    read_pack_data_next = 32'd0;
+                    read_pack_count_next = read_fifo_count_reg > 4 ? 3'd4 : read_fifo_count_reg[2:0];
+                    read_pack_index_next = 3'd0;
+                    read_pack_last_next = 4'd0;
+                end else if (read_pack_index_reg == read_pack_count_reg) begin
+                    s_axil_arready_next = 1'b1;
+                    s_axil_rvalid_next = 1'b1;
+                    s_axil_rdata_next = read_pack_data_reg;
+                    read_pack_active_next = 1'b0;
+                end else if (data_out_valid && !data_out_ready_reg) begin
+                    // ready is registered, wait for the previous byte to be popped
+                    read_pack_data_next[read_pack_index_reg*8 +: 8] = data_out;
+                    read_pack_last_next[read_pack_index_reg] = data_out_last;
+                    read_pack_index_next = read_pack_index_reg + 1;
+                    data_out_ready_next = 1'b1;
+                end
+            end
+            6'h1C: begin
+                // packed data status
+                s_axil_rdata_next[15:0] = read_fifo_count_reg;
+                s_axil_rdata_next[18:16] = read_pack_count_reg;
+                s_axil_rdata_next[23:20] = read_pack_last_reg;
+            end
+            6'h20: begin
+                // timing
+                s_axil_rdata_next[15:0] = prescale_high_reg;
+                s_axil_rdata_next[16] = hs_mode_reg;
+                s_axil_rdata_next[17] = hs_active_int;
+                s_axil_rdata_next[22:20] = hs_master_code_reg;
+            end
+            6'h24: begin
+                // HS prescale
+                s_axil_rdata_next[15:0] = hs_prescale_reg;
+                s_axil_rdata_next[31:16] = hs_prescale_high_reg;
+            end
         endcase
     end
 end
@@ -670,12 +1021,40 @@ always @(posedge clk) begin
     data_out_ready_reg <= data_out_ready_next;
 
     prescale_reg <= prescale_next;
+    prescale_high_reg <= prescale_high_next;
+    hs_prescale_reg <= hs_prescale_next;
+    hs_prescale_high_reg <= hs_prescale_high_next;
+    hs_mode_reg <= hs_mode_next;
+    hs_master_code_reg <= hs_master_code_next;
 
     missed_ack_reg <= missed_ack_next;
 
     cmd_fifo_overflow_reg <= cmd_fifo_overflow_next;
     write_fifo_overflow_reg <= write_fifo_overflow_next;
 
+    write_fifo_count_reg <= write_fifo_count_reg + (data_in_valid_reg && data_in_ready) - (data_in_valid_int && data_in_ready_int);
+    read_fifo_count_reg <= read_fifo_count_reg + (data_out_valid_int && data_out_ready_int) - (data_out_valid && data_out_ready_reg);
+
+    read_fifo_thresh_reg <= read_fifo_thresh_next;
+    write_fifo_thresh_reg <= write_fifo_thresh_next;
+
+    irq_enable_reg <= irq_enable_next;
+    irq_done_reg <= irq_done_next;
+    irq_missed_ack_reg <= irq_missed_ack_next;
+    irq_reg <= |(irq_status & irq_enable_reg);
+
+    idle_reg <= {idle_reg[0], idle_int};
+
+    write_pack_data_reg <= write_pack_data_next;
+    write_pack_count_reg <= write_pack_count_next;
+    write_pack_last_reg <= write_pack_last_next;
+
+    read_pack_active_reg <= read_pack_active_next;
+    read_pack_data_reg <= read_pack_data_next;
+    read_pack_count_reg <= read_pack_count_next;
+    read_pack_index_reg <= read_pack_index_next;
+    read_pack_last_reg <= read_pack_last_next;
+
     if (rst) begin
         s_axil_awready_reg <= 1'b0;
         s_axil_wready_reg <= 1'b0;
@@ -686,9 +1065,28 @@ always @(posedge clk) begin
         data_in_valid_reg <= 1'b0;
         data_out_ready_reg <= 1'b0;
         prescale_reg <= DEFAULT_PRESCALE;
+        prescale_high_reg <= DEFAULT_PRESCALE_HIGH;
+        hs_prescale_reg <= DEFAULT_HS_PRESCALE;
+        hs_prescale_high_reg <= DEFAULT_HS_PRESCALE_HIGH;
+        hs_mode_reg <= 1'b0;
+        hs_master_code_reg <= 3'd0;
         missed_ack_reg <= 1'b0;
         cmd_fifo_overflow_reg <= 1'b0;
         write_fifo_overflow_reg <= 1'b0;
+        write_fifo_count_reg <= 16'd0;
+        read_fifo_count_reg <= 16'd0;
+        read_fifo_thresh_reg <= 16'd0;
+        write_fifo_thresh_reg <= 16'd0;
+        irq_enable_reg <= 4'd0;
+        irq_done_reg <= 1'b0;
+        irq_missed_ack_reg <= 1'b0;
+        irq_reg <= 1'b0;
+        idle_reg <= 2'b11;
+        write_pack_count_reg <= 3'd0;
+        read_pack_active_reg <= 1'b0;
+        read_pack_count_reg <= 3'd0;
+        read_pack_index_reg <= 3'd0;
+        read_pack_last_reg <= 4'd0;
     end
 end
 
@@ -724,15 +1122,22 @@ i2c_master_inst (
     .sda_i(i2c_sda_i),
     .sda_o(i2c_sda_o),
     .sda_t(i2c_sda_t),
+    .hs_pullup(i2c_hs_pullup),
 
     // Status
     .busy(busy_int),
     .bus_control(bus_control_int),
     .bus_active(bus_active_int),
     .missed_ack(missed_ack_int),
+    .hs_active(hs_active_int),
 
     // Configuration
     .prescale(prescale_reg),
+    .prescale_high(prescale_high_reg),
+    .hs_mode(hs_mode_reg),
+    .hs_master_code(hs_master_code_reg),
+    .hs_prescale(hs_prescale_reg),
+    .hs_prescale_high(hs_prescale_high_reg),
     .stop_on_idle(1'b0)
 );
 
@@ -33,6 +33,9 @@ module i2c_master_wbs_16 #
 (
     parameter DEFAULT_PRESCALE = 1,
     parameter FIXED_PRESCALE = 0,
+    parameter DEFAULT_PRESCALE_HIGH = 0,
+    parameter DEFAULT_HS_PRESCALE = 1,
+    parameter DEFAULT_HS_PRESCALE_HIGH = 0,
     parameter CMD_FIFO = 1,
     parameter CMD_FIFO_DEPTH = 32,
     parameter WRITE_FIFO = 1,
@@ -47,7 +50,7 @@ module i2c_master_wbs_16 #
     /*
      * Host interface
      */
-    input  wire  [2:0] wbs_adr_i,   // ADR_I() address
+    input  wire  [4:0] wbs_adr_i,   // ADR_I() address
     input  wire [15:0] wbs_dat_i,   // DAT_I() data in
     output wire [15:0] wbs_dat_o,   // DAT_O() data out
     input  wire        wbs_we_i,    // WE_I write enable input
@@ -64,7 +67,13 @@ module i2c_master_wbs_16 #
     output wire        i2c_scl_t,
     input  wire        i2c_sda_i,
     output wire        i2c_sda_o,
-    output wire        i2c_sda_t
+    output wire        i2c_sda_t,
+    output wire        i2c_hs_pullup,
+
+    /*
+     * Interrupt
+     */
+    output wire        irq
 );
 /*
 
@@ -90,6 +99,12 @@ Registers:
 | 0x02  | Command       |
 | 0x04  | Data          |
 | 0x06  | Prescale      |
+| 0x08  | Interrupt     |
+| 0x0A  | FIFO Thresh   |
+| 0x0C  | Prescale High |
+| 0x0E  | HS Control    |
+| 0x10  | HS Prescale   |
+| 0x12  | HS Prescale Hi|
 
 Status register:
 
@@ -166,6 +181,51 @@ set prescale to 1/4 of the minimum clock period in units of input clk cycles
 
 prescale = Fclk / (FI2Cclk * 4)
 
+Interrupt register:
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x08  | Interrupt     |     -     |     -     |     -     |     -     | wr_th_en  | rd_th_en  | m_ack_en  |  done_en  |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x08  | Interrupt     |     -     |     -     |     -     |     -     |   wr_th   |   rd_th   |   m_ack   |   done    |
+
+done: set when all commands have completed (command FIFO empty and not busy); write 1 to clear
+m_ack: set when an ACK pulse from a slave device is not seen; write 1 to clear
+rd_th: high when the read data FIFO holds at least rd_thresh bytes (and is not empty)
+wr_th: high when the write data FIFO holds at most wr_thresh bytes
+*_en: interrupt enables; irq output is high when any enabled interrupt is active
+
+FIFO threshold register:
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x0A  | FIFO Thresh   |                                         wr_thresh[7:0]                                        |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x0A  | FIFO Thresh   |                                         rd_thresh[7:0]                                        |
+
+rd_thresh: read data FIFO level for rd_th interrupt
+wr_thresh: write data FIFO level for wr_th interrupt
+
+Timing registers:
+
+| Addr  | Name          |   Bit 15  |   Bit 14  |   Bit 13  |   Bit 12  |   Bit 11  |   Bit 10  |   Bit 9   |   Bit 8   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x0C  | Prescale High |                                      prescale_high[15:8]                                      |
+| 0x0E  | HS Control    |     -     |     -     |     -     |     -     |     -     |            hs_code[2:0]           |
+| 0x10  | HS Prescale   |                                      hs_prescale[15:8]                                        |
+| 0x12  | HS Prescale Hi|                                    hs_prescale_high[15:8]                                     |
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x0C  | Prescale High |                                      prescale_high[7:0]                                       |
+| 0x0E  | HS Control    |     -     |     -     |     -     |     -     |     -     |     -     | hs_active |  hs_mode  |
+| 0x10  | HS Prescale   |                                      hs_prescale[7:0]                                         |
+| 0x12  | HS Prescale Hi|                                    hs_prescale_high[7:0]                                      |
+
 Commands:
 
 read
@@ -275,6 +335,11 @@ reg data_out_ready_reg = 1'b0, data_out_ready_next;
 wire data_out_last;
 
 reg [15:0] prescale_reg = DEFAULT_PRESCALE, prescale_next;
+reg [15:0] prescale_high_reg = DEFAULT_PRESCALE_HIGH, prescale_high_next;
+reg [15:0] hs_prescale_reg = DEFAULT_HS_PRESCALE, hs_prescale_next;
+reg [15:0] hs_prescale_high_reg = DEFAULT_HS_PRESCALE_HIGH, hs_prescale_high_next;
+reg hs_mode_reg = 1'b0, hs_mode_next;
+reg [2:0] hs_master_code_reg = 3'd0, hs_master_code_next;
 
 reg missed_ack_reg = 1'b0, missed_ack_next;
 
@@ -304,6 +369,7 @@ wire busy_int;
 wire bus_control_int;
 wire bus_active_int;
 wire missed_ack_int;
+wire hs_active_int;
 
 wire cmd_fifo_empty = ~cmd_valid_int;
 wire cmd_fifo_full = ~cmd_ready;
@@ -315,6 +381,30 @@ wire read_fifo_full = ~data_out_ready_int;
 reg cmd_fifo_overflow_reg = 1'b0, cmd_fifo_overflow_next;
 reg write_fifo_overflow_reg = 1'b0, write_fifo_overflow_next;
 
+reg [15:0] write_fifo_count_reg = 16'd0;
+reg [15:0] read_fifo_count_reg = 16'd0;
+
+reg [7:0] read_fifo_thresh_reg = 8'd0, read_fifo_thresh_next;
+reg [7:0] write_fifo_thresh_reg = 8'd0, write_fifo_thresh_next;
+
+reg [3:0] irq_enable_reg = 4'd0, irq_enable_next;
+reg irq_done_reg = 1'b0, irq_done_next;
+reg irq_missed_ack_reg = 1'b0, irq_missed_ack_next;
+reg irq_reg = 1'b0;
+
+reg [1:0] idle_reg = 2'b11;
+
+// all commands completed; qualified over two cycles as busy lags the command handshake
+wire idle_int = cmd_fifo_empty && !busy_int;
+wire done_int = idle_int && idle_reg[0] && !idle_reg[1];
+
+wire irq_read_thresh = read_fifo_count_reg != 0 && read_fifo_count_reg >= read_fifo_thresh_reg;
+wire irq_write_thresh = write_fifo_count_reg <= write_fifo_thresh_reg;
+
+wire [3:0] irq_status = {irq_write_thresh, irq_read_thresh, irq_missed_ack_reg, irq_done_reg};
+
+assign irq = irq_reg;
+
 generate
 
 if (CMD_FIFO) begin
@@ -462,18 +552,30 @@ always @* begin
     data_out_ready_next = 1'b0;
 
     prescale_next = prescale_reg;
+    prescale_high_next = prescale_high_reg;
+    hs_prescale_next = hs_prescale_reg;
+    hs_prescale_high_next = hs_prescale_high_reg;
+    hs_mode_next = hs_mode_reg;
+    hs_master_code_next = hs_master_code_reg;
 
     missed_ack_next = missed_ack_reg | missed_ack_int;
 
     cmd_fifo_overflow_next = cmd_fifo_overflow_reg;
     write_fifo_overflow_next = write_fifo_overflow_reg;
+
+    read_fifo_thresh_next = read_fifo_thresh_reg;
+    write_fifo_thresh_next = write_fifo_thresh_reg;
+
+    irq_enable_next = irq_enable_reg;
+    irq_done_next = irq_done_reg | done_int;
+    irq_missed_ack_next = irq_missed_ack_reg | missed_ack_int;
     
     if (wbs_cyc_i & wbs_stb_i) begin
         // bus cycle
         if (wbs_we_i) begin
             // write cycle
             case (wbs_adr_i)
-                3'h0: begin
+                5'h00: begin
                     // status register
                     if (wbs_sel_i[0]) begin
                         if (wbs_dat_i[3]) begin
@@ -489,7 +591,7 @@ always @* begin
                         end
                     end
                 end
-                3'h2: begin
+                5'h02: begin
                     // command
                     if (wbs_sel_i[0]) begin
                         cmd_address_next = wbs_dat_i[6:0];
@@ -505,7 +607,7 @@ always @* begin
                         cmd_fifo_overflow_next = cmd_fifo_overflow_next | (cmd_valid_next & ~cmd_ready);
                     end
                 end
-                3'h4: begin
+                5'h04: begin
                     // data
                     if (wbs_sel_i[0]) begin
                         data_in_next = wbs_dat_i[7:0];
@@ -522,7 +624,7 @@ always @* begin
                         write_fifo_overflow_next = write_fifo_overflow_next | ~data_in_ready;
                     end
                 end
-                3'h6: begin
+                5'h06: begin
                     // prescale
                     if (!FIXED_PRESCALE && wbs_sel_i[0]) begin
                         prescale_next[7:0] = wbs_dat_i[7:0];
@@ -531,12 +633,71 @@ always @* begin
                         prescale_next[15:0] = wbs_dat_i[15:0];
                     end
                 end
+                5'h08: begin
+                    // interrupt
+                    if (wbs_sel_i[0]) begin
+                        if (wbs_dat_i[0]) begin
+                            irq_done_next = done_int;
+                        end
+                        if (wbs_dat_i[1]) begin
+                            irq_missed_ack_next = missed_ack_int;
+                        end
+                    end
+                    if (wbs_sel_i[1]) begin
+                        irq_enable_next = wbs_dat_i[11:8];
+                    end
+                end
+                5'h0A: begin
+                    // FIFO threshold
+                    if (wbs_sel_i[0]) begin
+                        read_fifo_thresh_next = wbs_dat_i[7:0];
+                    end
+                    if (wbs_sel_i[1]) begin
+                        write_fifo_thresh_next = wbs_dat_i[15:8];
+                    end
+                end
+                5'h0C: begin
+                    // prescale high
+                    if (!FIXED_PRESCALE && wbs_sel_i[0]) begin
+                        prescale_high_next[7:0] = wbs_dat_i[7:0];
+                    end
+                    if (!FIXED_PRESCALE && wbs_sel_i[1]) begin
+                        prescale_high_next[15:8] = wbs_dat_i[15:8];
+                    end
+                end
+                5'h0E: begin
+                    // HS control
+                    if (wbs_sel_i[0]) begin
+                        hs_mode_next = wbs_dat_i[0];
+                    end
+                    if (wbs_sel_i[1]) begin
+                        hs_master_code_next = wbs_dat_i[10:8];
+                    end
+                end
+                5'h10: begin
+                    // HS prescale
+                    if (!FIXED_PRESCALE && wbs_sel_i[0]) begin
+                        hs_prescale_next[7:0] = wbs_dat_i[7:0];
+                    end
+                    if (!FIXED_PRESCALE && wbs_sel_i[1]) begin
+                        hs_prescale_next[15:8] = wbs_dat_i[15:8];
+                    end
+                end
+                5'h12: begin
+                    // HS prescale high
+                    if (!FIXED_PRESCALE && wbs_sel_i[0]) begin
+                        hs_prescale_high_next[7:0] = wbs_dat_i[7:0];
+                    end
+                    if (!FIXED_PRESCALE && wbs_sel_i[1]) begin
+                        hs_prescale_high_next[15:8] = wbs_dat_i[15:8];
+                    end
+                end
             endcase
             wbs_ack_o_next = ~wbs_ack_o_reg;
         end else begin
             // read cycle
             case (wbs_adr_i)
-                3'h0: begin
+                5'h00: begin
                     // status
                     wbs_dat_o_next[0]  = busy_int;
                     wbs_dat_o_next[1]  = bus_control_int;
@@ -555,7 +716,7 @@ always @* begin
                     wbs_dat_o_next[14] = read_fifo_empty;
                     wbs_dat_o_next[15] = read_fifo_full;
                 end
-                3'h2: begin
+                5'h02: begin
                     // command
                     wbs_dat_o_next[6:0] = cmd_address_reg;
                     wbs_dat_o_next[7]  = 1'b0;
@@ -568,7 +729,7 @@ always @* begin
                     wbs_dat_o_next[14] = 1'b0;
                     wbs_dat_o_next[15] = 1'b0;
                 end
-                3'h4: begin
+                5'h04: begin
                     // data
                     wbs_dat_o_next[7:0] = data_out;
                     wbs_dat_o_next[8] = data_out_valid;
@@ -579,10 +740,42 @@ always @* begin
                         data_out_ready_next = !wbs_ack_o_reg && data_out_valid;
                     end
                 end
-                3'h6: begin
+                5'h06: begin
                     // prescale
                     wbs_dat_o_next = prescale_reg;
                 end
+                5'h08: begin
+                    // interrupt
+                    wbs_dat_o_next[3:0] = irq_status;
+                    wbs_dat_o_next[7:4] = 4'd0;
+                    wbs_dat_o_next[11:8] = irq_enable_reg;
+                    wbs_dat_o_next[15:12] = 4'd0;
+                end
+                5'h0A: begin
+                    // FIFO threshold
+                    wbs_dat_o_next[7:0] = read_fifo_thresh_reg;
+                    wbs_dat_o_next[15:8] = write_fifo_thresh_reg;
+                end
+                5'h0C: begin
+                    // prescale high
+                    wbs_dat_o_next = prescale_high_reg;
+                end
+                5'h0E: begin
+                    // HS control
+                    wbs_dat_o_next[0] = hs_mode_reg;
+                    wbs_dat_o_next[1] = hs_active_int;
+                    wbs_dat_o_next[7:2] = 6'd0;
+                    wbs_dat_o_next[10:8] = hs_master_code_reg;
+                    wbs_dat_o_next[15:11] = 5'd0;
+                end
+                5'h10: begin
+                    // HS prescale
+                    wbs_dat_o_next = hs_prescale_reg;
+                end
+                5'h12: begin
+                    // HS prescale high
+                    wbs_dat_o_next = hs_prescale_high_reg;
+                end
             endcase
             wbs_ack_o_next = ~wbs_ack_o_reg;
         end
@@ -608,21 +801,53 @@ always @(posedge clk) begin
     data_out_ready_reg <= data_out_ready_next;
 
     prescale_reg <= prescale_next;
+    prescale_high_reg <= prescale_high_next;
+    hs_prescale_reg <= hs_prescale_next;
+    hs_prescale_high_reg <= hs_prescale_high_next;
+    hs_mode_reg <= hs_mode_next;
+    hs_master_code_reg <= hs_master_code_next;
 
     missed_ack_reg <= missed_ack_next;
 
     cmd_fifo_overflow_reg <= cmd_fifo_overflow_next;
     write_fifo_overflow_reg <= write_fifo_overflow_next;
 
+    write_fifo_count_reg <= write_fifo_count_reg + (data_in_valid_reg && data_in_ready) - (data_in_valid_int && data_in_ready_int);
+    read_fifo_count_reg <= read_fifo_count_reg + (data_out_valid_int && data_out_ready_int) - (data_out_valid && data_out_ready_reg);
+
+    read_fifo_thresh_reg <= read_fifo_thresh_next;
+    write_fifo_thresh_reg <= write_fifo_thresh_next;
+
+    irq_enable_reg <= irq_enable_next;
+    irq_done_reg <= irq_done_next;
+    irq_missed_ack_reg <= irq_missed_ack_next;
+    irq_reg <= |(irq_status & irq_enable_reg);
+
+    idle_reg <= {idle_reg[0], idle_int};
+
     if (rst) begin
         wbs_ack_o_reg <= 1'b0;
         cmd_valid_reg <= 1'b0;
         data_in_valid_reg <= 1'b0;
         data_out_ready_reg <= 1'b0;
         prescale_reg <= DEFAULT_PRESCALE;
+        prescale_high_reg <= DEFAULT_PRESCALE_HIGH;
+        hs_prescale_reg <= DEFAULT_HS_PRESCALE;
+        hs_prescale_high_reg <= DEFAULT_HS_PRESCALE_HIGH;
+        hs_mode_reg <= 1'b0;
+        hs_master_code_reg <= 3'd0;
         missed_ack_reg <= 1'b0;
         cmd_fifo_overflow_reg <= 0;
         write_fifo_overflow_reg <= 0;
+        write_fifo_count_reg <= 16'd0;
+        read_fifo_count_reg <= 16'd0;
+        read_fifo_thresh_reg <= 8'd0;
+        write_fifo_thresh_reg <= 8'd0;
+        irq_enable_reg <= 4'd0;
+        irq_done_reg <= 1'b0;
+        irq_missed_ack_reg <= 1'b0;
+        irq_reg <= 1'b0;
+        idle_reg <= 2'b11;
     end
 end
 
@@ -658,15 +883,22 @@ i2c_master_inst (
     .sda_i(i2c_sda_i),
     .sda_o(i2c_sda_o),
     .sda_t(i2c_sda_t),
+    .hs_pullup(i2c_hs_pullup),
 
     // Status
     .busy(busy_int),
     .bus_control(bus_control_int),
     .bus_active(bus_active_int),
     .missed_ack(missed_ack_int),
+    .hs_active(hs_active_int),
 
     // Configuration
     .prescale(prescale_reg),
+    .prescale_high(prescale_high_reg),
+    .hs_mode(hs_mode_reg),
+    .hs_master_code(hs_master_code_reg),
+    .hs_prescale(hs_prescale_reg),
+    .hs_prescale_high(hs_prescale_high_reg),
     .stop_on_idle(1'b0)
 );
 
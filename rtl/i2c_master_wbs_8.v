@@ -33,6 +33,9 @@ module i2c_master_wbs_8 #
 (
     parameter DEFAULT_PRESCALE = 1,
     parameter FIXED_PRESCALE = 0,
+    parameter DEFAULT_PRESCALE_HIGH = 0,
+    parameter DEFAULT_HS_PRESCALE = 1,
+    parameter DEFAULT_HS_PRESCALE_HIGH = 0,
     parameter CMD_FIFO = 1,
     parameter CMD_FIFO_DEPTH = 32,
     parameter WRITE_FIFO = 1,
@@ -47,7 +50,7 @@ module i2c_master_wbs_8 #
     /*
      * Host interface
      */
-    input  wire  [2:0] wbs_adr_i,   // ADR_I() address
+    input  wire  [4:0] wbs_adr_i,   // ADR_I() address
     input  wire  [7:0] wbs_dat_i,   // DAT_I() data in
     output wire  [7:0] wbs_dat_o,   // DAT_O() data out
     input  wire        wbs_we_i,    // WE_I write enable input
@@ -63,7 +66,13 @@ module i2c_master_wbs_8 #
     output wire        i2c_scl_t,
     input  wire        i2c_sda_i,
     output wire        i2c_sda_o,
-    output wire        i2c_sda_t
+    output wire        i2c_sda_t,
+    output wire        i2c_hs_pullup,
+
+    /*
+     * Interrupt
+     */
+    output wire        irq
 );
 /*
 
@@ -93,6 +102,18 @@ Registers:
 | 0x05  | Reserved      |                                               -                                               |
 | 0x06  | Prescale Low  |                                         prescale[7:0]                                         |
 | 0x07  | Prescale High |                                         prescale[15:8]                                        |
+| 0x08  | IRQ Status    |     -     |     -     |     -     |     -     |   wr_th   |   rd_th   |   m_ack   |   done    |
+| 0x09  | IRQ Enable    |     -     |     -     |     -     |     -     | wr_th_en  | rd_th_en  | m_ack_en  |  done_en  |
+| 0x0A  | Read Thresh   |                                         rd_thresh[7:0]                                        |
+| 0x0B  | Write Thresh  |                                         wr_thresh[7:0]                                        |
+| 0x0C  | Prescale HL   |                                      prescale_high[7:0]                                       |
+| 0x0D  | Prescale HH   |                                      prescale_high[15:8]                                      |
+| 0x0E  | HS Control    |     -     |            hs_code[2:0]           |     -     |     -     | hs_active |  hs_mode  |
+| 0x0F  | Reserved      |                                               -                                               |
+| 0x10  | HS Prescale L |                                      hs_prescale[7:0]                                         |
+| 0x11  | HS Prescale H |                                      hs_prescale[15:8]                                        |
+| 0x12  | HS Prescale HL|                                    hs_prescale_high[7:0]                                      |
+| 0x13  | HS Prescale HH|                                    hs_prescale_high[15:8]                                     |
 
 Status registers:
 
@@ -153,6 +174,35 @@ set prescale to 1/4 of the minimum clock period in units of input clk cycles
 
 prescale = Fclk / (FI2Cclk * 4)
 
+Interrupt registers:
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x08  | IRQ Status    |     -     |     -     |     -     |     -     |   wr_th   |   rd_th   |   m_ack   |   done    |
+| 0x09  | IRQ Enable    |     -     |     -     |     -     |     -     | wr_th_en  | rd_th_en  | m_ack_en  |  done_en  |
+| 0x0A  | Read Thresh   |                                         rd_thresh[7:0]                                        |
+| 0x0B  | Write Thresh  |                                         wr_thresh[7:0]                                        |
+
+done: set when all commands have completed (command FIFO empty and not busy); write 1 to clear
+m_ack: set when an ACK pulse from a slave device is not seen; write 1 to clear
+rd_th: high when the read data FIFO holds at least rd_thresh bytes (and is not empty)
+wr_th: high when the write data FIFO holds at most wr_thresh bytes
+*_en: interrupt enables; irq output is high when any enabled interrupt is active
+rd_thresh: read data FIFO level for rd_th interrupt
+wr_thresh: write data FIFO level for wr_th interrupt
+
+Timing registers:
+
+| Addr  | Name          |   Bit 7   |   Bit 6   |   Bit 5   |   Bit 4   |   Bit 3   |   Bit 2   |   Bit 1   |   Bit 0   |
+|-------|---------------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|-----------|
+| 0x0C  | Prescale HL   |                                      prescale_high[7:0]                                       |
+| 0x0D  | Prescale HH   |                                      prescale_high[15:8]                                      |
+| 0x0E  | HS Control    |     -     |            hs_code[2:0]           |     -     |     -     | hs_active |  hs_mode  |
+| 0x10  | HS Prescale L |                                      hs_prescale[7:0]                                         |
+| 0x11  | HS Prescale H |                                      hs_prescale[15:8]                                        |
+| 0x12  | HS Prescale HL|                                    hs_prescale_high[7:0]                                      |
+| 0x13  | HS Prescale HH|                                    hs_prescale_high[15:8]                                     |
+
 Commands:
 
 read
@@ -262,6 +312,11 @@ reg data_out_ready_reg = 1'b0, data_out_ready_next;
 wire data_out_last;
 
 reg [15:0] prescale_reg = DEFAULT_PRESCALE, prescale_next;
+reg [15:0] prescale_high_reg = DEFAULT_PRESCALE_HIGH, prescale_high_next;
+reg [15:0] hs_prescale_reg = DEFAULT_HS_PRESCALE, hs_prescale_next;
+reg [15:0] hs_prescale_high_reg = DEFAULT_HS_PRESCALE_HIGH, hs_prescale_high_next;
+reg hs_mode_reg = 1'b0, hs_mode_next;
+reg [2:0] hs_master_code_reg = 3'd0, hs_master_code_next;
 
 reg missed_ack_reg = 1'b0, missed_ack_next;
 
@@ -291,6 +346,7 @@ wire busy_int;
 wire bus_control_int;
 wire bus_active_int;
 wire missed_ack_int;
+wire hs_active_int;
 
 wire cmd_fifo_empty = ~cmd_valid_int;
 wire cmd_fifo_full = ~cmd_ready;
@@ -302,6 +358,29 @@ wire read_fifo_full = ~data_out_ready_int;
 reg cmd_fifo_overflow_reg = 1'b0, cmd_fifo_overflow_next;
 reg write_fifo_overflow_reg = 1'b0, write_fifo_overflow_next;
 
+reg [15:0] write_fifo_count_reg = 16'd0;
+reg [15:0] read_fifo_count_reg = 16'd0;
+
+reg [7:0] read_fifo_thresh_reg = 8'd0, read_fifo_thresh_next;
+reg [7:0] write_fifo_thresh_reg = 8'd0, write_fifo_thresh_next;
+
+reg [3:0] irq_enable_reg = 4'd0, irq_enable_next;
+reg irq_done_reg = 1'b0, irq_done_next;
+reg irq_missed_ack_reg = 1'b0, irq_missed_ack_next;
+reg irq_reg = 1'b0;
+
+reg [1:0] idle_reg = 2'b11;
+
+// all commands completed; qualified over two cycles as busy lags the command handshake
+wire idle_int = cmd_fifo_empty && !busy_int;
+wire done_int = idle_int && idle_reg[0] && !idle_reg[1];
+
+wire irq_read_thresh = read_fifo_count_reg != 0 && read_fifo_count_reg >= read_fifo_thresh_reg;
+wire irq_write_thresh = write_fifo_count_reg <= write_fifo_thresh_reg;
+
+wire [3:0] irq_status = {irq_write_thresh, irq_read_thresh, irq_missed_ack_reg, irq_done_reg};
+
+assign irq = irq_reg;
 
 generate
 
@@ -450,24 +529,36 @@ always @* begin
     data_out_ready_next = 1'b0;
 
     prescale_next = prescale_reg;
+    prescale_high_next = prescale_high_reg;
+    hs_prescale_next = hs_prescale_reg;
+    hs_prescale_high_next = hs_prescale_high_reg;
+    hs_mode_next = hs_mode_reg;
+    hs_master_code_next = hs_master_code_reg;
 
     missed_ack_next = missed_ack_reg | missed_ack_int;
 
     cmd_fifo_overflow_next = cmd_fifo_overflow_reg;
     write_fifo_overflow_next = write_fifo_overflow_reg;
+
+    read_fifo_thresh_next = read_fifo_thresh_reg;
+    write_fifo_thresh_next = write_fifo_thresh_reg;
+
+    irq_enable_next = irq_enable_reg;
+    irq_done_next = irq_done_reg | done_int;
+    irq_missed_ack_next = irq_missed_ack_reg | missed_ack_int;
     
     if (wbs_cyc_i & wbs_stb_i) begin
         // bus cycle
         if (wbs_we_i) begin
             // write cycle
             case (wbs_adr_i)
-                4'h0: begin
+                5'h00: begin
                     // status
                     if (wbs_dat_i[3]) begin
                         missed_ack_next = missed_ack_int;
                     end
                 end
-                4'h1: begin
+                5'h01: begin
                     // FIFO status
                     if (wbs_dat_i[2]) begin
                         cmd_fifo_overflow_next = 1'b0;
@@ -476,11 +567,11 @@ always @* begin
                         write_fifo_overflow_next = 1'b0;
                     end
                 end
-                4'h2: begin
+                5'h02: begin
                     // command address
                     cmd_address_next = wbs_dat_i;
                 end
-                4'h3: begin
+                5'h03: begin
                     // command
                     cmd_start_next = wbs_dat_i[0];
                     cmd_read_next = wbs_dat_i[1];
@@ -491,34 +582,96 @@ always @* begin
 
                     cmd_fifo_overflow_next = cmd_fifo_overflow_next | (cmd_valid_next & ~cmd_ready);
                 end
-                4'h4: begin
+                5'h04: begin
                     // data
                     data_in_next = wbs_dat_i;
                     data_in_valid_next = ~wbs_ack_o_reg;
 
                     write_fifo_overflow_next = write_fifo_overflow_next | ~data_in_ready;
                 end
-                4'h5: begin
+                5'h05: begin
                     // reserved
                 end
-                4'h6: begin
+                5'h06: begin
                     // prescale low
                     if (!FIXED_PRESCALE) begin
                         prescale_next[7:0] = wbs_dat_i;
                     end
                 end
-                4'h7: begin
+                5'h07: begin
                     // prescale high
                     if (!FIXED_PRESCALE) begin
                         prescale_next[15:8] = wbs_dat_i;
                     end
                 end
+                5'h08: begin
+                    // IRQ status
+                    if (wbs_dat_i[0]) begin
+                        irq_done_next = done_int;
+                    end
+                    if (wbs_dat_i[1]) begin
+                        irq_missed_ack_next = missed_ack_int;
+                    end
+                end
+                5'h09: begin
+                    // IRQ enable
+                    irq_enable_next = wbs_dat_i[3:0];
+                end
+                5'h0A: begin
+                    // read threshold
+                    read_fifo_thresh_next = wbs_dat_i;
+                end
+                5'h0B: begin
+                    // write threshold
+                    write_fifo_thresh_next = wbs_dat_i;
+                end
+                5'h0C: begin
+                    // prescale high low
+                    if (!FIXED_PRESCALE) begin
+                        prescale_high_next[7:0] = wbs_dat_i;
+                    end
+                end
+                5'h0D: begin
+                    // prescale high high
+                    if (!FIXED_PRESCALE) begin
+                        prescale_high_next[15:8] = wbs_dat_i;
+                    end
+                end
+                5'h0E: begin
+                    // HS control
+                    hs_mode_next = wbs_dat_i[0];
+                    hs_master_code_next = wbs_dat_i[6:4];
+                end
+                5'h10: begin
+                    // HS prescale low
+                    if (!FIXED_PRESCALE) begin
+                        hs_prescale_next[7:0] = wbs_dat_i;
+                    end
+                end
+                5'h11: begin
+                    // HS prescale high
+                    if (!FIXED_PRESCALE) begin
+                        hs_prescale_next[15:8] = wbs_dat_i;
+                    end
+                end
+                5'h12: begin
+                    // HS prescale high low
+                    if (!FIXED_PRESCALE) begin
+                        hs_prescale_high_next[7:0] = wbs_dat_i;
+                    end
+                end
+                5'h13: begin
+                    // HS prescale high high
+                    if (!FIXED_PRESCALE) begin
+                        hs_prescale_high_next[15:8] = wbs_dat_i;
+                    end
+                end
             endcase
             wbs_ack_o_next = ~wbs_ack_o_reg;
         end else begin
             // read cycle
             case (wbs_adr_i)
-                4'h0: begin
+                5'h00: begin
                     // status
                     wbs_dat_o_next[0] = busy_int;
                     wbs_dat_o_next[1] = bus_control_int;
@@ -529,7 +682,7 @@ always @* begin
                     wbs_dat_o_next[6] = 1'b0;
                     wbs_dat_o_next[7] = 1'b0;
                 end
-                4'h1: begin
+                5'h01: begin
                     // FIFO status
                     wbs_dat_o_next[0] = cmd_fifo_empty;
                     wbs_dat_o_next[1] = cmd_fifo_full;
@@ -540,11 +693,11 @@ always @* begin
                     wbs_dat_o_next[6] = read_fifo_empty;
                     wbs_dat_o_next[7] = read_fifo_full;
                 end
-                4'h2: begin
+                5'h02: begin
                     // command address
                     wbs_dat_o_next = cmd_address_reg;
                 end
-                4'h3: begin
+                5'h03: begin
                     // command
                     wbs_dat_o_next[0] = cmd_start_reg;
                     wbs_dat_o_next[1] = cmd_read_reg;
@@ -555,23 +708,73 @@ always @* begin
                     wbs_dat_o_next[6] = 1'b0;
                     wbs_dat_o_next[7] = 1'b0;
                 end
-                4'h4: begin
+                5'h04: begin
                     // data
                     wbs_dat_o_next = data_out;
                     data_out_ready_next = !wbs_ack_o_reg && data_out_valid;
                 end
-                4'h5: begin
+                5'h05: begin
                     // reserved
                     wbs_dat_o_next = 8'd0;
                 end
-                4'h6: begin
+                5'h06: begin
                     // prescale low
                     wbs_dat_o_next = prescale_reg[7:0];
                 end
-                4'h7: begin
+                5'h07: begin
                     // prescale high
                     wbs_dat_o_next = prescale_reg[15:8];
                 end
+                5'h08: begin
+                    // IRQ status
+                    wbs_dat_o_next[3:0] = irq_status;
+                    wbs_dat_o_next[7:4] = 4'd0;
+                end
+                5'h09: begin
+                    // IRQ enable
+                    wbs_dat_o_next[3:0] = irq_enable_reg;
+                    wbs_dat_o_next[7:4] = 4'd0;
+                end
+                5'h0A: begin
+                    // read threshold
+                    wbs_dat_o_next = read_fifo_thresh_reg;
+                end
+                5'h0B: begin
+                    // write threshold
+                    wbs_dat_o_next = write_fifo_thresh_reg;
+                end
+                5'h0C: begin
+                    // prescale high low
+                    wbs_dat_o_next = prescale_high_reg[7:0];
+                end
+                5'h0D: begin
+                    // prescale high high
+                    wbs_dat_o_next = prescale_high_reg[15:8];
+                end
+                5'h0E: begin
+                    // HS control
+                    wbs_dat_o_next[0] = hs_mode_reg;
+                    wbs_dat_o_next[1] = hs_active_int;
+                    wbs_dat_o_next[3:2] = 2'd0;
+                    wbs_dat_o_next[6:4] = hs_master_code_reg;
+                    wbs_dat_o_next[7] = 1'b0;
+                end
+                5'h10: begin
+                    // HS prescale low
+                    wbs_dat_o_next = hs_prescale_reg[7:0];
+                end
+                5'h11: begin
+                    // HS prescale high
+                    wbs_dat_o_next = hs_prescale_reg[15:8];
+                end
+                5'h12: begin
+                    // HS prescale high low
+                    wbs_dat_o_next = hs_prescale_high_reg[7:0];
+                end
+                5'h13: begin
+                    // HS prescale high high
+                    wbs_dat_o_next = hs_prescale_high_reg[15:8];
+                end
             endcase
             wbs_ack_o_next = ~wbs_ack_o_reg;
         end
@@ -597,21 +800,53 @@ always @(posedge clk) begin
     data_out_ready_reg <= data_out_ready_next;
 
     prescale_reg <= prescale_next;
+    prescale_high_reg <= prescale_high_next;
+    hs_prescale_reg <= hs_prescale_next;
+    hs_prescale_high_reg <= hs_prescale_high_next;
+    hs_mode_reg <= hs_mode_next;
+    hs_master_code_reg <= hs_master_code_next;
 
     missed_ack_reg <= missed_ack_next;
 
     cmd_fifo_overflow_reg <= cmd_fifo_overflow_next;
     write_fifo_overflow_reg <= write_fifo_overflow_next;
 
+    write_fifo_count_reg <= write_fifo_count_reg + (data_in_valid_reg && data_in_ready) - (data_in_valid_int && data_in_ready_int);
+    read_fifo_count_reg <= read_fifo_count_reg + (data_out_valid_int && data_out_ready_int) - (data_out_valid && data_out_ready_reg);
+
+    read_fifo_thresh_reg <= read_fifo_thresh_next;
+    write_fifo_thresh_reg <= write_fifo_thresh_next;
+
+    irq_enable_reg <= irq_enable_next;
+    irq_done_reg <= irq_done_next;
+    irq_missed_ack_reg <= irq_missed_ack_next;
+    irq_reg <= |(irq_status & irq_enable_reg);
+
+    idle_reg <= {idle_reg[0], idle_int};
+
     if (rst) begin
         wbs_ack_o_reg <= 1'b0;
         cmd_valid_reg <= 1'b0;
         data_in_valid_reg <= 1'b0;
         data_out_ready_reg <= 1'b0;
         prescale_reg <= DEFAULT_PRESCALE;
+        prescale_high_reg <= DEFAULT_PRESCALE_HIGH;
+        hs_prescale_reg <= DEFAULT_HS_PRESCALE;
+        hs_prescale_high_reg <= DEFAULT_HS_PRESCALE_HIGH;
+        hs_mode_reg <= 1'b0;
+        hs_master_code_reg <= 3'd0;
         missed_ack_reg <= 1'b0;
         cmd_fifo_overflow_reg <= 0;
         write_fifo_overflow_reg <= 0;
+        write_fifo_count_reg <= 16'd0;
+        read_fifo_count_reg <= 16'd0;
+        read_fifo_thresh_reg <= 8'd0;
+        write_fifo_thresh_reg <= 8'd0;
+        irq_enable_reg <= 4'd0;
+        irq_done_reg <= 1'b0;
+        irq_missed_ack_reg <= 1'b0;
+        irq_reg <= 1'b0;
+        idle_reg <= 2'b11;
     end
 end
 
@@ -647,15 +882,22 @@ i2c_master_inst (
     .sda_i(i2c_sda_i),
     .sda_o(i2c_sda_o),
     .sda_t(i2c_sda_t),
+    .hs_pullup(i2c_hs_pullup),
 
     // Status
     .busy(busy_int),
     .bus_control(bus_control_int),
     .bus_active(bus_active_int),
     .missed_ack(missed_ack_int),
+    .hs_active(hs_active_int),
 
     // Configuration
     .prescale(prescale_reg),
+    .prescale_high(prescale_high_reg),
+    .hs_mode(hs_mode_reg),
+    .hs_master_code(hs_master_code_reg),
+    .hs_prescale(hs_prescale_reg),
+    .hs_prescale_high(hs_prescale_high_reg),
     .stop_on_idle(1'b0)
 );
 
@@ -0,0 +1,482 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Simulation throughput benchmark
+#
+# Runs fixed workloads with pinned seeds against the MyHDL models and
+# reports wall time, simulated clock cycles per second and Python events per
+# second.  Results are appended to a JSON history file and compared against
+# the median of the previous runs on the same host; workloads slower than
+# the threshold are flagged as regressions.
+#
+#     python benchmark.py                  run the model workloads
+#     python benchmark.py --dut            also run each DUT bench (needs iverilog)
+#     python benchmark.py -s 4 i2c axis    larger runs of selected workloads
+#
+# Events are counted in a second, instrumented pass of each workload, so the
+# timed pass runs unmodified models.
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from myhdl import *
+import myhdl._Signal
+
+import axil
+import axis_ep
+import i2c
+import wb
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_HISTORY = os.path.join(tb_dir, 'benchmark_history.json')
+
+# clock period, matches the testbenches
+CLK_PERIOD = 8
+
+SEED = 1
+
+
+def clock(clk):
+    @always(delay(CLK_PERIOD//2))
+    def clkgen():
+        clk.next = not clk
+
+    return clkgen
+
+
+def reset(clk, rst):
+    yield delay(100)
+    yield clk.posedge
+    rst.next = 1
+    yield clk.posedge
+    rst.next = 0
+    yield clk.posedge
+
+
+def workload_i2c(scale):
+    """I2C byte stream between I2CMaster and I2CMem"""
+    rnd = random.Random(SEED)
+
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+
+    m_scl_o = Signal(bool(1))
+    m_scl_t = Signal(bool(1))
+    m_sda_o = Signal(bool(1))
+    m_sda_t = Signal(bool(1))
+    s_scl_o = Signal(bool(1))
+    s_scl_t = Signal(bool(1))
+    s_sda_o = Signal(bool(1))
+    s_sda_t = Signal(bool(1))
+    scl = Signal(bool(1))
+    sda = Signal(bool(1))
+
+    master = i2c.I2CMaster()
+    master_logic = master.create_logic(clk, rst, scl_i=scl, scl_o=m_scl_o, scl_t=m_scl_t,
+        sda_i=sda, sda_o=m_sda_o, sda_t=m_sda_t, prescale=2)
+
+    mem = i2c.I2CMem(1024)
+    mem_logic = mem.create_logic(scl_i=scl, scl_o=s_scl_o, scl_t=s_scl_t,
+        sda_i=sda, sda_o=s_sda_o, sda_t=s_sda_t, abw=2, address=0x50, latency=0)
+
+    @always_comb
+    def bus():
+        scl.next = m_scl_o & s_scl_o
+        sda.next = m_sda_o & s_sda_o
+
+    @instance
+    def check():
+        yield reset(clk, rst)
+
+        for k in range(8*scale):
+            addr = rnd.randrange(0, 1024-32)
+            data = bytearray(rnd.getrandbits(8) for i in range(32))
+
+            master.init_write(0x50, bytearray([addr >> 8, addr & 0xff])+data)
+            master.init_write(0x50, bytearray([addr >> 8, addr & 0xff]))
+            master.init_read(0x50, len(data))
+
+            yield master.wait()
+            yield clk.posedge
+
+            assert master.get_read_data()[1] == data
+
+        raise StopSimulation
+
+    clkgen = clock(clk)
+
+    return instances()
+
+
+def workload_axis(scale):
+    """AXI stream frame storm, random frame sizes and backpressure"""
+    rnd = random.Random(SEED)
+
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+
+    tdata = Signal(intbv(0)[8:])
+    tvalid = Signal(bool(0))
+    tready = Signal(bool(0))
+    tlast = Signal(bool(0))
+
+    source_pause = Signal(bool(0))
+    sink_pause = Signal(bool(0))
+
+    source = axis_ep.AXIStreamSource()
+    source_logic = source.create_logic(clk, rst, tdata=tdata, tvalid=tvalid,
+        tready=tready, tlast=tlast, pause=source_pause)
+
+    sink = axis_ep.AXIStreamSink()
+    sink_logic = sink.create_logic(clk, rst, tdata=tdata, tvalid=tvalid,
+        tready=tready, tlast=tlast, pause=sink_pause)
+
+    @instance
+    def pause():
+        prnd = random.Random(SEED+1)
+        while True:
+            yield clk.posedge
+            source_pause.next = prnd.random() < 0.2
+            sink_pause.next = prnd.random() < 0.2
+
+    @instance
+    def check():
+        yield reset(clk, rst)
+
+        frames = []
+        for k in range(200*scale):
+            frames.append(bytearray(rnd.getrandbits(8) for i in range(rnd.randrange(1, 128))))
+
+        for f in frames:
+            source.send(bytes(f))
+
+        for f in frames:
+            yield sink.wait()
+            assert sink.recv().data == f
+
+        raise StopSimulation
+
+    clkgen = clock(clk)
+
+    return instances()
+
+
+def workload_axil(scale):
+    """AXI lite write and read bursts against AXILiteRam"""
+    rnd = random.Random(SEED)
+
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+
+    awaddr = Signal(intbv(0)[16:])
+    awprot = Signal(intbv(0)[3:])
+    awvalid = Signal(bool(0))
+    awready = Signal(bool(0))
+    wdata = Signal(intbv(0)[32:])
+    wstrb = Signal(intbv(0)[4:])
+    wvalid = Signal(bool(0))
+    wready = Signal(bool(0))
+    bresp = Signal(intbv(0)[2:])
+    bvalid = Signal(bool(0))
+    bready = Signal(bool(0))
+    araddr = Signal(intbv(0)[16:])
+    arprot = Signal(intbv(0)[3:])
+    arvalid = Signal(bool(0))
+    arready = Signal(bool(0))
+    rdata = Signal(intbv(0)[32:])
+    rresp = Signal(intbv(0)[2:])
+    rvalid = Signal(bool(0))
+    rready = Signal(bool(0))
+
+    ports = dict(awaddr=awaddr, awprot=awprot, awvalid=awvalid, awready=awready,
+        wdata=wdata, wstrb=wstrb, wvalid=wvalid, wready=wready,
+        bresp=bresp, bvalid=bvalid, bready=bready,
+        araddr=araddr, arprot=arprot, arvalid=arvalid, arready=arready,
+        rdata=rdata, rresp=rresp, rvalid=rvalid, rready=rready)
+
+    master = axil.AXILiteMaster()
+    master_logic = master.create_logic(clk, rst, **dict(('m_axil_'+k, v) for k, v in ports.items()))
+
+    ram = axil.AXILiteRam(2**16)
+    ram_port = ram.create_port(clk, **dict(('s_axil_'+k, v) for k, v in ports.items()))
+
+    @instance
+    def check():
+        yield reset(clk, rst)
+
+        for k in range(16*scale):
+            addr = rnd.randrange(0, 2**16-256)
+            data = bytearray(rnd.getrandbits(8) for i in range(rnd.randrange(1, 128)))
+
+            # write and read channels are independent
+            master.init_write(addr, data)
+            yield master.wait()
+            master.init_read(addr, len(data))
+
+            yield master.wait()
+            yield clk.posedge
+
+            assert master.get_read_data()[1] == data
+
+        raise StopSimulation
+
+    clkgen = clock(clk)
+
+    return instances()
+
+
+def workload_wb(scale):
+    """Wishbone write and read bursts against WBRam"""
+    rnd = random.Random(SEED)
+
+    clk = Signal(bool(0))
+
+    adr = Signal(intbv(0)[16:])
+    dat_m = Signal(intbv(0)[32:])
+    dat_s = Signal(intbv(0)[32:])
+    we = Signal(bool(0))
+    sel = Signal(intbv(0)[4:])
+    stb = Signal(bool(0))
+    ack = Signal(bool(0))
+    cyc = Signal(bool(0))
+
+    master = wb.WBMaster()
+    master_logic = master.create_logic(clk, adr_o=adr, dat_i=dat_s, dat_o=dat_m,
+        we_o=we, sel_o=sel, stb_o=stb, ack_i=ack, cyc_o=cyc)
+
+    ram = wb.WBRam(2**16)
+    ram_port = ram.create_port(clk, adr_i=adr, dat_i=dat_m, dat_o=dat_s,
+        we_i=we, sel_i=sel, stb_i=stb, ack_o=ack, cyc_i=cyc, latency=1)
+
+    @instance
+    def check():
+        yield delay(100)
+        yield clk.posedge
+
+        for k in range(16*scale):
+            addr = rnd.randrange(0, 2**16-256)
+            data = bytearray(rnd.getrandbits(8) for i in range(rnd.randrange(1, 128)))
+
+            master.init_write(addr, data)
+            master.init_read(addr, len(data))
+
+            yield master.wait()
+            yield clk.posedge
+
+            assert master.get_read_data()[1] == data
+
+        raise StopSimulation
+
+    clkgen = clock(clk)
+
+    return instances()
+
+
+WORKLOADS = {
+    'i2c': workload_i2c,
+    'axis': workload_axis,
+    'axil': workload_axil,
+    'wb': workload_wb
+}
+
+
+class EventCounter(object):
+    """Count signal updates and the generator resumptions they trigger"""
+    def __init__(self):
+        self.updates = 0
+        self.events = 0
+        self._orig = None
+
+    def __enter__(self):
+        self._orig = orig = myhdl._Signal._Signal._update
+        counter = self
+
+        def _update(sig):
+            waiters = orig(sig)
+            counter.updates += 1
+            counter.events += len(waiters)
+            return waiters
+
+        myhdl._Signal._Signal._update = _update
+        return self
+
+    def __exit__(self, *args):
+        myhdl._Signal._Signal._update = self._orig
+
+
+def run_workload(name, scale=1, count_events=True):
+    func = WORKLOADS[name]
+
+    sim = Simulation(func(scale))
+    start = time.perf_counter()
+    sim.run(quiet=1)
+    wall_time = time.perf_counter() - start
+    sim_time = now()
+
+    result = {
+        'wall_time': wall_time,
+        'sim_time': sim_time,
+        'cycles': sim_time // CLK_PERIOD,
+        'cycles_per_s': (sim_time // CLK_PERIOD) / wall_time,
+        'events': None,
+        'events_per_s': None
+    }
+
+    if count_events:
+        sim = Simulation(func(scale))
+        with EventCounter() as counter:
+            sim.run(quiet=1)
+        result['signal_updates'] = counter.updates
+        result['events'] = counter.events
+        result['events_per_s'] = counter.events / wall_time
+
+    return result
+
+
+def run_dut_benches(benches=None):
+    import run_tests
+
+    os.environ['SIM_DUMP'] = '0'
+
+    jobs = run_tests.make_jobs(benches or [b for b in run_tests.find_benches() if b != 'test_i2c'])
+    results = {}
+    for r in run_tests.run(jobs, processes=1):
+        cycles = (r['sim_time'] or 0) // CLK_PERIOD
+        results['dut:' + r['bench']] = {
+            'wall_time': r['wall_time'],
+            'sim_time': r['sim_time'],
+            'cycles': cycles,
+            'cycles_per_s': cycles / r['wall_time'] if r['wall_time'] else None,
+            'events': None,
+            'events_per_s': None,
+            'passed': r['passed']
+        }
+    return results
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=tb_dir, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_regressions(history, entry, threshold, window=5):
+    """Compare entry against the median of the last window runs on the same host"""
+    regressions = []
+
+    prev = [h for h in history if h.get('host') == entry['host']][-window:]
+
+    for name, r in entry['results'].items():
+        times = sorted(h['results'][name]['cycles_per_s'] for h in prev
+            if name in h['results'] and h['results'][name].get('cycles_per_s'))
+        if not times or not r.get('cycles_per_s'):
+            continue
+        base = times[len(times)//2]
+        change = r['cycles_per_s'] / base - 1
+        r['baseline_cycles_per_s'] = base
+        r['change'] = change
+        if change < -threshold:
+            regressions.append((name, change))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation throughput benchmark")
+    parser.add_argument('workloads', nargs='*', help="workloads to run (default: %s)" % ", ".join(sorted(WORKLOADS)))
+    parser.add_argument('-s', '--scale', type=int, default=1, help="workload size multiplier")
+    parser.add_argument('--dut', action='store_true', help="also run the DUT benches")
+    parser.add_argument('--no-events', action='store_true', help="skip the event counting pass")
+    parser.add_argument('-H', '--history', default=DEFAULT_HISTORY, help="JSON history file")
+    parser.add_argument('--no-save', action='store_true', help="do not append results to the history")
+    parser.add_argument('-t', '--threshold', type=float, default=0.10, help="regression threshold as a fraction (default 0.10)")
+
+    args = parser.parse_args()
+
+    names = args.workloads or sorted(WORKLOADS)
+
+    entry = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+        'myhdl': myhdl.__version__,
+        'rev': git_rev(),
+        'scale': args.scale,
+        'results': {}
+    }
+
+    for name in names:
+        entry['results'][name] = run_workload(name, args.scale, not args.no_events)
+
+    if args.dut:
+        entry['results'].update(run_dut_benches())
+
+    history = [h for h in load_history(args.history) if h.get('scale') == args.scale]
+    regressions = find_regressions(history, entry, args.threshold)
+
+    print("%-28s %10s %12s %14s %14s %8s" % ("workload", "wall (s)", "cycles", "cycles/s", "events/s", "change"))
+    for name, r in entry['results'].items():
+        print("%-28s %10.3f %12d %14.0f %14s %8s" % (
+            name,
+            r['wall_time'],
+            r['cycles'],
+            r['cycles_per_s'] or 0,
+            "%.0f" % r['events_per_s'] if r['events_per_s'] else '-',
+            "%+.1f%%" % (r['change']*100) if 'change' in r else '-'
+        ))
+
+    if not args.no_save:
+        full = load_history(args.history)
+        full.append(entry)
+        with open(args.history, 'w') as f:
+            json.dump(full, f, indent=2)
+
+    if regressions:
+        print("")
+        for name, change in regressions:
+            print("REGRESSION: %s %.1f%% slower than baseline" % (name, -change*100))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
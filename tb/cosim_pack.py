@@ -0,0 +1,212 @@
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Packed bus cosimulation
+#
+# A plain Cosimulation passes every signal in $from_myhdl/$to_myhdl
+# separately, and each one costs a VPI put or value change callback per
+# update.  generate_wrapper() rewrites a test_*.v wrapper so that each
+# direction is a single packed vector, from_myhdl_packed and to_myhdl_packed,
+# sliced back into the original nets on the Verilog side.
+# PackedCosimulation does the matching split on the Python side, so benches
+# keep using their individual Signals unchanged.
+#
+# Values from Verilog arrive as hex digits, so each $to_myhdl field starts on
+# a digit boundary and every digit belongs to one signal.  A field that is all
+# x reads as the signal's initial value and one that is all z as None, as with
+# a plain Cosimulation; partly unknown fields read as 0.
+
+import os
+import re
+
+from myhdl import *
+from myhdl._Cosimulation import Cosimulation as _Cosimulation
+from myhdl._Cosimulation import CosimulationError, _error, _MAXLINE
+
+FROM_NAME = 'from_myhdl_packed'
+TO_NAME = 'to_myhdl_packed'
+
+
+def _find_call(text, task):
+    """Return (start, end) of a $from_myhdl/$to_myhdl call including ');'"""
+    m = re.search(r'\$%s\s*\(' % task, text)
+    if not m:
+        raise Exception("No $%s call found" % task)
+    end = text.index(');', m.end())
+    return m.start(), end+2
+
+
+def parse_wrapper(text):
+    """Return (from_names, to_names) in wrapper order"""
+    lists = []
+    for task in ('from_myhdl', 'to_myhdl'):
+        start, end = _find_call(text, task)
+        body = text[start:end]
+        body = body[body.index('(')+1:body.rindex(')')]
+        lists.append([n.strip() for n in body.split(',') if n.strip()])
+    return lists[0], lists[1]
+
+
+def digit_width(width):
+    """Width of a $to_myhdl field, padded to whole hex digits"""
+    return -(-width // 4) * 4
+
+
+def pack(signals):
+    """Pack signal values into one int, first signal in the most significant bits"""
+    v = 0
+    for s in signals:
+        w = len(s)
+        v = (v << w) | (int(s._val) & ((1 << w) - 1))
+    return v
+
+
+def unpack(value, signals):
+    """Split a hex value string from Verilog into per signal values
+
+    Returns values in signal order, using the same rules as Cosimulation for
+    unknown bits: all x gives the initial value, all z gives None.
+    """
+    nd = sum(digit_width(len(s)) for s in signals) // 4
+    value = value.rjust(nd, '0')
+
+    res = []
+    k = len(value) - nd
+    for s in signals:
+        d = value[k:k + digit_width(len(s)) // 4]
+        k += len(d)
+        if not d.strip('xX'):
+            res.append(s._init)
+        elif not d.strip('zZ'):
+            res.append(None)
+        else:
+            try:
+                v = int(d, 16)
+            except ValueError:
+                v = intbv(0)
+            else:
+                if s._nrbits and s._min is not None and s._min < 0:
+                    if v >= (1 << (s._nrbits - 1)):
+                        v |= (-1 << s._nrbits)
+            res.append(v)
+    return res
+
+
+def generate_wrapper(text, from_fields, to_fields):
+    """Rewrite wrapper source to pass packed vectors through the cosim interface
+
+    from_fields, to_fields: lists of (name, width, init), first field in the
+    most significant bits; to_fields are padded to whole hex digits
+    """
+
+    # replace the interface calls, keeping preprocessor lines out of them
+    for task, name in (('from_myhdl', FROM_NAME), ('to_myhdl', TO_NAME)):
+        start, end = _find_call(text, task)
+        text = text[:start] + "$%s(\n        %s\n    );" % (task, name) + text[end:]
+
+    # nets driven from MyHDL become wires driven from the packed vector
+    for name, width, init in from_fields:
+        pat = re.compile(r'^(\s*)reg(\s*\[[^\]]+\])?\s+%s\s*(=\s*[^;]+)?;' % name, re.M)
+        text, n = pat.subn(lambda m: "%swire%s %s;" % (m.group(1), m.group(2) or '', name), text)
+        if not n:
+            raise Exception("No reg declaration found for %s" % name)
+
+    from_width = sum(f[1] for f in from_fields)
+    to_width = sum(digit_width(f[1]) for f in to_fields)
+
+    init = 0
+    for name, width, val in from_fields:
+        init = (init << width) | (int(val) & ((1 << width) - 1))
+
+    lines = ["// packed cosimulation interface, generated by cosim_pack"]
+    lines.append("reg [%d:0] %s = %d'h%x;" % (from_width-1, FROM_NAME, from_width, init))
+    lines.append("wire [%d:0] %s;" % (to_width-1, TO_NAME))
+    lines.append("")
+
+    lsb = from_width
+    for name, width, val in from_fields:
+        lsb -= width
+        lines.append("assign %s = %s[%d:%d];" % (name, FROM_NAME, lsb+width-1, lsb))
+    lines.append("")
+
+    lsb = to_width
+    for name, width, val in to_fields:
+        pw = digit_width(width)
+        lsb -= pw
+        lines.append("assign %s[%d:%d] = %s;" % (TO_NAME, lsb+width-1, lsb, name))
+        if pw > width:
+            lines.append("assign %s[%d:%d] = 0;" % (TO_NAME, lsb+pw-1, lsb+width))
+    lines.append("")
+
+    m = re.search(r'^initial begin\s*\n\s*// myhdl integration', text, re.M)
+    if not m:
+        raise Exception("No myhdl integration block found")
+
+    return text[:m.start()] + '\n'.join(lines) + '\n' + text[m.start():]
+
+
+class PackedCosimulation(_Cosimulation):
+    """Cosimulation with one packed vector per direction
+
+    from_names, to_names: signal names in packed order, as returned by
+    parse_wrapper; signals are looked up in kwargs like Cosimulation
+    """
+    def __init__(self, exe, from_names, to_names, **kwargs):
+        for n in from_names + to_names:
+            if n not in kwargs:
+                raise CosimulationError(_error.SigNotFound, n)
+
+        self._packFrom = [kwargs[n] for n in from_names]
+        self._packTo = [kwargs[n] for n in to_names]
+
+        from_sig = Signal(intbv(0)[max(sum(len(s) for s in self._packFrom), 1):])
+        to_sig = Signal(intbv(0)[max(sum(digit_width(len(s)) for s in self._packTo), 1):])
+
+        super(PackedCosimulation, self).__init__(exe, **{FROM_NAME: from_sig, TO_NAME: to_sig})
+
+        # wait on the individual signals
+        self._fromSigs = list(self._packFrom)
+
+    def _get(self):
+        if not self._getMode:
+            return
+        buf = os.read(self._rt, _MAXLINE).decode()
+        if not buf:
+            raise CosimulationError(_error.SimulationEnd)
+        e = buf.split()
+        for i in range(1, len(e), 2):
+            if e[i] != TO_NAME:
+                continue
+            for s, v in zip(self._packTo, unpack(e[i+1], self._packTo)):
+                s.next = v
+
+        self._getMode = 0
+
+    def _put(self, time):
+        buflist = [repr(time)]
+        if self._hasChange:
+            self._hasChange = 0
+            buflist.append("%x" % pack(self._packFrom))
+        os.write(self._wf, (" ".join(buflist)).encode())
+        self._getMode = 1
@@ -0,0 +1,191 @@
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Idle-time fast-forward
+#
+# Long clock stretches (I2CMem latency) and delays leave the bench toggling
+# the clock for thousands of cycles in which nothing happens.  FastForward
+# replaces the clock generator and stops the clock once the watched signals
+# have been stable for a number of cycles and all idle conditions hold.  The
+# clock is restarted, on the original clock grid, at the next scheduled
+# MyHDL event (a pending delay() in some model) or as soon as a watched
+# signal changes, whichever comes first.
+#
+# Activity is tracked by a separate process that only wakes on watched
+# signal changes.  The clock itself runs free, like a plain clock generator,
+# until settle cycles after the last change, and only then are the idle
+# conditions and the event queue looked at.
+#
+# Processes blocked on clk.posedge see no edges while the clock is stopped,
+# so this is only exact when every clocked model is polling for a change of
+# a watched signal and not counting cycles.  settle must be longer than the
+# longest cycle count a model runs with its outputs stable (for I2CMaster,
+# the SCL high and low times); add idle conditions for anything else.  Skips
+# that end on a watched signal change can reorder processes that race on the
+# same clock edge, skips that end on a scheduled event do not.
+#
+# next_event_time() reads the MyHDL kernel's pending event list, which is not
+# public API.  On MyHDL versions other than those in MYHDL_VERSIONS, or when
+# the internals are missing, FastForward prints a warning and runs as a plain
+# clock generator.
+
+import myhdl
+from myhdl import *
+from myhdl import _simulator
+from myhdl._Waiter import _Waiter
+
+# MyHDL releases the kernel internals were checked against
+MYHDL_VERSIONS = ('0.10', '0.11')
+
+
+def supported():
+    """True when the MyHDL internals used by next_event_time() are available"""
+    version = '.'.join(myhdl.__version__.split('.')[:2])
+    return (version in MYHDL_VERSIONS and
+            isinstance(getattr(_simulator, '_futureEvents', None), list) and
+            'hasRun' in getattr(_Waiter, '__slots__', ()))
+
+
+def next_event_time():
+    """Time of the earliest pending MyHDL event, or None"""
+    t = None
+    for et, event in _simulator._futureEvents:
+        # skip stale triggers of waiters that were already resumed
+        if isinstance(event, _Waiter) and getattr(event, 'hasRun', 0):
+            continue
+        if t is None or et < t:
+            t = et
+    return t
+
+
+class FastForward(object):
+    def __init__(self):
+        self.has_logic = False
+        self.skips = 0
+        self.skipped_cycles = 0
+        self.enabled = True
+
+    def create_logic(self,
+                clk,
+                watch,
+                idle=(),
+                period=8,
+                settle=16,
+                min_skip=32,
+                max_skip=None,
+                name=None
+            ):
+
+        # watch: signals that end a skip when they change
+        # idle: callables that must all return True before skipping
+        # period: clock period, first rising edge at period/2 as with
+        #   @always(delay(period//2))
+        # settle: cycles watched signals must be stable before skipping
+        # min_skip: shortest skip worth stopping the clock for, in cycles
+        # max_skip: longest skip in cycles, None for no limit
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
+
+        assert period % 2 == 0
+
+        half = period // 2
+        watch = tuple(watch)
+
+        can_skip = supported()
+        if not can_skip:
+            print("Warning: fast-forward needs MyHDL %s, running a plain clock with MyHDL %s" % (" or ".join(MYHDL_VERSIONS), myhdl.__version__))
+
+        # time of the last watched signal change
+        state = {'active': 0}
+
+        @instance
+        def activity():
+            while True:
+                yield watch
+                state['active'] = now()
+
+        def skip_cycles(t_edge, t):
+            # number of whole cycles to skip so that the first rising edge
+            # after the skip is the first one at or after the event at t
+            n = max(0, -(-(t - t_edge) // period))
+            if max_skip is not None:
+                n = min(n, max_skip)
+            # MyHDL resumes processes waiting on the same edge in reverse
+            # order every cycle, keep the parity so their order is unchanged
+            n -= n % 2
+            return n if n >= min_skip else 0
+
+        @instance
+        def logic():
+            d_half = delay(half)
+            wait_rise = half
+            t_retry = 0
+
+            while True:
+                # run free until the watched signals could have settled
+                t_check = max(state['active'] + settle*period, t_retry)
+                for k in range(max(1, -(-(t_check - now()) // period))):
+                    if wait_rise == half:
+                        yield d_half
+                    elif wait_rise:
+                        yield delay(wait_rise)
+                    clk.next = 1
+                    yield d_half
+                    clk.next = 0
+                    wait_rise = half
+
+                if now() < state['active'] + settle*period:
+                    # watched signals changed while running
+                    continue
+
+                if not (can_skip and self.enabled and all(f() for f in idle)):
+                    t_retry = now() + settle*period
+                    continue
+
+                t_edge = now() + half
+                t = next_event_time()
+                n = skip_cycles(t_edge, t) if t is not None else 0
+                if not n:
+                    # nothing pending, or too soon to be worth it; look
+                    # again once the next event has run
+                    t_retry = now() + settle*period if t is None else max(t, now() + period)
+                    continue
+
+                yield (delay(n*period),) + watch
+
+                # back on the clock grid
+                k = -(-(now() - t_edge) // period)
+                wait_rise = t_edge + k*period - now()
+
+                self.skips += 1
+                self.skipped_cycles += k
+                t_retry = now() + settle*period
+
+                if name is not None:
+                    print("[%s] Skipped %d cycles" % (name, k))
+
+        return instances()
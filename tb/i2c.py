@@ -23,7 +23,10 @@ THE SOFTWARE.
 """
 
 from myhdl import *
+import collections
+import math
 import mmap
+import random
 
 class I2CMaster(object):
     def __init__(self):
@@ -32,6 +35,9 @@ class I2CMaster(object):
         self.has_logic = False
         self.clk = None
         self.busy = False
+        # enter high-speed mode with master code on start from idle bus
+        self.hs_mode = False
+        self.hs_master_code = 0
 
     def init_read(self, address, length):
         self.command_queue.append(('r', address, length))
@@ -72,23 +78,47 @@ class I2CMaster(object):
                 sda_o,
                 sda_t,
                 prescale=2,
+                prescale_high=None,
+                hs_prescale=1,
+                hs_prescale_high=None,
                 name=None
             ):
 
+        # prescale: quarter bit period, SCL low time is 2*prescale
+        # prescale_high: SCL high time, None for 2*prescale
+        # hs_prescale, hs_prescale_high: same, for high-speed mode
+        # timing can be changed later through the attributes of the same name
+
         if self.has_logic:
             raise Exception("Logic already instantiated!")
 
         self.has_logic = True
         self.clk = clk
 
+        self.prescale = prescale
+        self.prescale_high = prescale_high
+        self.hs_prescale = hs_prescale
+        self.hs_prescale_high = hs_prescale_high
+
         line_state = [False]
+        hs_state = [False]
+
+        def t_quarter():
+            return self.hs_prescale if hs_state[0] else self.prescale
+
+        def t_high():
+            if hs_state[0]:
+                return self.hs_prescale*2 if self.hs_prescale_high is None else self.hs_prescale_high
+            return self.prescale*2 if self.prescale_high is None else self.prescale_high
 
         def send_start():
+            p = t_quarter()
+
             if line_state[0]:
                 sda_o.next = 1
                 sda_t.next = 1
 
-                for i in range(prescale):
+                for i in range(p):
                     yield clk.posedge
 
                 scl_o.next = 1
@@ -97,19 +127,19 @@ class I2CMaster(object):
                 while not scl_i:
                     yield clk.posedge
 
-                for i in range(prescale):
+                for i in range(p):
                     yield clk.posedge
 
             sda_o.next = 0
             sda_t.next = 0
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             scl_o.next = 0
             scl_t.next = 0
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             line_state[0] = True
@@ -118,10 +148,12 @@ class I2CMaster(object):
             if not line_state[0]:
                 return
 
+            p = t_quarter()
+
             sda_o.next = 0
             sda_t.next = 0
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             scl_o.next = 1
@@ -130,25 +162,28 @@ class I2CMaster(object):
             while not scl_i:
                 yield clk.posedge
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             sda_o.next = 1
             sda_t.next = 1
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             line_state[0] = False
+            hs_state[0] = False
 
         def send_bit(b):
             if not line_state[0]:
                 send_start()
 
+            p = t_quarter()
+
             sda_o.next = bool(b)
             sda_t.next = bool(b)
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             scl_o.next = 1
@@ -157,13 +192,13 @@ class I2CMaster(object):
             while not scl_i:
                 yield clk.posedge
 
-            for i in range(prescale*2):
+            for i in range(t_high()):
                 yield clk.posedge
 
             scl_o.next = 0
             scl_t.next = 0
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
 
@@ -174,10 +209,12 @@ class I2CMaster(object):
             if not line_state[0]:
                 send_start()
 
+            p = t_quarter()
+
             sda_o.next = 1
             sda_t.next = 1
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
             scl_o.next = 1
@@ -188,13 +225,13 @@ class I2CMaster(object):
 
             b[0] = int(sda_i)
 
-            for i in range(prescale*2):
+            for i in range(t_high()):
                 yield clk.posedge
 
             scl_o.next = 0
             scl_t.next = 0
 
-            for i in range(prescale):
+            for i in range(p):
                 yield clk.posedge
 
         def send_byte(b, ack):
@@ -225,13 +262,28 @@ class I2CMaster(object):
 
                     addr = cmd[1]
 
+                    if self.hs_mode and not line_state[0]:
+                        # enter high-speed mode, master code is not acknowledged
+                        yield send_start()
+
+                        ack = []
+                        yield send_byte(0x08 | (self.hs_master_code & 7), ack)
+
+                        if not ack[0]:
+                            print("[%s] Master code acknowledged" % name)
+
+                        if name is not None:
+                            print("[%s] Entered HS mode" % name)
+
+                        hs_state[0] = True
+
                     if cmd[0] == 'w':
                         # write command
 
-                        data = cmd[2]
+                        data = bytearray(cmd[2])
 
                         if name is not None:
-                            print("[%s] Write data a:0x%02x d:%s" % (name, addr, " ".join(("{:02x}".format(c) for c in bytearray(data)))))
+                            print("[%s] Write data a:0x%02x d:%s" % (name, addr, " ".join(("{:02x}".format(c) for c in data))))
 
                         yield send_start()
 
@@ -287,6 +339,60 @@ class I2CMem(object):
         self.size = size
         self.mem = mmap.mmap(-1, size)
         self.has_logic = False
+        self.hs_mode = False
+        self.hs_count = 0
+        # fault plan, see add_fault, and (time, type, transaction, byte) of
+        # each injected fault
+        self.faults = []
+        self.fault_log = []
+        self.transaction_count = 0
+        # random.Random of each latency dict with ranges, keyed by id() and
+        # holding the dict so the id stays valid
+        self.latency_rngs = {}
+        self.reset_timing()
+
+    def reset_timing(self):
+        # minimum SCL low and high times seen, per mode ('fs' or 'hs')
+        self.scl_timing = {}
+
+    def add_fault(self, type, transaction=None, byte=None, ptr=None, address=None, count=1, **kwargs):
+        # add a fault to the fault plan, returns the plan entry
+        # type: 'nack' to NACK the address or a written byte, 'stuck_sda' to
+        #   hold SDA low for cycles SCL clock pulses (default 16), 'flip' to
+        #   invert bit (default 0) of a read byte, 'stretch' to hold SCL low
+        #   for time (default 1000) before the byte; after a NACK or stuck
+        #   SDA the model ignores the bus until the next start
+        # The fault applies to the first byte that matches all of the given
+        # keys: transaction number (address matches since the model was
+        # created, from 0), byte index (0 is the address byte, then the
+        # pointer and data bytes), memory address ptr of a data byte, and
+        # device address.  count limits how often it fires, None for always.
+        f = dict(kwargs, type=type, transaction=transaction, byte=byte, ptr=ptr, address=address, count=count)
+        self.faults.append(f)
+        return f
+
+    def clear_faults(self):
+        self.faults = []
+
+    def _fault(self, types, transaction, byte, ptr, address, name=None):
+        for f in self.faults:
+            if f['type'] not in types or f['count'] == 0:
+                continue
+            if f['transaction'] is not None and f['transaction'] != transaction:
+                continue
+            if f['byte'] is not None and f['byte'] != byte:
+                continue
+            if f['ptr'] is not None and f['ptr'] != ptr:
+                continue
+            if f['address'] is not None and f['address'] != address:
+                continue
+            if f['count'] is not None:
+                f['count'] -= 1
+            self.fault_log.append((now(), f['type'], transaction, byte))
+            if name is not None:
+                print("[%s] Inject %s, transaction %d byte %d" % (name, f['type'], transaction, byte))
+            return f
+        return None
 
     def read_mem(self, address, length):
         self.mem.seek(address)
@@ -296,6 +402,27 @@ class I2CMem(object):
         self.mem.seek(address)
         self.mem.write(data)
 
+    # data access from the bus, overridden by device models
+
+    def _select(self, address, rw, ptr):
+        # address matched, returns the pointer for the transfer
+        return ptr
+
+    def _set_pointer(self, ptr):
+        # pointer written, returns the pointer for the data bytes
+        return ptr
+
+    def _read_byte(self, ptr):
+        # returns the byte at ptr and the next pointer
+        self.mem.seek(ptr)
+        return self.mem.read(1)[0], ptr + 1
+
+    def _write_byte(self, ptr, v):
+        # returns the next pointer
+        self.mem.seek(ptr)
+        self.mem.write(bytes(bytearray([v])))
+        return ptr + 1
+
     def create_logic(self,
                 scl_i,
                 scl_o,
@@ -305,15 +432,78 @@ class I2CMem(object):
                 sda_t,
                 abw=2,
                 address=0x50,
+                address_mask=0x7f,
+                map_address=False,
                 latency=0,
+                track_timing=False,
                 name=None
             ):
+
+        # address: device address, or a list of them
+        # address_mask: address bits compared, as device_address_mask in
+        #   i2c_slave; with a list, each entry is masked
+        # map_address: put the device index above the abw pointer bytes, the
+        #   unmasked address bits (24C16 style) and the position in the list
+        #   select a block of memory, so one model emulates several devices
+        # latency: clock stretch before data bytes, one of
+        #   int: the same stretch before every read and write data byte
+        #   dict: per phase, 'address' before the address ACK, 'first' before
+        #     the first data byte, 'next' before each following byte ('first'
+        #     defaults to 'next'); values are ints or (min, max) drawn
+        #     uniformly from a random.Random seeded with the 'seed' entry
+        #   callable(ptr, rw): returns the stretch before the byte at ptr, ptr
+        #     is None for the address ACK
+        #   Kept as the latency attribute, can be changed while running.
+        # track_timing: record minimum SCL low and high times in scl_timing,
+        #   costs a process that wakes on every bus edge
         
         if self.has_logic:
             raise Exception("Logic already instantiated!")
 
         self.has_logic = True
 
+        self.latency = latency
+
+        if isinstance(address, int):
+            address = [address]
+
+        # device index of each 7 bit address, None if not matched
+        match = [None]*128
+        free = [b for b in range(7) if not address_mask & (1 << b)]
+        for k, a in enumerate(address):
+            for a2 in range(128):
+                if match[a2] is None and (a2 & address_mask) == (a & address_mask):
+                    index = 0
+                    for i, b in enumerate(free):
+                        index |= ((a2 >> b) & 1) << i
+                    match[a2] = (k << len(free)) | index
+
+        ptr_mask = (1 << 8*abw) - 1
+
+        def get_latency(phase, ptr, rw):
+            lat = self.latency
+            if callable(lat):
+                return lat(ptr, rw)
+            if isinstance(lat, dict):
+                v = lat.get(phase, lat.get('next', 0) if phase == 'first' else 0)
+                if isinstance(v, tuple):
+                    if id(lat) not in self.latency_rngs:
+                        self.latency_rngs[id(lat)] = (lat, random.Random(lat.get('seed')))
+                    return self.latency_rngs[id(lat)][1].randint(*v)
+                return v
+            return lat if phase != 'address' else 0
+
+        def stretch_latency(lat):
+            # hold SCL low while the data is fetched
+            if lat > 0:
+                if scl_i:
+                    yield scl_i.negedge
+
+                scl_o.next = 0
+                scl_t.next = 0
+
+                yield delay(lat)
+
         def send_bit(b):
             if scl_i:
                 yield scl_i.negedge
@@ -365,6 +555,37 @@ class I2CMem(object):
                 yield from send_bit(b & (1 << 7-i))
             yield receive_bit(ack)
 
+        def stretch(f):
+            # hold SCL low, released by the next bit
+            if scl_i:
+                yield scl_i.negedge
+
+            scl_o.next = 0
+            scl_t.next = 0
+
+            yield delay(f.get('time', 1000))
+
+        def fault_bit(f):
+            if f['type'] == 'nack':
+                yield send_bit(1)
+                return
+
+            # hold SDA low for a number of SCL clock pulses
+            if scl_i:
+                yield scl_i.negedge
+
+            scl_o.next = 1
+            scl_t.next = 1
+            sda_o.next = 0
+            sda_t.next = 0
+
+            for i in range(f.get('cycles', 16)):
+                yield scl_i.posedge
+                yield scl_i.negedge
+
+            sda_o.next = 1
+            sda_t.next = 1
+
         def receive_byte(b, ack):
             if len(b) == 0:
                 b.append(0)
@@ -388,7 +609,15 @@ class I2CMem(object):
                 sda_o.next = 1
                 sda_t.next = 1
 
-                yield sda_i.negedge
+                if self.hs_mode:
+                    # also look for the stop that ends high-speed mode
+                    yield sda_i
+                    if sda_i:
+                        if scl_i:
+                            self.hs_mode = False
+                        continue
+                else:
+                    yield sda_i.negedge
 
                 if scl_i:
                     # start condition
@@ -413,45 +642,83 @@ class I2CMem(object):
                             if name is not None:
                                 print("[%s] Got stop bit" % name)
                             line_active = False
+                            self.hs_mode = False
                             break
                         elif addr == 'start':
-                            # Stop bit
+                            # Repeated start, read the address again
                             if name is not None:
                                 print("[%s] Got repeated start bit" % name)
+                            continue
+
+                        if addr & 0xf8 == 0x08:
+                            # high-speed mode master code, not acknowledged
+                            if name is not None:
+                                print("[%s] Got HS master code %d" % (name, addr & 7))
+                            self.hs_mode = True
+                            self.hs_count += 1
                             break
 
                         rw = addr & 1
                         addr = addr >> 1
 
-                        if addr == address:
+                        index = match[addr]
+
+                        if index is not None:
                             # address for me
+                            trans = self.transaction_count
+                            self.transaction_count += 1
+
+                            yield stretch_latency(get_latency('address', None, rw))
+
+                            f = self._fault(('nack', 'stuck_sda', 'stretch'), trans, 0, None, addr, name)
+                            if f is not None:
+                                if f['type'] == 'stretch':
+                                    yield stretch(f)
+                                else:
+                                    # NACK or hold SDA low, then wait for start
+                                    yield fault_bit(f)
+                                    break
+
                             yield send_bit(0)
 
+                            if map_address:
+                                ptr = (index << 8*abw) | (ptr & ptr_mask)
+                            ptr = self._select(addr, rw, ptr)
+
+                            byte = 1
+                            first = True
+                            abort = False
+
                             if rw:
                                 # read
                                 if name is not None:
                                     print("[%s] Address matched (read)" % name)
 
                                 while True:
-                                    if latency > 0:
-                                        if scl_i:
-                                            yield scl_i.negedge
-
-                                        scl_o.next = 0
-                                        scl_t.next = 0
+                                    yield stretch_latency(get_latency('first' if first else 'next', ptr, rw))
+                                    first = False
 
-                                        yield delay(latency)
-
-                                    self.mem.seek(ptr)
-                                    v = self.mem.read(1)[0]
+                                    v, next_ptr = self._read_byte(ptr)
                                     ack = []
 
+                                    f = self._fault(('stretch', 'flip', 'stuck_sda'), trans, byte, ptr, addr, name)
+                                    if f is not None:
+                                        if f['type'] == 'stretch':
+                                            yield stretch(f)
+                                        elif f['type'] == 'flip':
+                                            v ^= 1 << f.get('bit', 0)
+                                        elif f['type'] == 'stuck_sda':
+                                            yield fault_bit(f)
+                                            abort = True
+                                            break
+
                                     yield send_byte(v, ack)
 
                                     if name is not None:
                                         print("[%s] Read data a:0x%0*x d:%02x" % (name, abw*2, ptr, v))
 
-                                    ptr = ptr + 1
+                                    ptr = next_ptr
+                                    byte += 1
 
                                     if ack[0]:
                                         if name is not None:
@@ -462,49 +729,1006 @@ class I2CMem(object):
                                 if name is not None:
                                     print("[%s] Address matched (write)" % name)
 
-                                ptr = 0
+                                p = bytearray()
                                 for k in range(abw):
                                     v = []
-                                    yield receive_byte(v, 0)
-                                    ptr = (ptr << 8) | v[0]
+                                    ack = 0
+                                    f = self._fault(('stretch', 'stuck_sda', 'nack'), trans, byte, None, addr, name)
+                                    if f is not None:
+                                        if f['type'] == 'stretch':
+                                            yield stretch(f)
+                                        elif f['type'] == 'stuck_sda':
+                                            yield fault_bit(f)
+                                            abort = True
+                                            break
+                                        elif f['type'] == 'nack':
+                                            ack = 1
+                                    yield receive_byte(v, ack)
+                                    if type(v[0]) is str:
+                                        # stop or repeated start before the
+                                        # whole pointer, keep the old one
+                                        break
+                                    p.append(v[0])
+                                    byte += 1
+                                    if ack:
+                                        abort = True
+                                        break
+
+                                if abort:
+                                    break
+
+                                if v[0] == 'stop':
+                                    if name is not None:
+                                        print("[%s] Got stop bit" % name)
+                                    line_active = False
+                                    self.hs_mode = False
+                                    break
+                                elif v[0] == 'start':
+                                    if name is not None:
+                                        print("[%s] Got repeated start bit" % name)
+                                    continue
+
+                                ptr = 0
+                                for b in p:
+                                    ptr = (ptr << 8) | b
+
+                                if map_address:
+                                    ptr |= index << 8*abw
+                                ptr = self._set_pointer(ptr)
 
                                 if name is not None:
                                     print("[%s] Set address pointer 0x%0*x" % (name, abw*2, ptr))
                                 
                                 while True:
-                                    if latency > 0:
-                                        if scl_i:
-                                            yield scl_i.negedge
-
-                                        scl_o.next = 0
-                                        scl_t.next = 0
-
-                                        yield delay(latency)
+                                    yield stretch_latency(get_latency('first' if first else 'next', ptr, rw))
+                                    first = False
 
                                     v = []
-                                    yield receive_byte(v, 0)
+                                    ack = 0
+                                    f = self._fault(('stretch', 'stuck_sda', 'nack'), trans, byte, ptr, addr, name)
+                                    if f is not None:
+                                        if f['type'] == 'stretch':
+                                            yield stretch(f)
+                                        elif f['type'] == 'stuck_sda':
+                                            yield fault_bit(f)
+                                            abort = True
+                                            break
+                                        elif f['type'] == 'nack':
+                                            ack = 1
+                                    yield receive_byte(v, ack)
                                     if v[0] == 'stop':
                                         # Stop bit
                                         if name is not None:
                                             print("[%s] Got stop bit" % name)
                                         line_active = False
+                                        self.hs_mode = False
                                         break
                                     elif v[0] == 'start':
                                         # Repeated start
                                         if name is not None:
                                             print("[%s] Got repeated start bit" % name)
                                         break
-                                    self.mem.seek(ptr)
-                                    self.mem.write(bytes(bytearray([v[0]])))
+                                    if ack:
+                                        # byte not accepted, wait for start
+                                        abort = True
+                                        break
+                                    next_ptr = self._write_byte(ptr, v[0])
 
                                     if name is not None:
                                         print("[%s] Write data a:0x%0*x d:%02x" % (name, abw*2, ptr, v[0]))
 
-                                    ptr = ptr + 1
+                                    ptr = next_ptr
+                                    byte += 1
+
+                            if abort:
+                                break
                         else:
                             # no match, wait for start
                             break
 
+        if track_timing:
+            # track SCL timing, hs_mode is tracked in logic
+            timing = {'t_fall': None, 't_rise': None}
+
+            def handle(t, cond, scl, sda):
+                if cond in ('start', 'repeated_start'):
+                    # do not measure high time across it
+                    timing['t_rise'] = None
+                elif not decoder.active:
+                    pass
+                elif cond == 'rise':
+                    if timing['t_fall'] is not None:
+                        self._update_timing(0, t - timing['t_fall'])
+                    timing['t_rise'] = t
+                elif cond == 'fall':
+                    if timing['t_rise'] is not None:
+                        self._update_timing(1, t - timing['t_rise'])
+                    timing['t_fall'] = t
+                    timing['t_rise'] = None
+
+            decoder = I2CLineDecoder()
+            decoder.listeners.append(handle)
+            monitor = decoder.create_logic(scl_i, sda_i)
+
         return instances()
 
+    def _update_timing(self, index, t):
+        mode = 'hs' if self.hs_mode else 'fs'
+        v = self.scl_timing.setdefault(mode, [None, None])
+        if v[index] is None or t < v[index]:
+            v[index] = t
+
+
+# I2C device model with a register table indexed by the pointer.  Pointers
+# without a register fall back to the flat memory of I2CMem.  Use
+# create_logic with the pointer width of the device, usually abw=1.
+class I2CRegisterDevice(I2CMem):
+    def __init__(self, size = 256):
+        super(I2CRegisterDevice, self).__init__(size)
+        # register per pointer value, None where unmapped
+        self.regs = [None]*size
+        self.offset = 0
+        self.latch = 0
+
+    def add_register(self,
+                ptr,
+                width=1,
+                value=0,
+                mask=None,
+                clear_on_read=0,
+                read=None,
+                write=None,
+                next=None,
+                byteorder='big',
+                name=None
+            ):
+
+        # ptr: pointer of the register, returns the register entry
+        # width: register size in bytes, transferred in byteorder
+        # value: reset value, kept in the 'value' entry
+        # mask: writable bits, None for all; other bits are read-only
+        # clear_on_read: bits cleared after the register is read
+        # read: read(reg) called before the register is read, returns the
+        #   value to send or None for reg['value']
+        # write: write(reg, value) called after a complete write with the
+        #   written value, once the writable bits have been updated
+        # next: pointer after the last byte, None for ptr+1, ptr to stay on
+        #   the register
+
+        if mask is None:
+            mask = (1 << 8*width) - 1
+        if next is None:
+            next = (ptr + 1) % self.size
+        reg = dict(ptr=ptr, width=width, value=value, mask=mask, clear_on_read=clear_on_read,
+            read=read, write=write, next=next, byteorder=byteorder, name=name)
+        self.regs[ptr] = reg
+        return reg
+
+    def read_reg(self, ptr):
+        return self.regs[ptr]['value']
+
+    def write_reg(self, ptr, value):
+        self.regs[ptr]['value'] = value
+
+    def _shift(self, reg):
+        if reg['byteorder'] == 'big':
+            return 8*(reg['width'] - 1 - self.offset)
+        return 8*self.offset
+
+    def _select(self, address, rw, ptr):
+        # a new transfer starts at the first byte of the register
+        self.offset = 0
+        return ptr
+
+    def _set_pointer(self, ptr):
+        self.offset = 0
+        return ptr
+
+    def _read_byte(self, ptr):
+        reg = self.regs[ptr]
+        if reg is None:
+            return super(I2CRegisterDevice, self)._read_byte(ptr)
+
+        if self.offset == 0:
+            # latch the whole register on the first byte
+            v = None
+            if reg['read'] is not None:
+                v = reg['read'](reg)
+            if v is None:
+                v = reg['value']
+            self.latch = v
+            reg['value'] &= ~reg['clear_on_read']
+
+        v = (self.latch >> self._shift(reg)) & 0xff
+
+        self.offset += 1
+        if self.offset < reg['width']:
+            return v, ptr
+        self.offset = 0
+        return v, reg['next']
+
+    def _write_byte(self, ptr, v):
+        reg = self.regs[ptr]
+        if reg is None:
+            return super(I2CRegisterDevice, self)._write_byte(ptr, v)
+
+        if self.offset == 0:
+            self.latch = 0
+        self.latch |= v << self._shift(reg)
+
+        self.offset += 1
+        if self.offset < reg['width']:
+            return ptr
+        self.offset = 0
+
+        # partial writes are dropped, only complete registers are updated
+        reg['value'] = (reg['value'] & ~reg['mask']) | (self.latch & reg['mask'])
+        if reg['write'] is not None:
+            reg['write'](reg, self.latch)
+        return reg['next']
+
+
+class I2CLineDecoder(object):
+    def __init__(self):
+        self.has_logic = False
+        # functions called as f(t, cond, scl, sda) on every change
+        #   cond: 'start', 'repeated_start', 'stop', 'rise' and 'fall' for
+        #   SCL edges, 'data' for an SDA change while SCL is low, None when
+        #   only one of the extra signals changed
+        self.listeners = []
+        # between a START and a STOP
+        self.active = False
+
+    def create_logic(self,
+                scl_i,
+                sda_i,
+                sens=(),
+                name=None
+            ):
+
+        # scl_i, sda_i: resolved bus lines
+        # sens: extra signals to wake up on
+        #
+        # One process per bus classifies the line changes for every observer
+        # subscribed to it.  An SCL edge takes precedence over a simultaneous
+        # SDA change.
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
 
+        @instance
+        def logic():
+            last_scl = int(scl_i)
+            last_sda = int(sda_i)
+
+            wait = (scl_i, sda_i) + tuple(sens)
+
+            while True:
+                yield wait
+
+                t = now()
+                scl = int(scl_i)
+                sda = int(sda_i)
+
+                if scl != last_scl:
+                    cond = 'rise' if scl else 'fall'
+                elif sda != last_sda:
+                    if not scl:
+                        cond = 'data'
+                    elif sda:
+                        # stop condition
+                        cond = 'stop'
+                        self.active = False
+                    else:
+                        # start condition
+                        cond = 'repeated_start' if self.active else 'start'
+                        self.active = True
+                else:
+                    cond = None
+
+                last_scl = scl
+                last_sda = sda
+
+                for f in self.listeners:
+                    f(t, cond, scl, sda)
+
+        return instances()
+
+
+class I2CMonitor(object):
+    def __init__(self):
+        # events, (time, kind, value, driver)
+        #   kind: 'start', 'repeated_start', 'address', 'data', 'ack', 'nack', 'stop'
+        #   value: (address, rw) for 'address', byte value for 'data', else None
+        #   driver: name of the driver that pulled SDA low, '+' separated if
+        #   more than one, None if SDA was not pulled low or drivers are unknown
+        self.queue = []
+        # transactions, (start time, end time, address, rw, data, acks)
+        #   ended by a stop or repeated start; acks is a list of bools, one
+        #   per byte including the address byte
+        self.transactions = []
+        # functions called with each event, whether or not it is recorded
+        self.listeners = []
+        # line decoder, other observers of the same lines can subscribe to it
+        self.decoder = I2CLineDecoder()
+        self.has_logic = False
+        self.record = True
+        self.sync = Signal(intbv(0))
+        self.timescale = 1.0
+        self.reset_stats()
+        # the simulation starts at 0, now() may still hold the end time of
+        # an earlier one
+        self.stats_start = 0
+
+    def reset_stats(self):
+        # clear the bus statistics, call from the simulation to start a window
+        self.stats_start = now()
+        # busy time of completed busy periods, START to STOP
+        self.busy_time = 0
+        self.busy_start = None
+        self.last_stop = None
+        # bus free time between a STOP and the next START, time: count
+        self.idle_gaps = collections.Counter()
+        # per address, transactions, data bytes, NACKs and clock stretch time
+        self.addr_stats = {}
+        # clock stretch time per driver
+        self.stretch = {}
+        # SCL rise to rise periods and ACK to next byte gaps, time: count
+        self.scl_periods = collections.Counter()
+        self.byte_gaps = collections.Counter()
+
+    def _addr_stats(self, addr):
+        if addr not in self.addr_stats:
+            self.addr_stats[addr] = {'transactions': 0, 'bytes': 0, 'nacks': 0, 'stretch': 0}
+        return self.addr_stats[addr]
+
+    def stats(self):
+        # bus statistics since reset_stats(), times in simulation units
+        #
+        # Rates are in kbps using the timescale given to create_logic.  NACKs
+        # count address and write data NACKs, not the NACK ending a read.
+        t = now()
+        busy = self.busy_time
+        if self.busy_start is not None:
+            busy += t - self.busy_start
+        span = t - self.stats_start
+
+        res = {
+            'span': span,
+            'busy_time': busy,
+            'busy_fraction': float(busy) / span if span else 0.0,
+            'transactions': sum(a['transactions'] for a in self.addr_stats.values()),
+            'bytes': sum(a['bytes'] for a in self.addr_stats.values()),
+            'nacks': sum(a['nacks'] for a in self.addr_stats.values()),
+            'idle_gaps': None,
+            'stretch': dict(self.stretch),
+            'scl_period': None,
+            'byte_gap_overhead': 0,
+            'line_kbps': None,
+            'goodput_kbps': None,
+            'goodput_ratio': None,
+            'per_address': dict((a, dict(v)) for a, v in self.addr_stats.items())
+        }
+
+        if self.idle_gaps:
+            g = sorted(self.idle_gaps.items())
+            count = sum(n for v, n in g)
+            median = None
+            k = 0
+            for v, n in g:
+                k += n
+                if k > count//2:
+                    median = v
+                    break
+            res['idle_gaps'] = {
+                'count': count,
+                'min': g[0][0],
+                'median': median,
+                'mean': float(sum(v*n for v, n in g)) / count,
+                'max': g[-1][0]
+            }
+
+        if self.scl_periods:
+            # most common period, stretched bits are outliers
+            period = self.scl_periods.most_common(1)[0][0]
+            res['scl_period'] = period
+            res['line_kbps'] = 1e6 / (period*self.timescale)
+            # time lost between bytes beyond one SCL period
+            res['byte_gap_overhead'] = sum((g - period)*n for g, n in self.byte_gaps.items() if g > period)
+
+        if busy:
+            res['goodput_kbps'] = res['bytes']*8*1e6 / (busy*self.timescale)
+            if res['line_kbps']:
+                res['goodput_ratio'] = res['goodput_kbps'] / res['line_kbps']
+
+        return res
+
+    def report(self, file=None):
+        s = self.stats()
+
+        print("I2C bus statistics over %d" % s['span'], file=file)
+        print("  busy %d (%.1f%%), %d transactions, %d data bytes, %d NACKs" % (
+            s['busy_time'], 100*s['busy_fraction'], s['transactions'], s['bytes'], s['nacks']), file=file)
+        if s['idle_gaps']:
+            g = s['idle_gaps']
+            print("  idle gaps: %d, min %d, median %d, max %d" % (g['count'], g['min'], g['median'], g['max']), file=file)
+        if s['line_kbps']:
+            print("  SCL period %d (%.1f kbps), goodput %.1f kbps (%.1f%% of line rate)" % (
+                s['scl_period'], s['line_kbps'], s['goodput_kbps'] or 0.0, 100*(s['goodput_ratio'] or 0.0)), file=file)
+            print("  inter-byte gap overhead %d" % s['byte_gap_overhead'], file=file)
+        for d in sorted(s['stretch']):
+            print("  clock stretch by %s: %d" % (d, s['stretch'][d]), file=file)
+        for a in sorted(s['per_address']):
+            v = s['per_address'][a]
+            print("  0x%02x: %d transactions, %d data bytes, %d NACKs, stretch %d" % (
+                a, v['transactions'], v['bytes'], v['nacks'], v['stretch']), file=file)
+
+    def recv(self):
+        if self.queue:
+            return self.queue.pop(0)
+        return None
+
+    def count(self):
+        return len(self.queue)
+
+    def empty(self):
+        return not self.queue
+
+    def wait(self, timeout=0):
+        if self.queue:
+            return
+        if timeout:
+            yield self.sync, delay(timeout)
+        else:
+            yield self.sync
+
+    def create_logic(self,
+                scl_i,
+                sda_i,
+                drivers=None,
+                timescale=1.0,
+                name=None
+            ):
+
+        # scl_i, sda_i: resolved bus lines
+        # drivers: dict of name to (scl_o, sda_o) of each device on the bus,
+        #   used to tell which device pulled SDA low and which one stretched
+        #   the clock
+        # timescale: ns per simulation time unit, for the rates in stats()
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
+        self.timescale = timescale
+
+        drivers = sorted((drivers or {}).items())
+
+        def sda_low_by():
+            names = [n for n, (scl_o, sda_o) in drivers if not sda_o]
+            return '+'.join(names) if names else None
+
+        def scl_low_by():
+            return [n for n, (scl_o, sda_o) in drivers if not scl_o]
+
+        st = {
+            'bits': 0,
+            'byte': 0,
+            'byte_drivers': set(),
+            'low_driver': None,
+            'trans': None,
+            'addr': None,
+            't_rise': None,
+            't_ack': None,
+            # devices that pulled SCL low, and devices still holding it
+            # low after those released it
+            'scl_owner': [],
+            'stretch_by': [],
+            't_stretch': None,
+            'last_scl': 1
+        }
+
+        def handle(t, cond, scl, sda):
+            ev = None
+
+            if st['stretch_by']:
+                for d in st['stretch_by']:
+                    self.stretch[d] = self.stretch.get(d, 0) + t - st['t_stretch']
+                if st['addr'] is not None:
+                    self._addr_stats(st['addr'])['stretch'] += t - st['t_stretch']
+                st['t_stretch'] = t
+
+            if cond in ('start', 'repeated_start', 'stop'):
+                trans = st['trans']
+                if trans is not None and self.record:
+                    trans[1] = t
+                    self.transactions.append(tuple(trans))
+                st['trans'] = None
+                st['addr'] = None
+                if cond == 'stop':
+                    ev = (t, 'stop', None, st['low_driver'])
+                    if self.busy_start is not None:
+                        self.busy_time += t - self.busy_start
+                    self.busy_start = None
+                    self.last_stop = t
+                else:
+                    ev = (t, cond, None, sda_low_by())
+                    st['trans'] = [t, None, None, None, bytearray(), []]
+                    if cond == 'start':
+                        if self.last_stop is not None and self.last_stop >= self.stats_start:
+                            self.idle_gaps[t - self.last_stop] += 1
+                        self.busy_start = t
+                st['bits'] = 0
+                st['byte'] = 0
+                st['byte_drivers'] = set()
+                st['t_rise'] = None
+                st['t_ack'] = None
+            elif cond == 'rise' and self.decoder.active:
+                # data bit
+                trans = st['trans']
+                if st['t_rise'] is not None:
+                    self.scl_periods[t - st['t_rise']] += 1
+                st['t_rise'] = t
+                if st['bits'] == 0 and st['t_ack'] is not None:
+                    self.byte_gaps[t - st['t_ack']] += 1
+                st['t_ack'] = None
+                if not sda and drivers:
+                    d = sda_low_by()
+                    if d is not None:
+                        st['byte_drivers'].add(d)
+                if st['bits'] < 8:
+                    byte = st['byte'] = (st['byte'] << 1) | sda
+                    st['bits'] += 1
+                    if st['bits'] == 8:
+                        d = '+'.join(sorted(st['byte_drivers'])) if st['byte_drivers'] else None
+                        if trans is not None and trans[2] is None:
+                            trans[2] = byte >> 1
+                            trans[3] = byte & 1
+                            st['addr'] = byte >> 1
+                            self._addr_stats(st['addr'])['transactions'] += 1
+                            ev = (t, 'address', (byte >> 1, byte & 1), d)
+                        else:
+                            if trans is not None:
+                                trans[4].append(byte)
+                            if st['addr'] is not None:
+                                self._addr_stats(st['addr'])['bytes'] += 1
+                            ev = (t, 'data', byte, d)
+                else:
+                    ev = (t, 'nack' if sda else 'ack', None, None if sda else sda_low_by())
+                    if trans is not None:
+                        if sda and st['addr'] is not None and (not trans[5] or not trans[3]):
+                            self._addr_stats(st['addr'])['nacks'] += 1
+                        trans[5].append(not sda)
+                    st['bits'] = 0
+                    st['byte'] = 0
+                    st['byte_drivers'] = set()
+                    st['t_ack'] = t
+
+            if drivers:
+                if scl:
+                    st['scl_owner'] = []
+                    st['stretch_by'] = []
+                elif st['last_scl']:
+                    st['scl_owner'] = scl_low_by()
+                    st['stretch_by'] = []
+                elif st['scl_owner']:
+                    low = scl_low_by()
+                    if not any(n in low for n in st['scl_owner']):
+                        st['stretch_by'] = low
+                        st['t_stretch'] = t
+
+            if not sda and drivers:
+                st['low_driver'] = sda_low_by()
+
+            if ev is not None:
+                for f in self.listeners:
+                    f(ev)
+
+                if self.record:
+                    self.queue.append(ev)
+                    self.sync.next = not self.sync
+
+                    if name is not None:
+                        print("[%s] %s" % (name, self.format_event(ev)))
+
+            st['last_scl'] = scl
+
+        self.decoder.listeners.append(handle)
+
+        return self.decoder.create_logic(scl_i, sda_i, sens=tuple(scl_o for n, (scl_o, sda_o) in drivers))
+
+    @staticmethod
+    def format_event(ev):
+        return "%d: %s" % (ev[0], I2CMonitor.describe_event(ev))
+
+    @staticmethod
+    def describe_event(ev):
+        t, kind, value, driver = ev
+        if kind == 'address':
+            s = "address 0x%02x %s" % (value[0], "R" if value[1] else "W")
+        elif kind == 'data':
+            s = "data %02x" % value
+        else:
+            s = kind.replace('_', ' ')
+        if driver is not None:
+            s += " (%s)" % driver
+        return s
+
+
+# I2C timing limits in ns, minimum values, from the I2C-bus specification
+I2C_TIMING = {
+    'standard': {
+        't_hd_sta': 4000,
+        't_su_sta': 4700,
+        't_su_sto': 4000,
+        't_buf': 4700,
+        't_low': 4700,
+        't_high': 4000,
+        't_su_dat': 250,
+        't_hd_dat': 0
+    },
+    'fast': {
+        't_hd_sta': 600,
+        't_su_sta': 600,
+        't_su_sto': 600,
+        't_buf': 1300,
+        't_low': 1300,
+        't_high': 600,
+        't_su_dat': 100,
+        't_hd_dat': 0
+    },
+    'fast-plus': {
+        't_hd_sta': 260,
+        't_su_sta': 260,
+        't_su_sto': 260,
+        't_buf': 500,
+        't_low': 500,
+        't_high': 260,
+        't_su_dat': 50,
+        't_hd_dat': 0
+    }
+}
+
+# maximum SCL/SDA rise time (30% to 70%) in ns
+I2C_RISE_TIME = {
+    'standard': 1000,
+    'fast': 300,
+    'fast-plus': 120
+}
+
+I2C_TIMING_PARAMS = ['t_hd_sta', 't_su_sta', 't_su_sto', 't_buf', 't_low', 't_high', 't_su_dat', 't_hd_dat']
+
+
+class I2CTimingChecker(object):
+    def __init__(self):
+        self.has_logic = False
+        self.timescale = 1.0
+        self.reset()
+
+    def reset(self):
+        # minimum observed value and number of measurements per parameter,
+        # in simulation time units
+        self.min_values = {}
+        self.counts = {}
+
+    def margins(self, grade='fast'):
+        # minimum observed value minus the limit, in ns, per measured parameter
+        limits = I2C_TIMING[grade]
+        return dict((p, self.min_values[p]*self.timescale - limits[p]) for p in self.min_values)
+
+    def violations(self, grade='fast'):
+        return [p for p, m in sorted(self.margins(grade).items()) if m < 0]
+
+    def report(self, grade='fast', file=None):
+        margins = self.margins(grade)
+        limits = I2C_TIMING[grade]
+
+        print("I2C timing against %s mode limits (ns)" % grade, file=file)
+        print("%-10s %10s %10s %10s %8s" % ("parameter", "min", "limit", "margin", "count"), file=file)
+        for p in I2C_TIMING_PARAMS:
+            if p not in self.min_values:
+                print("%-10s %10s %10d %10s %8d" % (p, '-', limits[p], '-', 0), file=file)
+                continue
+            print("%-10s %10g %10d %10g %8d%s" % (
+                p,
+                self.min_values[p]*self.timescale,
+                limits[p],
+                margins[p],
+                self.counts[p],
+                "  VIOLATION" if margins[p] < 0 else ""
+            ), file=file)
+
+    def create_logic(self,
+                scl_i=None,
+                sda_i=None,
+                decoder=None,
+                timescale=1.0,
+                name=None
+            ):
+
+        # scl_i, sda_i: resolved bus lines
+        # decoder: I2CLineDecoder to subscribe to instead, such as the
+        #   decoder of an I2CMonitor on the same lines
+        # timescale: ns per simulation time unit
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
+        self.timescale = timescale
+
+        def record(p, t):
+            if p not in self.min_values or t < self.min_values[p]:
+                self.min_values[p] = t
+            self.counts[p] = self.counts.get(p, 0) + 1
+
+        st = {
+            'active': False,
+            't_scl_rise': None,
+            't_scl_fall': None,
+            't_sda': None,
+            't_start': None,
+            't_stop': None,
+            'cond': False
+        }
+
+        def handle(t, cond, scl, sda):
+            if cond == 'rise':
+                if st['active'] and st['t_scl_fall'] is not None:
+                    record('t_low', t - st['t_scl_fall'])
+                    if st['t_sda'] is not None:
+                        record('t_su_dat', t - st['t_sda'])
+                st['t_scl_rise'] = t
+                st['cond'] = False
+            elif cond == 'fall':
+                if st['active'] and st['t_scl_rise'] is not None and not st['cond']:
+                    record('t_high', t - st['t_scl_rise'])
+                if st['t_start'] is not None:
+                    record('t_hd_sta', t - st['t_start'])
+                    st['t_start'] = None
+                st['t_scl_fall'] = t
+                st['t_sda'] = None
+            elif cond in ('start', 'repeated_start'):
+                if st['active'] and st['t_scl_rise'] is not None:
+                    record('t_su_sta', t - st['t_scl_rise'])
+                elif not st['active'] and st['t_stop'] is not None:
+                    record('t_buf', t - st['t_stop'])
+                st['active'] = True
+                st['t_start'] = t
+                st['cond'] = True
+            elif cond == 'stop':
+                if st['active'] and st['t_scl_rise'] is not None:
+                    record('t_su_sto', t - st['t_scl_rise'])
+                st['active'] = False
+                st['t_stop'] = t
+                st['cond'] = True
+            elif cond == 'data' and st['active'] and st['t_scl_fall'] is not None:
+                # data change while SCL is low
+                if st['t_sda'] is None:
+                    record('t_hd_dat', t - st['t_scl_fall'])
+                st['t_sda'] = t
+
+        if decoder is None:
+            decoder = I2CLineDecoder()
+            decoder_logic = decoder.create_logic(scl_i, sda_i)
+
+        decoder.listeners.append(handle)
+
+        return instances()
+
+
+class I2CGlitchInjector(object):
+    def __init__(self):
+        self.has_logic = False
+        # mean time between spikes on each line, 0 disables spikes
+        self.spike_interval = 0
+        # spike width range, inclusive
+        self.spike_width = (1, 1)
+        # threshold crossings added after each edge, and their width
+        self.ring_count = 0
+        self.ring_width = 1
+        self.spikes = 0
+        self.rings = 0
+
+    def create_logic(self,
+                scl_i,
+                sda_i,
+                scl_o,
+                sda_o,
+                seed=None,
+                spike_interval=0,
+                spike_width=(1, 1),
+                ring_count=0,
+                ring_width=1,
+                lines=('scl', 'sda'),
+                name=None
+            ):
+
+        # scl_i, sda_i: resolved bus lines
+        # scl_o, sda_o: lines as seen by the device under test
+        # seed: random seed, the same seed gives the same spikes
+        # spike_interval: mean time between spikes per line (exponential),
+        #   0 disables spikes
+        # spike_width: (min, max) spike width
+        # ring_count: number of extra threshold crossings after every edge,
+        #   as seen on a slow, ringing edge; 0 disables
+        # ring_width: time between those crossings
+        # lines: lines to disturb, 'scl' and/or 'sda'
+        #
+        # Spikes invert the line for their width.  Input changes during a
+        # spike or ringing are applied when it ends.  The settings are kept
+        # as attributes and can be changed while the simulation runs.
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
+
+        self.spike_interval = spike_interval
+        self.spike_width = spike_width
+        self.ring_count = ring_count
+        self.ring_width = ring_width
+
+        rng = random.Random(seed)
+
+        def line(inp, out, line_name):
+            @instance
+            def logic():
+                val = int(inp)
+                out.next = val
+                t_spike = None
+
+                while True:
+                    if t_spike is None and self.spike_interval and line_name in lines:
+                        t_spike = now() + max(1, int(rng.expovariate(1.0/self.spike_interval)))
+
+                    if t_spike is not None:
+                        yield inp, delay(max(1, t_spike - now()))
+                    else:
+                        yield inp
+
+                    if int(inp) != val:
+                        val = int(inp)
+                        if line_name in lines:
+                            # slow edge, crosses the input threshold again
+                            # ring_count times before settling
+                            for k in range(self.ring_count):
+                                out.next = val
+                                yield delay(self.ring_width)
+                                out.next = not val
+                                yield delay(self.ring_width)
+                                self.rings += 1
+                            if t_spike is not None and t_spike <= now():
+                                # spike due while ringing, draw a new one
+                                t_spike = None
+                        val = int(inp)
+                        out.next = val
+                    elif t_spike is not None and now() >= t_spike:
+                        t_spike = None
+                        if not self.spike_interval:
+                            continue
+                        w = rng.randint(*self.spike_width)
+                        if name is not None:
+                            print("[%s] %s spike, width %d" % (name, line_name, w))
+                        out.next = not val
+                        yield delay(w)
+                        val = int(inp)
+                        out.next = val
+                        self.spikes += 1
+
+            return logic
+
+        scl_logic = line(scl_i, scl_o, 'scl')
+        sda_logic = line(sda_i, sda_o, 'sda')
+
+        return instances()
+
+
+class I2CBus(object):
+    def __init__(self):
+        self.has_logic = False
+        # pull-up resistance in ohms and bus capacitance in pF, None for
+        # ideal lines that read high as soon as they are released
+        self.r_pullup = None
+        self.c_bus = None
+        # input high threshold per endpoint, fraction of VDD
+        self.thresholds = {}
+        self.timescale = 1.0
+
+    def tau(self):
+        # RC time constant in ns, 0 for ideal lines
+        if not self.r_pullup or not self.c_bus:
+            return 0.0
+        return self.r_pullup*self.c_bus*1e-3
+
+    def rise_time(self):
+        # rise time from 30% to 70% of VDD in ns
+        return self.tau()*math.log(0.7/0.3)
+
+    def rise_delay(self, endpoint):
+        # time from release until endpoint reads the line high, simulation
+        # units
+        th = self.thresholds.get(endpoint, 0.7)
+        return int(round(self.tau()*math.log(1/(1-th)) / self.timescale))
+
+    def create_logic(self,
+                drivers,
+                endpoints,
+                r_pullup=None,
+                c_bus=None,
+                thresholds=None,
+                scl_pullup=None,
+                timescale=1.0,
+                name=None
+            ):
+
+        # drivers: list of (scl_o, sda_o) of the open drain outputs
+        # endpoints: dict of name to (scl_i, sda_i) of the inputs
+        # r_pullup: pull-up resistance, ohms
+        # c_bus: bus capacitance, pF
+        # thresholds: dict of endpoint name to input high threshold as a
+        #   fraction of VDD, 0.7 (V_IH) if not given
+        # scl_pullup: active SCL pull-up enable (Hs-mode current source),
+        #   SCL reads high at every endpoint while it is set
+        # timescale: ns per simulation time unit
+        #
+        # Lines fall as soon as a driver pulls them low.  Once released, the
+        # line charges through the pull-up as 1-exp(-t/RC) and each endpoint
+        # reads it high when it crosses that endpoint's threshold.  The
+        # settings are kept as attributes and can be changed while the
+        # simulation runs.
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
+
+        self.r_pullup = r_pullup
+        self.c_bus = c_bus
+        self.thresholds = dict(thresholds or {})
+        self.timescale = timescale
+
+        endpoints = sorted(endpoints.items())
+
+        def line(outs, ins, line_name, pullup=None):
+            sens = outs + ((pullup,) if pullup is not None else ())
+
+            @instance
+            def logic():
+                while True:
+                    if not all(int(o) for o in outs):
+                        for n, s in ins:
+                            s.next = 0
+                        yield sens
+                        continue
+
+                    # released, endpoints read high in order of their
+                    # threshold crossing
+                    t0 = now()
+                    rise = sorted((self.rise_delay(n), n, s) for n, s in ins)
+                    low = False
+                    for d, n, s in rise:
+                        # wait again after a driver or pull-up event that leaves
+                        # the line released and the pull-up off
+                        while d > now() - t0 and not (pullup is not None and pullup):
+                            yield (delay(d - (now() - t0)),) + sens
+                            if not all(int(o) for o in outs):
+                                # pulled low again before reaching threshold
+                                if name is not None:
+                                    print("[%s] %s pulled low %d after release, %s did not see it high" % (name, line_name, now() - t0, n))
+                                low = True
+                                break
+                        if low:
+                            break
+                        s.next = 1
+                    else:
+                        yield sens
+
+            return logic
+
+        scl_logic = line(tuple(d[0] for d in drivers), [(n, e[0]) for n, e in endpoints], 'SCL', scl_pullup)
+        sda_logic = line(tuple(d[1] for d in drivers), [(n, e[1]) for n, e in endpoints], 'SDA')
+
+        return instances()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Offline I2C decoder
+#
+# Decodes I2C traffic from a waveform dump after the run, so long
+# simulations can run without a live monitor.  Reads VCD directly (the
+# MyHDL benches write one with traceSignals) and LXT/LXT2 dumps from the
+# cosimulation benches through GTKWave's lxt2vcd.  Only the value changes
+# of the two selected signals are kept; edge detection and bit/byte
+# assembly run on NumPy arrays.  Requires NumPy.
+#
+#     python i2c_decode.py test_i2c.vcd --scl m_scl_i --sda m_sda_i
+#     python i2c_decode.py test_i2c_master.lxt -c trans.csv -j trans.json
+#
+# Signals are matched by full hierarchical name or by the last name
+# components, the shortest match wins.  X and Z read as 1, the bus pull-up.
+
+import argparse
+import csv
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+TIMESCALE_UNITS = {'s': 1.0, 'ms': 1e-3, 'us': 1e-6, 'ns': 1e-9, 'ps': 1e-12, 'fs': 1e-15}
+
+
+def open_dump(path):
+    """Return an iterator over VCD lines, converting LXT dumps with lxt2vcd"""
+    if path.endswith('.lxt') or path.endswith('.lxt2'):
+        try:
+            p = subprocess.Popen(['lxt2vcd', path], stdout=subprocess.PIPE, universal_newlines=True)
+        except OSError:
+            raise Exception("lxt2vcd (GTKWave) is required to read %s, or dump VCD instead" % path)
+        return p.stdout
+    return open(path)
+
+
+def _match(names, want):
+    """Return the id of the shortest hierarchical name equal to or ending in want"""
+    hits = [(len(n), n) for n in names if n == want or n.endswith('.' + want)]
+    if not hits:
+        raise Exception("Signal %s not found in dump" % want)
+    return names[min(hits)[1]]
+
+
+def read_vcd(lines, signals):
+    """Read value changes of signals from VCD lines
+
+    Returns timescale in seconds and a dict of signal name to (times, values)
+    NumPy arrays, with one entry per time step (last value wins).
+    """
+    names = {}
+    scope = []
+    timescale = 1e-9
+    it = iter(lines)
+
+    # header
+    for line in it:
+        tok = line.split()
+        if not tok:
+            continue
+        if tok[0] == '$scope':
+            scope.append(tok[2])
+        elif tok[0] == '$upscope':
+            scope.pop()
+        elif tok[0] == '$var':
+            names.setdefault('.'.join(scope + [tok[4]]), tok[3])
+        elif tok[0] == '$timescale':
+            ts = tok[1:]
+            while '$end' not in ts:
+                ts += next(it).split()
+            ts = ''.join(ts[:ts.index('$end')])
+            num = ts.rstrip('afmnpsu')
+            timescale = float(num or 1) * TIMESCALE_UNITS[ts[len(num):]]
+        elif tok[0] == '$enddefinitions':
+            break
+
+    ids = dict((_match(names, s), s) for s in signals)
+    if len(ids) != len(signals):
+        raise Exception("Signals %s resolve to the same net" % ", ".join(signals))
+
+    changes = dict((i, ([], [])) for i in ids)
+    t = 0
+
+    for line in it:
+        c = line[:1]
+        if c == '#':
+            t = int(line[1:])
+        elif c in '01xzXZ':
+            ch = changes.get(line[1:].strip())
+            if ch is not None:
+                ch[0].append(t)
+                ch[1].append(0 if c == '0' else 1)
+        elif c in 'bB':
+            val, ident = line[1:].split()
+            ch = changes.get(ident)
+            if ch is not None:
+                ch[0].append(t)
+                ch[1].append(0 if val.strip('0') == '' else 1)
+
+    res = {}
+    for i, s in ids.items():
+        tt = np.array(changes[i][0], dtype=np.int64)
+        vv = np.array(changes[i][1], dtype=np.int8)
+        # keep the final value of each time step
+        last = np.r_[tt[1:] != tt[:-1], True] if len(tt) else np.zeros(0, dtype=bool)
+        res[s] = (tt[last], vv[last])
+
+    return timescale, res
+
+
+def _sample(t, v, times):
+    idx = np.searchsorted(t, times, side='right') - 1
+    out = np.ones(len(times), dtype=np.int8)
+    ok = idx >= 0
+    out[ok] = v[idx[ok]]
+    return out
+
+
+def decode(scl, sda):
+    """Decode I2C traffic from (times, values) arrays of scl and sda
+
+    Returns a list of transactions, each a dict with start and end time,
+    end ('stop', 'repeated_start' or None), address, rw, data (list of
+    bytes after the address byte) and acks (one bool per byte including the
+    address byte), and the array of all change times.
+    """
+    times = np.union1d(scl[0], sda[0])
+    if len(times) == 0:
+        return [], times
+
+    c = _sample(scl[0], scl[1], times).astype(bool)
+    d = _sample(sda[0], sda[1], times).astype(bool)
+
+    # idle bus before the first change
+    cp = np.r_[True, c[:-1]]
+    dp = np.r_[True, d[:-1]]
+
+    start = c & cp & dp & ~d
+    stop = c & cp & ~dp & d
+    rise = c & ~cp
+
+    cond_idx = np.flatnonzero(start | stop)
+    cond_t = times[cond_idx]
+    cond_start = start[cond_idx]
+
+    # assign every SCL rise to the condition before it, keep those inside
+    # a transaction
+    rise_t = times[rise]
+    bits = d[rise].astype(np.int64)
+    seg = np.searchsorted(cond_t, rise_t, side='right') - 1
+    keep = seg >= 0
+    keep[keep] = cond_start[seg[keep]]
+    rise_t = rise_t[keep]
+    bits = bits[keep]
+    seg = seg[keep]
+
+    # bit position within the transaction, 9 bits per byte with ACK
+    pos = np.arange(len(seg)) - np.searchsorted(seg, seg, side='left')
+    bitpos = pos % 9
+    byte_key = np.cumsum(bitpos == 0) - 1
+
+    nbytes = byte_key[-1] + 1 if len(byte_key) else 0
+    is_data = bitpos < 8
+    values = np.bincount(byte_key[is_data], weights=bits[is_data] << (7 - bitpos[is_data]), minlength=nbytes).astype(np.int64)
+    complete = np.bincount(byte_key, minlength=nbytes) == 9
+    acks = np.zeros(nbytes, dtype=bool)
+    acks[byte_key[bitpos == 8]] = bits[bitpos == 8] == 0
+    byte_seg = seg[bitpos == 0]
+
+    # complete bytes only, a START or STOP follows one SCL rise
+    values = values[complete]
+    acks = acks[complete]
+    byte_seg = byte_seg[complete]
+
+    bounds = np.searchsorted(byte_seg, np.arange(len(cond_t)+1), side='left')
+
+    transactions = []
+    for k in np.flatnonzero(cond_start):
+        b = values[bounds[k]:bounds[k+1]]
+        a = acks[bounds[k]:bounds[k+1]]
+        if k+1 < len(cond_t):
+            end_t = int(cond_t[k+1])
+            end = 'repeated_start' if cond_start[k+1] else 'stop'
+        else:
+            end_t = int(times[-1])
+            end = None
+        transactions.append({
+            'start': int(cond_t[k]),
+            'end': end_t,
+            'end_kind': end,
+            'address': int(b[0] >> 1) if len(b) else None,
+            'rw': int(b[0] & 1) if len(b) else None,
+            'data': [int(x) for x in b[1:]],
+            'acks': [bool(x) for x in a]
+        })
+
+    return transactions, times
+
+
+def stats(transactions, scl, timescale=1e-9):
+    """Bus utilization statistics, times in simulation units unless noted"""
+    res = {
+        'transactions': len(transactions),
+        'bytes': sum(len(t['data']) + (t['address'] is not None) for t in transactions),
+        'data_bytes': sum(len(t['data']) for t in transactions),
+        'busy_time': 0,
+        'span': 0,
+        'busy_fraction': None,
+        'idle_gaps': None,
+        'nacks': 0,
+        'nack_rate': None,
+        'line_rate_bps': None,
+        'goodput_bps': None,
+        'goodput_ratio': None,
+        'per_address': {}
+    }
+
+    if not transactions:
+        return res
+
+    start = np.array([t['start'] for t in transactions], dtype=np.int64)
+    end = np.array([t['end'] for t in transactions], dtype=np.int64)
+    stopped = np.array([t['end_kind'] == 'stop' for t in transactions])
+
+    # the bus is busy from the first START after a STOP up to the next STOP;
+    # repeated starts keep it busy
+    first = np.r_[True, stopped[:-1]]
+    busy = np.sum(end[stopped] - start[first][:np.count_nonzero(stopped)]) if np.any(stopped) else 0
+    if not stopped[-1]:
+        busy += end[-1] - start[first][-1]
+    res['busy_time'] = int(busy)
+    res['span'] = int(end[-1] - start[0])
+    if res['span']:
+        res['busy_fraction'] = float(busy) / res['span']
+
+    gaps = start[1:][stopped[:-1]] - end[:-1][stopped[:-1]]
+    if len(gaps):
+        res['idle_gaps'] = {
+            'count': int(len(gaps)),
+            'min': int(gaps.min()),
+            'median': float(np.median(gaps)),
+            'mean': float(gaps.mean()),
+            'max': int(gaps.max())
+        }
+
+    # NACKs that are not the master ending a read
+    nacks = 0
+    acked = 0
+    for t in transactions:
+        a = t['acks']
+        if t['rw']:
+            a = a[:1]
+        nacks += sum(1 for x in a if not x)
+        acked += len(a)
+        if t['address'] is not None:
+            p = res['per_address'].setdefault('0x%02x' % t['address'], {'transactions': 0, 'data_bytes': 0, 'nacks': 0})
+            p['transactions'] += 1
+            p['data_bytes'] += len(t['data'])
+            p['nacks'] += sum(1 for x in a if not x)
+    res['nacks'] = nacks
+    if acked:
+        res['nack_rate'] = float(nacks) / acked
+
+    # line rate from the median SCL period while the bus is busy
+    rises = scl[0][np.r_[False, (scl[1][1:] == 1) & (scl[1][:-1] == 0)]] if len(scl[0]) else scl[0]
+    in_busy = (np.searchsorted(start, rises, side='right') - 1)
+    ok = in_busy >= 0
+    ok[ok] = rises[ok] < end[in_busy[ok]]
+    periods = np.diff(rises[ok])
+    periods = periods[periods > 0]
+    if len(periods):
+        period = float(np.median(periods)) * timescale
+        res['line_rate_bps'] = 1.0 / period
+    if busy:
+        res['goodput_bps'] = res['data_bytes'] * 8 / (busy * timescale)
+        if res['line_rate_bps']:
+            res['goodput_ratio'] = res['goodput_bps'] / res['line_rate_bps']
+
+    return res
+
+
+def write_csv(f, transactions):
+    w = csv.writer(f)
+    w.writerow(['index', 'start', 'end', 'end_kind', 'address', 'rw', 'length', 'data', 'acks'])
+    for k, t in enumerate(transactions):
+        w.writerow([
+            k,
+            t['start'],
+            t['end'],
+            t['end_kind'] or '',
+            '0x%02x' % t['address'] if t['address'] is not None else '',
+            {0: 'W', 1: 'R'}.get(t['rw'], ''),
+            len(t['data']),
+            ' '.join('%02x' % b for b in t['data']),
+            ''.join('A' if a else 'N' for a in t['acks'])
+        ])
+
+
+def print_stats(s):
+    print("transactions      %d" % s['transactions'])
+    print("bytes             %d (%d data)" % (s['bytes'], s['data_bytes']))
+    if s['busy_fraction'] is not None:
+        print("bus busy          %.1f%% of %d" % (100*s['busy_fraction'], s['span']))
+    if s['idle_gaps']:
+        g = s['idle_gaps']
+        print("idle gaps         min %d median %g max %d" % (g['min'], g['median'], g['max']))
+    if s['nack_rate'] is not None:
+        print("NACKs             %d (%.2f%%)" % (s['nacks'], 100*s['nack_rate']))
+    if s['line_rate_bps']:
+        print("line rate         %.1f kbps" % (s['line_rate_bps']/1e3))
+    if s['goodput_bps']:
+        print("goodput           %.1f kbps%s" % (s['goodput_bps']/1e3,
+            " (%.1f%% of line rate)" % (100*s['goodput_ratio']) if s['goodput_ratio'] else ""))
+    for a in sorted(s['per_address']):
+        p = s['per_address'][a]
+        print("  %s  %6d transactions %8d data bytes %4d NACKs" % (a, p['transactions'], p['data_bytes'], p['nacks']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode I2C traffic from a VCD or LXT dump")
+    parser.add_argument('dump', help="VCD or LXT file")
+    parser.add_argument('--scl', default='scl_i', help="SCL signal name (default: scl_i)")
+    parser.add_argument('--sda', default='sda_i', help="SDA signal name (default: sda_i)")
+    parser.add_argument('-c', '--csv', default=None, help="write transactions as CSV")
+    parser.add_argument('-j', '--json', default=None, help="write transactions and statistics as JSON")
+    parser.add_argument('-q', '--quiet', action='store_true', help="do not print statistics")
+
+    args = parser.parse_args()
+
+    timescale, sigs = read_vcd(open_dump(args.dump), [args.scl, args.sda])
+    scl = sigs[args.scl]
+    sda = sigs[args.sda]
+
+    transactions, times = decode(scl, sda)
+    s = stats(transactions, scl, timescale)
+    s['timescale'] = timescale
+
+    if not args.quiet:
+        print_stats(s)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            write_csv(f, transactions)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'dump': args.dump, 'scl': args.scl, 'sda': args.sda, 'stats': s, 'transactions': transactions}, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
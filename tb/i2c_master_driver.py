@@ -0,0 +1,632 @@
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from myhdl import *
+
+# command flags
+CMD_START = 0x01
+CMD_READ = 0x02
+CMD_WRITE = 0x04
+CMD_WRITE_MULTIPLE = 0x08
+CMD_STOP = 0x10
+
+# status flags
+STATUS_BUSY = 0x01
+STATUS_BUS_CONT = 0x02
+STATUS_BUS_ACT = 0x04
+STATUS_MISS_ACK = 0x08
+
+# FIFO status flags
+FIFO_CMD_EMPTY = 0x01
+FIFO_CMD_FULL = 0x02
+FIFO_CMD_OVF = 0x04
+FIFO_WR_EMPTY = 0x08
+FIFO_WR_FULL = 0x10
+FIFO_WR_OVF = 0x20
+FIFO_RD_EMPTY = 0x40
+FIFO_RD_FULL = 0x80
+
+# interrupt flags
+IRQ_DONE = 0x01
+IRQ_MISS_ACK = 0x02
+IRQ_RD_THRESH = 0x04
+IRQ_WR_THRESH = 0x08
+
+STATUS_FIELDS = {
+    'busy':      (0, STATUS_BUSY),
+    'bus_cont':  (0, STATUS_BUS_CONT),
+    'bus_act':   (0, STATUS_BUS_ACT),
+    'miss_ack':  (0, STATUS_MISS_ACK),
+    'cmd_empty': (1, FIFO_CMD_EMPTY),
+    'cmd_full':  (1, FIFO_CMD_FULL),
+    'cmd_ovf':   (1, FIFO_CMD_OVF),
+    'wr_empty':  (1, FIFO_WR_EMPTY),
+    'wr_full':   (1, FIFO_WR_FULL),
+    'wr_ovf':    (1, FIFO_WR_OVF),
+    'rd_empty':  (1, FIFO_RD_EMPTY),
+    'rd_full':   (1, FIFO_RD_FULL)
+}
+
+# write 1 to clear fields, once seen set these stay set until cleared
+STICKY_MASK = [STATUS_MISS_ACK, FIFO_CMD_OVF | FIFO_WR_OVF]
+
+class PollPolicy(object):
+    # exponential backoff between status polls, in clock cycles
+    def __init__(self, initial=4, maximum=1024, factor=2):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.interval = initial
+
+    def reset(self):
+        self.interval = self.initial
+
+    def next(self):
+        v = self.interval
+        self.interval = min(int(self.interval*self.factor), self.maximum)
+        return v
+
+
+class I2CMasterDriver(object):
+    # Register level driver for the i2c_master host interface wrappers.
+    # Operations are generators; yield them from a testbench instance.
+    # The driver owns the bus master, it must not be shared with other
+    # code that issues reads.
+    #
+    # Status registers are shadowed.  Sticky fields are served from the
+    # shadow copy once seen set, until cleared through the driver.  The
+    # remaining fields are volatile; they are invalidated by any register
+    # write, and are only reused if an event hint signal is supplied and
+    # has not changed since the last read.
+    #
+    # If the irq output is connected, the driver waits on the interrupt
+    # for read data, write FIFO space and completion instead of polling.
+    #
+    # The defaults are the i2c_master_wbs_16 register map; subclasses
+    # override what differs.
+    bus_width = 2
+    has_write_multiple = True
+    ordered_bus = True
+    # data bytes per data register access
+    data_block_size = 1
+
+    status_addr = 0x00
+    cmd_addr = 0x02
+    data_addr = 0x04
+    prescale_addr = 0x06
+    irq_addr = 0x08
+    irq_enable_addr = 0x09
+    rd_thresh_addr = 0x0A
+    wr_thresh_addr = 0x0B
+    thresh_width = 1
+
+    def __init__(self, master, cmd_fifo_depth=32, write_fifo_depth=32, read_fifo_depth=32, prescale=1, poll_policy=None, hint=None, irq=None):
+        self.master = master
+        self.cmd_fifo_depth = cmd_fifo_depth
+        self.write_fifo_depth = write_fifo_depth
+        self.read_fifo_depth = read_fifo_depth
+        self.prescale = prescale
+        self.poll_policy = poll_policy
+        self.hint = hint
+        self.irq = irq
+
+        if self.poll_policy is None:
+            self.poll_policy = PollPolicy(maximum=self.byte_time()*4)
+
+        self.read_data_queue = []
+
+        # conservative count of free FIFO entries, refreshed by polling
+        self.cmd_credit = cmd_fifo_depth
+        self.write_credit = write_fifo_depth
+        # number of entries known to be available in the read FIFO
+        self.read_avail = 0
+
+        # status register shadow
+        self.status = 0
+        self.fifo_status = 0
+        self.sticky = [0, 0]
+        self.status_valid = [False, False]
+        self.hint_value = None
+
+        self.irq_enable = 0
+        self.rd_thresh = None
+        self.wr_thresh = None
+
+        self.posted_writes = False
+        self.clk_period = None
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.bus_read_cycles = 0
+        self.bus_write_cycles = 0
+        self.status_polls = 0
+        self.cached_polls = 0
+        self.irq_waits = 0
+
+    def read_data_ready(self):
+        return bool(self.read_data_queue)
+
+    def get_read_data(self):
+        if self.read_data_queue:
+            return self.read_data_queue.pop(0)
+        return None
+
+    def byte_time(self):
+        # clock cycles per I2C byte (4 phases per bit, 9 bits)
+        return max(self.prescale, 1)*4*9
+
+    def invalidate(self):
+        # drop shadowed volatile status fields
+        self.status_valid = [False, False]
+
+    def _status_fresh(self, reg):
+        if not self.status_valid[reg] or self.hint is None:
+            return False
+        return int(self.hint) == self.hint_value
+
+    def _cycles(self, addr, length):
+        bw = self.bus_width
+        return int((length + bw-1 + (addr % bw)) / bw)
+
+    def _bus_write(self, addr, data):
+        self.master.init_write(addr, bytearray(data))
+        self.bus_write_cycles += self._cycles(addr, len(data))
+        self.posted_writes = True
+        self.invalidate()
+
+    def _bus_read(self, addr, length):
+        self.master.init_read(addr, length)
+        self.bus_read_cycles += self._cycles(addr, length)
+
+    def _bus_read_data(self, out, count=1):
+        # wait for queued reads and collect the data
+        yield self.master.wait()
+        for k in range(count):
+            out.append(bytearray(self.master.get_read_data()[1]))
+
+    def _wait(self, cycles):
+        # wait for a number of clock cycles, or for the hint signal
+        clk = self.master.clk
+
+        if self.clk_period is None:
+            yield clk.posedge
+            t = now()
+            yield clk.posedge
+            self.clk_period = now() - t
+            cycles -= 2
+
+        if cycles > 1:
+            t = max(cycles*self.clk_period - int(self.clk_period/2), 1)
+            if self.hint is not None:
+                yield self.hint, delay(t)
+            else:
+                yield delay(t)
+
+        yield clk.posedge
+
+    def _update_status(self, status, fifo_status):
+        if self.hint is not None:
+            self.hint_value = int(self.hint)
+
+        if status is not None:
+            self.status = status
+            self.sticky[0] |= status & STICKY_MASK[0]
+            self.status_valid[0] = True
+
+        self.fifo_status = fifo_status
+        self.sticky[1] |= fifo_status & STICKY_MASK[1]
+        self.status_valid[1] = True
+
+        if fifo_status & FIFO_CMD_FULL:
+            self.cmd_credit = 0
+        elif fifo_status & FIFO_CMD_EMPTY:
+            self.cmd_credit = self.cmd_fifo_depth
+        else:
+            self.cmd_credit = max(self.cmd_credit, 1)
+
+        if fifo_status & FIFO_WR_FULL:
+            self.write_credit = 0
+        elif fifo_status & FIFO_WR_EMPTY:
+            self.write_credit = self.write_fifo_depth
+        else:
+            self.write_credit = max(self.write_credit, 1)
+
+        if fifo_status & FIFO_RD_FULL:
+            self.read_avail = self.read_fifo_depth
+        elif fifo_status & FIFO_RD_EMPTY:
+            self.read_avail = 0
+        else:
+            self.read_avail = max(self.read_avail, 1)
+
+    def poll(self, status=True, force=False):
+        if not force and self._status_fresh(1) and (not status or self._status_fresh(0)):
+            self.cached_polls += 1
+            return
+
+        if self.posted_writes and not self.ordered_bus:
+            # reads can overtake posted writes
+            yield self.master.wait()
+        self.posted_writes = False
+
+        self.status_polls += 1
+        yield self._read_status(status)
+
+    def read_field(self, name, out):
+        reg, mask = STATUS_FIELDS[name]
+
+        if self.sticky[reg] & mask:
+            self.cached_polls += 1
+            out.append(True)
+            return
+
+        yield self.poll(reg == 0)
+        out.append(bool((self.status, self.fifo_status)[reg] & mask))
+
+    def clear_field(self, name):
+        reg, mask = STATUS_FIELDS[name]
+        assert STICKY_MASK[reg] & mask
+        self._bus_write(self.status_addr+reg, [mask])
+        self.sticky[reg] &= ~mask
+        yield self.master.wait()
+
+    def clear_missed_ack(self):
+        yield self.clear_field('miss_ack')
+
+    def enable_irq(self, mask):
+        # set the interrupt enables, for benches that watch the irq output
+        self._set_irq_enable(mask)
+        yield self.master.wait()
+
+    def clear_irq(self, mask):
+        self._bus_write(self.irq_addr, [mask])
+        yield self.master.wait()
+
+    def _set_irq_enable(self, mask):
+        if mask != self.irq_enable:
+            self._bus_write(self.irq_enable_addr, [mask])
+            self.irq_enable = mask
+
+    def _set_thresh(self, addr, value):
+        self._bus_write(addr, [(value >> 8*k) & 0xff for k in range(self.thresh_width)])
+
+    def _wait_irq(self, mask):
+        # enable interrupt sources and wait for the interrupt output
+        self._set_irq_enable(mask)
+        yield self.master.wait()
+
+        # let the registered irq output catch up with the last access
+        yield self.master.clk.posedge
+        yield self.master.clk.posedge
+
+        self.irq_waits += 1
+
+        if not self.irq:
+            yield self.irq.posedge
+
+    def _wait_read_data(self, count):
+        # wait for the read FIFO to reach a level, count bytes are then available
+        thresh = max(min(count, int(self.read_fifo_depth/2)), 1)
+
+        if thresh != self.rd_thresh:
+            self._set_thresh(self.rd_thresh_addr, thresh)
+            self.rd_thresh = thresh
+
+        yield self._wait_irq(IRQ_RD_THRESH)
+
+        self.read_avail = max(self.read_avail, thresh)
+
+    def _get_cmd_credit(self):
+        while self.cmd_credit <= 0:
+            yield self.poll(False, True)
+            if self.cmd_credit <= 0:
+                yield self._wait(self.byte_time())
+
+    def _get_write_credit(self):
+        while self.write_credit <= 0:
+            if self.irq is not None:
+                thresh = int(self.write_fifo_depth/2)
+
+                if thresh != self.wr_thresh:
+                    self._set_thresh(self.wr_thresh_addr, thresh)
+                    self.wr_thresh = thresh
+
+                yield self._wait_irq(IRQ_WR_THRESH)
+
+                self.write_credit = self.write_fifo_depth - thresh
+            else:
+                yield self.poll(False, True)
+                if self.write_credit <= 0:
+                    yield self._wait(self.byte_time())
+
+    def _set_prescale(self, prescale):
+        self._bus_write(self.prescale_addr, [prescale & 0xff, (prescale >> 8) & 0xff])
+
+    def _read_status(self, status=True):
+        d = []
+        self._bus_read(self.status_addr, 2)
+        yield self._bus_read_data(d)
+        self._update_status(d[0][0], d[0][1])
+
+    def _push_cmd(self, address, flags):
+        self._bus_write(self.cmd_addr, [address, flags])
+
+    def _push_data(self, data, last=False):
+        self._bus_write(self.data_addr, [data, 0x02 if last else 0x00])
+
+    def _push_data_block(self, data, last=False):
+        self._push_data(data[0], last)
+
+    def _push_write(self, address, flags, data):
+        self._push_cmd(address, flags)
+        self._push_data(data)
+
+    def _pull_data(self, out, count):
+        # data register carries a valid flag, no need to check FIFO status
+        if self.irq is not None and self.read_avail <= 0 and count > 0:
+            yield self._wait_read_data(count)
+
+        n = min(count, max(self.read_avail, 1))
+
+        for k in range(n):
+            self._bus_read(self.data_addr, 2)
+
+        d = []
+        yield self._bus_read_data(d, n)
+        for v in d:
+            if v[1] & 0x01:
+                out.append(v[0])
+
+        self.read_avail = max(self.read_avail - len(out), 0)
+
+    def set_prescale(self, prescale):
+        self.prescale = prescale
+        self._set_prescale(prescale)
+        yield self.master.wait()
+
+    def _write(self, address, data, start=False, stop=True):
+        data = bytearray(data)
+
+        if self.has_write_multiple and len(data) > 1:
+            flags = CMD_WRITE_MULTIPLE
+            if start:
+                flags |= CMD_START
+            if stop:
+                flags |= CMD_STOP
+
+            yield self._get_cmd_credit()
+            self._push_cmd(address, flags)
+            self.cmd_credit -= 1
+
+            k = 0
+            while k < len(data):
+                yield self._get_write_credit()
+                n = min(self.data_block_size, self.write_credit, len(data)-k)
+                self._push_data_block(data[k:k+n], k+n == len(data))
+                self.write_credit -= n
+                k += n
+        else:
+            for k in range(len(data)):
+                flags = CMD_WRITE
+                if start and k == 0:
+                    flags |= CMD_START
+                if stop and k == len(data)-1:
+                    flags |= CMD_STOP
+
+                yield self._get_cmd_credit()
+                yield self._get_write_credit()
+                self._push_write(address, flags, data[k])
+                self.cmd_credit -= 1
+                self.write_credit -= 1
+
+    def _read(self, address, length, start=False, stop=True):
+        data = bytearray()
+        issued = 0
+
+        while len(data) < length:
+            # fill command FIFO, without overrunning the read FIFO
+            while issued < length and self.cmd_credit > 0 and issued - len(data) < self.read_fifo_depth:
+                flags = CMD_READ
+                if start and issued == 0:
+                    flags |= CMD_START
+                if stop and issued == length-1:
+                    flags |= CMD_STOP
+
+                self._push_cmd(address, flags)
+                self.cmd_credit -= 1
+                issued += 1
+
+            # drain read FIFO
+            d = bytearray()
+            yield self._pull_data(d, issued - len(data))
+            data.extend(d)
+
+            if d:
+                # returned data retires its read command and everything before it
+                self.cmd_credit = max(self.cmd_credit, self.cmd_fifo_depth - (issued - len(data)))
+            else:
+                if issued < length and self.cmd_credit <= 0:
+                    yield self.poll(False, True)
+                yield self._wait(self.byte_time())
+
+        self.read_data_queue.append((address, bytes(data)))
+
+    def write(self, address, data, stop=True):
+        yield self._write(address, data, stop=stop)
+
+    def read(self, address, length, stop=True):
+        yield self._read(address, length, stop=stop)
+
+    def write_then_read(self, address, data, length):
+        yield self._write(address, data, stop=False)
+        yield self._read(address, length, start=True, stop=True)
+
+    def wait_idle(self):
+        if self.irq is not None:
+            while True:
+                # clear before checking status, completion after the check sets it again
+                self._bus_write(self.irq_addr, [IRQ_DONE])
+                yield self.poll(True, True)
+                if not self.status & (STATUS_BUSY | STATUS_BUS_CONT) and self.fifo_status & FIFO_CMD_EMPTY:
+                    break
+                yield self._wait_irq(IRQ_DONE)
+            return
+
+        self.poll_policy.reset()
+        while True:
+            yield self.poll(True)
+            if not self.status & (STATUS_BUSY | STATUS_BUS_CONT) and self.fifo_status & FIFO_CMD_EMPTY:
+                break
+            yield self._wait(self.poll_policy.next())
+
+
+class I2CMasterWBS8Driver(I2CMasterDriver):
+    # i2c_master_wbs_8, same register map on an 8 bit bus
+    bus_width = 1
+    has_write_multiple = False
+
+    def __init__(self, *args, **kwargs):
+        super(I2CMasterWBS8Driver, self).__init__(*args, **kwargs)
+        self.cmd_address = None
+
+    def _read_status(self, status=True):
+        d = []
+        if status:
+            self._bus_read(self.status_addr, 2)
+            yield self._bus_read_data(d)
+            self._update_status(d[0][0], d[0][1])
+        else:
+            self._bus_read(self.status_addr+1, 1)
+            yield self._bus_read_data(d)
+            self._update_status(None, d[0][0])
+
+    def _set_address(self, address):
+        # address register persists, only update on change
+        if address != self.cmd_address:
+            self._bus_write(self.cmd_addr, [address])
+            self.cmd_address = address
+
+    def _push_cmd(self, address, flags):
+        self._set_address(address)
+        self._bus_write(self.cmd_addr+1, [flags])
+
+    def _push_data(self, data, last=False):
+        self._bus_write(self.data_addr, [data])
+
+    def _push_write(self, address, flags, data):
+        # command and data registers are adjacent
+        self._set_address(address)
+        self._bus_write(self.cmd_addr+1, [flags, data])
+
+    def _pull_data(self, out, count):
+        # no valid flag in the data register, check FIFO status first
+        if self.read_avail <= 0 and count > 0:
+            if self.irq is not None:
+                yield self._wait_read_data(count)
+            else:
+                yield self.poll(False, True)
+
+        n = min(count, self.read_avail)
+
+        if n <= 0:
+            return
+
+        for k in range(n):
+            self._bus_read(self.data_addr, 1)
+
+        d = []
+        yield self._bus_read_data(d, n)
+        for v in d:
+            out.append(v[0])
+
+        self.read_avail -= n
+
+
+class I2CMasterWBS16Driver(I2CMasterDriver):
+    # i2c_master_wbs_16, the base class register map
+    pass
+
+
+class I2CMasterAXILDriver(I2CMasterDriver):
+    # i2c_master_axil
+    bus_width = 4
+    has_write_multiple = True
+    # separate read and write channels
+    ordered_bus = False
+
+    status_addr = 0x00
+    cmd_addr = 0x04
+    data_addr = 0x08
+    prescale_addr = 0x0C
+    irq_addr = 0x10
+    irq_enable_addr = 0x11
+    rd_thresh_addr = 0x14
+    wr_thresh_addr = 0x16
+    thresh_width = 2
+    data_pack_addr = 0x18
+    data_pack_last_addr = 0x1C
+    data_pack_status_addr = 0x1C
+
+    # packed data register, set to 1 to use the single byte data register
+    data_block_size = 4
+
+    def _push_data_block(self, data, last=False):
+        if len(data) == 1:
+            self._push_data(data[0], last)
+        else:
+            # write strobes carry the byte count
+            self._bus_write(self.data_pack_last_addr if last else self.data_pack_addr, data)
+
+    def _read_level(self):
+        d = []
+        self._bus_read(self.data_pack_status_addr, 4)
+        yield self._bus_read_data(d)
+        self.read_avail = d[0][0] | d[0][1] << 8
+
+    def _pull_data(self, out, count):
+        bs = self.data_block_size
+
+        if bs > 1 and count >= bs:
+            if self.irq is not None and self.read_avail <= 0:
+                yield self._wait_read_data(count)
+
+            if self.read_avail < bs:
+                yield self._read_level()
+
+            # packed reads always return 4 bytes while the FIFO level is at least 4
+            n = int(min(count, self.read_avail) / bs)
+
+            if n > 0:
+                for k in range(n):
+                    self._bus_read(self.data_pack_addr, bs)
+
+                d = []
+                yield self._bus_read_data(d, n)
+                for v in d:
+                    out.extend(v)
+
+                self.read_avail -= n*bs
+                return
+
+        yield super(I2CMasterAXILDriver, self)._pull_data(out, count)
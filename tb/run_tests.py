@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Parallel regression runner
+#
+# Runs each testbench in its own process and scratch directory, so the
+# fixed-name .vvp, .lxt and .vcd files of concurrent runs (including several
+# runs of the same bench) cannot collide.  Results are collected into a
+# single report.
+#
+#     python run_tests.py                  run all benches
+#     python run_tests.py test_i2c_master  run selected benches
+#     python run_tests.py -j 4 -k          run 4 at a time, keep scratch dirs
+
+import argparse
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import traceback
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_WORK_DIR = os.path.join(tb_dir, 'run')
+
+
+def find_benches():
+    # simulation benches define test_bench(), skip plain unit tests
+    benches = []
+    for f in glob.glob(os.path.join(tb_dir, 'test_*.py')):
+        with open(f) as fp:
+            if 'def test_bench(' not in fp.read():
+                continue
+        benches.append(os.path.splitext(os.path.basename(f))[0])
+    return sorted(benches)
+
+
+def make_jobs(benches, params=None):
+    """Build job list from bench names, optionally with a list of parameter dicts per bench"""
+    jobs = []
+    for bench in benches:
+        for k, p in enumerate(params or [{}]):
+            name = bench if not p else "%s-%d" % (bench, k)
+            jobs.append({'name': name, 'bench': bench, 'params': dict(p)})
+    return jobs
+
+
+def run_job(job):
+    """Run one job in its own scratch directory, in a fresh process"""
+    result = {
+        'name': job['name'],
+        'bench': job['bench'],
+        'params': job['params'],
+        'work_dir': job['work_dir'],
+        'passed': False,
+        'error': None,
+        'wall_time': 0.0,
+        'sim_time': None,
+        'metrics': {}
+    }
+
+    os.makedirs(job['work_dir'], exist_ok=True)
+    os.chdir(job['work_dir'])
+
+    if tb_dir not in sys.path:
+        sys.path.insert(0, tb_dir)
+
+    # send bench and cosimulation output to a log file
+    log = open('output.log', 'w')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+
+    start = time.time()
+
+    try:
+        import myhdl
+        mod = importlib.import_module(job['bench'])
+        mod.test_bench(**job['params'])
+        result['passed'] = True
+        result['sim_time'] = myhdl.now()
+        result['metrics'] = dict(getattr(mod, 'metrics', {}))
+    except BaseException:
+        result['error'] = traceback.format_exc()
+        print(result['error'])
+        try:
+            result['sim_time'] = myhdl.now()
+        except Exception:
+            pass
+
+    result['wall_time'] = time.time() - start
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    log.close()
+
+    return result
+
+
+def run(jobs, processes=None, work_dir=None, keep=False):
+    """Run jobs in a process pool, return list of results in job order"""
+    if work_dir is None:
+        work_dir = DEFAULT_WORK_DIR
+    work_dir = os.path.abspath(work_dir)
+
+    for job in jobs:
+        job['work_dir'] = os.path.join(work_dir, job['name'])
+        if os.path.isdir(job['work_dir']):
+            shutil.rmtree(job['work_dir'])
+
+    # one job per worker process, myhdl keeps global simulator state
+    pool = multiprocessing.Pool(processes=processes, maxtasksperchild=1)
+
+    results = {}
+
+    try:
+        for r in pool.imap_unordered(run_job, jobs):
+            results[r['name']] = r
+            print("%-40s %s %8.2f s" % (r['name'], "PASS" if r['passed'] else "FAIL", r['wall_time']))
+            sys.stdout.flush()
+    finally:
+        pool.close()
+        pool.join()
+
+    results = [results[job['name']] for job in jobs]
+
+    if not keep:
+        for r in results:
+            if r['passed']:
+                shutil.rmtree(r['work_dir'], ignore_errors=True)
+
+    return results
+
+
+def print_report(results, wall_time=None):
+    print("")
+    print("%-40s %-6s %10s %14s" % ("test", "result", "wall (s)", "sim time"))
+    for r in results:
+        print("%-40s %-6s %10.2f %14s" % (
+            r['name'],
+            "PASS" if r['passed'] else "FAIL",
+            r['wall_time'],
+            r['sim_time'] if r['sim_time'] is not None else '-'
+        ))
+
+    passed = sum(1 for r in results if r['passed'])
+    print("")
+    print("%d passed, %d failed" % (passed, len(results)-passed))
+    if wall_time is not None:
+        print("total wall time %.2f s, sum of test wall time %.2f s" % (wall_time, sum(r['wall_time'] for r in results)))
+
+    for r in results:
+        if not r['passed']:
+            print("")
+            print("%s failed, log in %s" % (r['name'], os.path.join(r['work_dir'], 'output.log')))
+            print(r['error'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run testbenches in parallel")
+    parser.add_argument('benches', nargs='*', help="bench names (default: all test_*.py)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument('-w', '--work-dir', default=DEFAULT_WORK_DIR, help="scratch directory root")
+    parser.add_argument('-n', '--no-dump', action='store_true', help="disable waveform dumping")
+    parser.add_argument('-t', '--timeout', type=float, default=None, help="per-test watchdog limit in wall seconds")
+    parser.add_argument('-k', '--keep', action='store_true', help="keep scratch directories of passing tests")
+    parser.add_argument('-r', '--report', default=None, help="write JSON report to file")
+
+    args = parser.parse_args()
+
+    if args.no_dump:
+        # inherited by the worker processes
+        os.environ['SIM_DUMP'] = '0'
+
+    if args.timeout is not None:
+        os.environ['SIM_WATCHDOG_SECONDS'] = str(args.timeout)
+
+    benches = [os.path.splitext(os.path.basename(b))[0] for b in args.benches] or find_benches()
+
+    start = time.time()
+    results = run(make_jobs(benches), processes=args.jobs, work_dir=args.work_dir, keep=args.keep)
+    wall_time = time.time() - start
+
+    print_report(results, wall_time)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'wall_time': wall_time, 'results': results}, f, indent=2)
+
+    return 0 if all(r['passed'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+# cache location, override with SIM_BUILD_CACHE
+# set SIM_BUILD_NO_CACHE=1 to always run iverilog
+# SIM_BUILD_CACHE_SIZE sets how many files the cache keeps, least recently
+# used are removed first
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build_cache')
+DEFAULT_CACHE_SIZE = 200
+
+IVERILOG = 'iverilog'
+
+# waveform dump control, read from the environment
+#   SIM_DUMP=0          disable dumping
+#   SIM_DUMP_DEPTH=N    limit dump hierarchy depth
+#   SIM_DUMP_SCOPE=X    dump only below hierarchical scope X (build time define)
+#   SIM_DUMP_START=T    start dumping at simulation time T
+#   SIM_DUMP_STOP=T     stop dumping at simulation time T
+#   SIM_DUMP_TEST=N     dump only while current_test == N
+DUMP_PLUSARGS = [
+    ('SIM_DUMP_DEPTH', 'dump_depth'),
+    ('SIM_DUMP_START', 'dump_start'),
+    ('SIM_DUMP_STOP', 'dump_stop'),
+    ('SIM_DUMP_TEST', 'dump_test')
+]
+
+stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache_dir():
+    return os.environ.get('SIM_BUILD_CACHE', DEFAULT_CACHE_DIR)
+
+
+def packed_cosim():
+    """True when cosimulation signals are packed into one vector per direction (SIM_PACKED=1)"""
+    return os.environ.get('SIM_PACKED', '0') not in ('0', 'no', 'off', '')
+
+
+def dump_enabled():
+    return os.environ.get('SIM_DUMP', '1') not in ('0', 'no', 'off', '')
+
+
+def vvp_cmd(testbench):
+    """Return vvp command line for cosimulation, with dump control plusargs"""
+    if not dump_enabled():
+        return "vvp -m myhdl %s.vvp -none +nodump" % testbench
+
+    args = ["vvp -m myhdl %s.vvp -lxt2" % testbench]
+
+    for var, arg in DUMP_PLUSARGS:
+        v = os.environ.get(var)
+        if v:
+            args.append("+%s=%d" % (arg, int(v, 0)))
+
+    return ' '.join(args)
+
+
+def _compiler_id(iverilog):
+    # identify the compiler binary without running it
+    path = shutil.which(iverilog)
+    if path is None:
+        return iverilog
+    st = os.stat(path)
+    return "%s:%d:%d" % (path, st.st_size, int(st.st_mtime))
+
+
+def build_args(output, srcs, defines=None, parameters=None, toplevel=None, flags=None):
+    """Return iverilog argument list"""
+    args = [IVERILOG, '-o', output]
+
+    if flags:
+        args.extend(flags)
+
+    if defines:
+        for k in sorted(defines):
+            v = defines[k]
+            if v is None:
+                args.append('-D%s' % k)
+            else:
+                args.append('-D%s=%s' % (k, v))
+
+    if parameters:
+        if toplevel is None:
+            toplevel = os.path.splitext(os.path.basename(output))[0]
+        for k in sorted(parameters):
+            args.append('-P%s.%s=%s' % (toplevel, k, parameters[k]))
+
+    args.extend(srcs)
+
+    return args
+
+
+def _include_dirs(args):
+    dirs = []
+    for k, a in enumerate(args):
+        if a == '-I' and k+1 < len(args):
+            dirs.append(args[k+1])
+        elif a.startswith('-I') and len(a) > 2:
+            dirs.append(a[2:])
+    return dirs
+
+
+def _hash_file(h, path, inc_dirs, src_dir, relative, seen):
+    # hash file contents and, recursively, the files it includes
+    with open(path, 'rb') as f:
+        data = f.read()
+    h.update(hashlib.sha256(data).digest())
+
+    for m in re.finditer(rb'^\s*`include\s+"([^"]+)"', data, re.M):
+        name = m.group(1).decode()
+        h.update(b'\0include\0')
+        h.update(name.encode())
+        # same search order as iverilog: the including file's directory only
+        # with -grelative-include, then the working directory and the -I
+        # directories
+        dirs = [src_dir or '.'] + [os.path.join(src_dir or '', i) for i in inc_dirs]
+        if relative:
+            dirs.insert(0, os.path.dirname(path))
+        for d in dirs:
+            inc = os.path.join(d, name)
+            if os.path.isfile(inc):
+                inc = os.path.abspath(inc)
+                if inc not in seen:
+                    seen.add(inc)
+                    _hash_file(h, inc, inc_dirs, src_dir, relative, seen)
+                break
+        else:
+            # missing, iverilog will report it
+            h.update(b'\0missing')
+
+
+def build_hash(srcs, args, src_dir=None):
+    """Hash source contents, `included files, source order and compiler arguments"""
+    h = hashlib.sha256()
+
+    h.update(_compiler_id(args[0]).encode())
+
+    # arguments, minus compiler and output file name
+    for a in args[3:]:
+        h.update(b'\0')
+        h.update(str(a).encode())
+
+    inc_dirs = _include_dirs(args)
+    relative = '-grelative-include' in args
+    seen = set()
+
+    for src in srcs:
+        h.update(b'\0')
+        _hash_file(h, os.path.join(src_dir or '', src), inc_dirs, src_dir, relative, seen)
+
+    return h.hexdigest()
+
+
+def get_cache_size():
+    return int(os.environ.get('SIM_BUILD_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+
+
+def prune(cache_dir=None, size=None):
+    """Remove the least recently used cache files beyond size, returns the count removed"""
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    if size is None:
+        size = get_cache_size()
+
+    files = []
+    for fn in os.listdir(cache_dir):
+        # skip builds in progress (mkstemp names)
+        if fn.startswith('tmp'):
+            continue
+        path = os.path.join(cache_dir, fn)
+        try:
+            files.append((os.stat(path).st_mtime, path))
+        except OSError:
+            pass
+
+    files.sort(reverse=True)
+
+    removed = 0
+    for t, path in files[size:]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def build(output, srcs, defines=None, parameters=None, toplevel=None, flags=None, cache_dir=None, src_dir=None):
+    """Compile srcs to output with iverilog, reusing a cached result
+
+    defines: dict of preprocessor defines (-D), value None for a bare define
+    parameters: dict of top-level parameter overrides (-P)
+    toplevel: module name for parameter overrides, defaults to output base name
+    flags: list of extra iverilog arguments
+    src_dir: directory relative source paths are resolved against, so the
+    output can be placed in a different working directory
+    """
+    srcs = list(srcs)
+
+    output = os.path.abspath(output)
+
+    scope = os.environ.get('SIM_DUMP_SCOPE')
+    if scope:
+        defines = dict(defines or {})
+        defines['DUMP_SCOPE'] = scope
+
+    args = build_args(output, srcs, defines, parameters, toplevel, flags)
+
+    if os.environ.get('SIM_BUILD_NO_CACHE'):
+        stats['misses'] += 1
+        if subprocess.call(args, cwd=src_dir):
+            raise Exception("Error running build command")
+        return output
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    cache_dir = os.path.abspath(cache_dir)
+
+    key = build_hash(srcs, args, src_dir)
+    cached = os.path.join(cache_dir, key + '.vvp')
+
+    if os.path.exists(cached):
+        stats['hits'] += 1
+        # mark as recently used
+        os.utime(cached)
+    else:
+        stats['misses'] += 1
+
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # compile to a temporary name and rename, so concurrent builds
+        # of the same sources never see a partial file
+        fd, tmp = tempfile.mkstemp(suffix='.vvp', dir=cache_dir)
+        os.close(fd)
+
+        try:
+            args[2] = tmp
+            if subprocess.call(args, cwd=src_dir):
+                raise Exception("Error running build command")
+            os.replace(tmp, cached)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        prune(cache_dir)
+
+    # copy out under the name the bench expects
+    fd, tmp = tempfile.mkstemp(suffix='.vvp', dir=os.path.dirname(output))
+    os.close(fd)
+    shutil.copyfile(cached, tmp)
+    os.replace(tmp, output)
+
+    return output
+
+
+def clean(cache_dir=None):
+    """Remove all cached builds"""
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+
+
+def cosimulation(testbench, srcs, parameters=None, src_dir=None, **kwargs):
+    """Build testbench and start cosimulation
+
+    srcs must include the wrapper "<testbench>.v"; kwargs are the MyHDL
+    signals, as for Cosimulation.  With SIM_PACKED=1 the wrapper is
+    rewritten by cosim_pack to pass one packed vector per direction.
+    """
+    import myhdl
+
+    if not packed_cosim():
+        build("%s.vvp" % testbench, srcs, parameters=parameters, src_dir=src_dir)
+        return myhdl.Cosimulation(vvp_cmd(testbench), **kwargs)
+
+    import cosim_pack
+
+    wrapper = "%s.v" % testbench
+    srcs = list(srcs)
+    k = srcs.index(wrapper)
+
+    with open(os.path.join(src_dir or '', wrapper)) as f:
+        text = f.read()
+
+    from_names, to_names = cosim_pack.parse_wrapper(text)
+
+    from_fields = [(n, len(kwargs[n]), kwargs[n]._init) for n in from_names]
+    to_fields = [(n, len(kwargs[n]), 0) for n in to_names]
+
+    text = cosim_pack.generate_wrapper(text, from_fields, to_fields)
+
+    # keep generated wrappers in the cache directory under a content hash,
+    # so the build cache sees a stable path
+    cache_dir = os.path.abspath(get_cache_dir())
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    name = os.path.join(cache_dir, "%s_packed_%s.v" % (testbench, hashlib.sha256(text.encode()).hexdigest()[:16]))
+
+    if not os.path.exists(name):
+        fd, tmp = tempfile.mkstemp(suffix='.v', dir=cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp, name)
+    else:
+        os.utime(name)
+
+    srcs[k] = name
+
+    build("%s.vvp" % testbench, srcs, parameters=parameters, src_dir=src_dir)
+    return cosim_pack.PackedCosimulation(vvp_cmd(testbench), from_names, to_names, **kwargs)
@@ -0,0 +1,177 @@
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Per-generator profiling
+#
+# Set SIM_PROFILE=1 to wrap every generator passed to the Simulation, count
+# how many times each one is resumed and accumulate the CPU time spent inside
+# it, including any sub-generators it yields (reset sequences, wait() calls).
+# Generators are named after the model class and method that created them,
+# for example I2CMaster.logic or AXILiteMaster.write_resp_logic, with an
+# index when a bench has several instances of the same model and a #n suffix
+# when one instance creates several generators of the same name.  The table is
+# printed when the simulation ends; the remaining time, spent in the MyHDL
+# kernel and waiting on the cosimulation, is reported as one extra row.
+#
+#     sim = Simulation(sim_profile.instrument(bench()))
+#     sim.run()
+#     sim_profile.report()
+
+import os
+import sys
+import time
+from types import GeneratorType
+
+from myhdl._Simulation import _flatten
+from myhdl._instance import _Instantiator
+
+_clock = time.process_time
+
+# records, [name, owner, resumptions, cpu time]
+_records = []
+_start = None
+
+
+def enabled():
+    """True when generator profiling is requested (SIM_PROFILE=1)"""
+    return os.environ.get('SIM_PROFILE', '0') not in ('0', 'no', 'off', '')
+
+
+def _profiled(gen, rec):
+    """Run gen, timing each resumption into rec"""
+    while True:
+        start = _clock()
+        try:
+            clause = next(gen)
+        except StopIteration:
+            return
+        finally:
+            rec[2] += 1
+            rec[3] += _clock() - start
+
+        # charge sub-generators to the instance that yielded them
+        if isinstance(clause, GeneratorType):
+            clause = _profiled(clause, rec)
+
+        yield clause
+
+
+def _describe(func):
+    """Return (name, owner) for a generator function
+
+    Generators created inside a model method are named after the class and
+    the generator, and owner is the model object, so several instances of
+    one model can be told apart.
+    """
+    parts = [p for p in getattr(func, '__qualname__', func.__name__).split('.') if p != '<locals>']
+
+    owner = None
+    code = getattr(func, '__code__', None)
+    if code is not None and 'self' in code.co_freevars and func.__closure__:
+        owner = func.__closure__[code.co_freevars.index('self')].cell_contents
+
+    if owner is not None:
+        return "%s.%s" % (type(owner).__name__, parts[-1]), owner
+    if len(parts) > 1:
+        return "%s.%s" % (parts[0], parts[-1]), None
+    return parts[-1], None
+
+
+def instrument(insts):
+    """Wrap generators in insts for profiling, returns insts
+
+    Does nothing unless SIM_PROFILE is set.  Only decorated instances are
+    wrapped; cosimulation time shows up in the kernel row of the report.
+    """
+    global _start
+
+    if not enabled():
+        return insts
+
+    for inst in _flatten(insts):
+        if isinstance(inst, _Instantiator):
+            name, owner = _describe(inst.funcobj)
+            rec = [name, owner, 0, 0.0]
+            inst.gen = _profiled(inst.gen, rec)
+            _records.append(rec)
+
+    _start = _clock()
+
+    return insts
+
+
+def results():
+    """Return list of (name, resumptions, cpu time), most expensive first"""
+    # number instances of models that appear more than once
+    owners = {}
+    for name, owner, n, t in _records:
+        if owner is not None:
+            cls = type(owner).__name__
+            ids = owners.setdefault(cls, [])
+            if not any(o is owner for o in ids):
+                ids.append(owner)
+
+    # number generators with the same name in one instance, such as the
+    # per-line processes of I2CBus, in creation order
+    keys = [(name, id(owner)) for name, owner, n, t in _records]
+    seen = {}
+
+    res = []
+    for key, (name, owner, n, t) in zip(keys, _records):
+        if owner is not None and len(owners[type(owner).__name__]) > 1:
+            cls, func = name.split('.', 1)
+            idx = [k for k, o in enumerate(owners[cls]) if o is owner][0]
+            name = "%s[%d].%s" % (cls, idx, func)
+        if keys.count(key) > 1:
+            seen[key] = seen.get(key, -1) + 1
+            name = "%s#%d" % (name, seen[key])
+        res.append((name, n, t))
+
+    res.sort(key=lambda r: r[2], reverse=True)
+    return res
+
+
+def report(file=None):
+    """Print the profile table, does nothing if nothing was instrumented"""
+    if _start is None:
+        return
+
+    if file is None:
+        file = sys.stdout
+
+    total = _clock() - _start
+    res = results()
+    used = sum(r[2] for r in res)
+
+    print("", file=file)
+    print("%-44s %12s %10s %7s %10s" % ("generator", "resumptions", "cpu (s)", "%", "us/resume"), file=file)
+    for name, n, t in res + [("(kernel and cosimulation)", 0, max(total-used, 0.0))]:
+        print("%-44s %12s %10.3f %6.1f%% %10s" % (
+            name,
+            n if n else '-',
+            t,
+            100.0*t/total if total else 0.0,
+            "%.2f" % (1e6*t/n) if n else '-'
+        ), file=file)
+    print("%-44s %12d %10.3f" % ("total", sum(r[1] for r in res), total), file=file)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Parameter sweep harness
+#
+# Runs a bench across the cartesian product of parameter values.  Each point
+# is passed to test_bench(**params), which applies it to the Python side of
+# the bench and to the Verilog wrapper as iverilog -P overrides, so the
+# wrapper source does not need to be edited.  Points run in parallel through
+# run_tests, and the results are tabulated with the metrics the bench
+# reports (sim time for every bench, throughput and latency for benches that
+# fill in their metrics dict).
+#
+#     python sweep.py test_i2c_master_wbs_8 CMD_FIFO_DEPTH=4,8,32 DEFAULT_PRESCALE=1,4
+#     python sweep.py test_i2c_slave_wbm FILTER_LEN=1,2,4,8 -c filter.csv
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import run_tests
+
+
+def parse_value(v):
+    try:
+        return int(v, 0)
+    except ValueError:
+        return v
+
+
+def parse_axes(specs):
+    """Parse NAME=v1,v2,... specs into an ordered list of (name, values)"""
+    axes = []
+    for spec in specs:
+        if '=' not in spec:
+            raise ValueError("Invalid sweep spec '%s', expected NAME=v1,v2,..." % spec)
+        name, values = spec.split('=', 1)
+        axes.append((name, [parse_value(v) for v in values.split(',') if v]))
+    return axes
+
+
+def grid(axes):
+    """List of parameter dicts covering every combination of axis values"""
+    names = [a[0] for a in axes]
+    return [dict(zip(names, p)) for p in itertools.product(*[a[1] for a in axes])]
+
+
+def sweep(bench, axes, processes=None, work_dir=None, keep=False):
+    """Run bench over the parameter grid, return results in grid order"""
+    if work_dir is None:
+        work_dir = os.path.join(run_tests.tb_dir, 'run', 'sweep_%s' % bench)
+
+    jobs = run_tests.make_jobs([bench], grid(axes))
+
+    return run_tests.run(jobs, processes=processes, work_dir=work_dir, keep=keep)
+
+
+def tabulate(results, axes):
+    """Return header and rows with one column per parameter and metric"""
+    names = [a[0] for a in axes]
+
+    metric_names = []
+    for r in results:
+        for k in r['metrics']:
+            if k not in metric_names:
+                metric_names.append(k)
+
+    header = names + ['result', 'sim_time', 'wall_time'] + metric_names
+    rows = []
+
+    for r in results:
+        row = [r['params'][n] for n in names]
+        row += ["PASS" if r['passed'] else "FAIL", r['sim_time'], round(r['wall_time'], 2)]
+        for k in metric_names:
+            v = r['metrics'].get(k)
+            row.append(round(v, 2) if isinstance(v, float) else v)
+        rows.append(row)
+
+    return header, rows
+
+
+def print_table(header, rows):
+    rows = [['-' if v is None else str(v) for v in row] for row in rows]
+    widths = [max([len(h)] + [len(row[k]) for row in rows]) for k, h in enumerate(header)]
+
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep testbench parameters")
+    parser.add_argument('bench', help="bench name, for example test_i2c_master_wbs_8")
+    parser.add_argument('axes', nargs='+', help="sweep axes as NAME=v1,v2,...")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument('-w', '--work-dir', default=None, help="scratch directory root")
+    parser.add_argument('-n', '--no-dump', action='store_true', help="disable waveform dumping")
+    parser.add_argument('-k', '--keep', action='store_true', help="keep scratch directories of passing points")
+    parser.add_argument('-c', '--csv', default=None, help="write table as CSV")
+    parser.add_argument('-r', '--report', default=None, help="write JSON report to file")
+
+    args = parser.parse_args()
+
+    if args.no_dump:
+        # inherited by the worker processes
+        os.environ['SIM_DUMP'] = '0'
+
+    bench = os.path.splitext(os.path.basename(args.bench))[0]
+    axes = parse_axes(args.axes)
+
+    start = time.time()
+    results = sweep(bench, axes, processes=args.jobs, work_dir=args.work_dir, keep=args.keep)
+    wall_time = time.time() - start
+
+    header, rows = tabulate(results, axes)
+
+    print("")
+    print_table(header, rows)
+    print("")
+    print("%d points, %d failed, %.2f s" % (len(results), sum(1 for r in results if not r['passed']), wall_time))
+
+    for r in results:
+        if not r['passed']:
+            print("")
+            print("%s failed %s, log in %s" % (r['name'], r['params'], os.path.join(r['work_dir'], 'output.log')))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(rows)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'bench': bench, 'axes': axes, 'wall_time': wall_time, 'results': results}, f, indent=2)
+
+    return 0 if all(r['passed'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from myhdl import *
+import glob
+import os
+import re
+
+import cosim_pack
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
+
+def decl_width(text, name):
+    # width of a declaration with a numeric range, 8 for parameter widths
+    m = re.search(r'^\s*(?:reg|wire)\s*(\[([^\]]+)\])?\s+%s\b' % name, text, re.M)
+    assert m, name
+    if not m.group(1):
+        return 1
+    r = re.match(r'\s*(\d+)\s*:\s*(\d+)\s*$', m.group(2))
+    if not r:
+        return 8
+    return int(r.group(1)) - int(r.group(2)) + 1
+
+def slices(text, pat):
+    # (name, msb, lsb) of the assigns matching pat, in source order
+    return [(m.group('name'), int(m.group('msb')), int(m.group('lsb'))) for m in re.finditer(pat, text)]
+
+def test_wrappers():
+    for fn in sorted(glob.glob(os.path.join(tb_dir, 'test_*.v'))):
+        with open(fn) as f:
+            text = f.read()
+
+        from_names, to_names = cosim_pack.parse_wrapper(text)
+
+        assert 'clk' in from_names
+        assert 'current_test' in from_names
+        assert to_names
+        assert not set(from_names) & set(to_names)
+
+        from_fields = [(n, decl_width(text, n), 0) for n in from_names]
+        to_fields = [(n, decl_width(text, n), 0) for n in to_names]
+
+        gen = cosim_pack.generate_wrapper(text, from_fields, to_fields)
+
+        # one packed vector per direction
+        assert cosim_pack.parse_wrapper(gen) == ([cosim_pack.FROM_NAME], [cosim_pack.TO_NAME])
+
+        # nets driven from MyHDL are now wires
+        for n, w, i in from_fields:
+            assert not re.search(r'^\s*reg\b[^;]*\b%s\b' % n, gen, re.M), (fn, n)
+
+        # from fields in order, first in the most significant bits
+        s = slices(gen, r'assign (?P<name>\w+) = %s\[(?P<msb>\d+):(?P<lsb>\d+)\];' % cosim_pack.FROM_NAME)
+        assert [e[0] for e in s] == from_names
+        msb = sum(f[1] for f in from_fields) - 1
+        for (n, w, i), (n2, h, l) in zip(from_fields, s):
+            assert (h, l) == (msb, msb - w + 1), (fn, n)
+            msb = l - 1
+        assert msb == -1
+
+        # to fields in order, each starting on a hex digit
+        s = slices(gen, r'assign %s\[(?P<msb>\d+):(?P<lsb>\d+)\] = (?P<name>[A-Za-z_]\w*);' % cosim_pack.TO_NAME)
+        assert [e[0] for e in s] == to_names
+        for (n, w, i), (n2, h, l) in zip(to_fields, s):
+            assert h - l + 1 == w
+            assert l % 4 == 0
+
+def test_pack():
+    a = Signal(intbv(0x5)[3:])
+    b = Signal(bool(1))
+    c = Signal(intbv(0xab)[8:])
+    d = Signal(intbv(-2, min=-8, max=8))
+
+    assert cosim_pack.pack([a, b, c, d]) == (0x5 << 13) | (1 << 12) | (0xab << 4) | 0xe
+
+    # digit aligned: a in bits 15:12, b in bit 8, c in 7:0
+    assert cosim_pack.unpack('5' '1' 'ab', [a, b, c]) == [5, 1, 0xab]
+    # missing leading zeros
+    assert cosim_pack.unpack('1ab', [a, b, c]) == [0, 1, 0xab]
+    # all x gives the initial value, all z None, partly unknown 0
+    assert cosim_pack.unpack('x' 'Z' '3X', [a, b, c]) == [0x5, None, 0]
+    assert cosim_pack.unpack('xx', [c]) == [0xab]
+    # signed fields are sign extended
+    assert cosim_pack.unpack('e' 'd', [d, d]) == [-2, -3]
+
+def test_cosim_io():
+    # _put and _get over pipes, without a simulator
+    a = Signal(intbv(0x5)[3:])
+    b = Signal(bool(1))
+    c = Signal(intbv(0x12)[8:])
+
+    x = Signal(intbv(0)[4:])
+    y = Signal(bool(0))
+    z = Signal(intbv(0x3c)[6:])
+
+    cosim = object.__new__(cosim_pack.PackedCosimulation)
+    cosim._packFrom = [a, b, c]
+    cosim._packTo = [x, y, z]
+
+    rt, wt = os.pipe()
+    rf, wf = os.pipe()
+    cosim._rt = rt
+    cosim._wf = wf
+
+    cosim._hasChange = 1
+    cosim._put(100)
+    assert os.read(rf, 100).decode() == "100 %x" % ((0x5 << 9) | (1 << 8) | 0x12)
+    assert cosim._getMode == 1
+
+    os.write(wt, ("100 %s a" "1" "xx" % cosim_pack.TO_NAME).encode())
+    cosim._get()
+    assert (x._next, y._next, z._next) == (0xa, 1, 0x3c)
+    assert cosim._getMode == 0
+
+    for fd in (rt, wt, rf, wf):
+        os.close(fd)
@@ -25,8 +25,13 @@ THE SOFTWARE.
 
 from myhdl import *
 import os
+import random
 
+import fast_forward
 import i2c
+import sim_build
+import sim_profile
+import watchdog
 
 def bench():
 
@@ -44,6 +49,15 @@ def bench():
     s2_scl_i = Signal(bool(1))
     s2_sda_i = Signal(bool(1))
 
+    s3_scl_i = Signal(bool(1))
+    s3_sda_i = Signal(bool(1))
+
+    s4_scl_i = Signal(bool(1))
+    s4_sda_i = Signal(bool(1))
+
+    s5_scl_i = Signal(bool(1))
+    s5_sda_i = Signal(bool(1))
+
     # Outputs
     m_scl_o = Signal(bool(1))
     m_scl_t = Signal(bool(1))
@@ -60,6 +74,30 @@ def bench():
     s2_sda_o = Signal(bool(1))
     s2_sda_t = Signal(bool(1))
 
+    s3_scl_o = Signal(bool(1))
+    s3_scl_t = Signal(bool(1))
+    s3_sda_o = Signal(bool(1))
+    s3_sda_t = Signal(bool(1))
+
+    s4_scl_o = Signal(bool(1))
+    s4_scl_t = Signal(bool(1))
+    s4_sda_o = Signal(bool(1))
+    s4_sda_t = Signal(bool(1))
+
+    s5_scl_o = Signal(bool(1))
+    s5_scl_t = Signal(bool(1))
+    s5_sda_o = Signal(bool(1))
+    s5_sda_t = Signal(bool(1))
+
+    n_scl = Signal(bool(1))
+    n_sda = Signal(bool(1))
+
+    # directly driven lines and active SCL pull-up, for bus tests; the SCL
+    # driver is two bits wide so it can change without pulling the line low
+    t_scl_o = Signal(intbv(1)[2:])
+    t_sda_o = Signal(bool(1))
+    scl_pu = Signal(bool(0))
+
     # I2C master
     i2c_master_inst = i2c.I2CMaster()
 
@@ -89,6 +127,7 @@ def bench():
         abw=2,
         address=0x50,
         latency=0,
+        track_timing=True,
         name='slave1'
     )
 
@@ -108,21 +147,182 @@ def bench():
         name='slave2'
     )
 
-    @always_comb
-    def bus():
-        # emulate I2C wired AND
-        m_scl_i.next = m_scl_o & s1_scl_o & s2_scl_o;
-        m_sda_i.next = m_sda_o & s1_sda_o & s2_sda_o;
+    # I2C register device, sensor-like
+    i2c_reg_inst = i2c.I2CRegisterDevice(256)
+
+    i2c_reg_logic = i2c_reg_inst.create_logic(
+        scl_i=s3_scl_i,
+        scl_o=s3_scl_o,
+        scl_t=s3_scl_t,
+        sda_i=s3_sda_i,
+        sda_o=s3_sda_o,
+        sda_t=s3_sda_t,
+        abw=1,
+        address=0x48,
+        name='slave3'
+    )
+
+    # I2C memory model 4, 24C08 style, 0x58-0x5b select 256 byte blocks
+    i2c_mem_inst4 = i2c.I2CMem(1024)
+
+    i2c_mem_logic4 = i2c_mem_inst4.create_logic(
+        scl_i=s4_scl_i,
+        scl_o=s4_scl_o,
+        scl_t=s4_scl_t,
+        sda_i=s4_sda_i,
+        sda_o=s4_sda_o,
+        sda_t=s4_sda_t,
+        abw=1,
+        address=0x58,
+        address_mask=0x7c,
+        map_address=True,
+        name='slave4'
+    )
+
+    # I2C memory model 5, address list 0x60/0x64 with bit 0 free, 256 byte
+    # blocks 0-3 for 0x60, 0x61, 0x64, 0x65
+    i2c_mem_inst5 = i2c.I2CMem(1024)
+
+    i2c_mem_logic5 = i2c_mem_inst5.create_logic(
+        scl_i=s5_scl_i,
+        scl_o=s5_scl_o,
+        scl_t=s5_scl_t,
+        sda_i=s5_sda_i,
+        sda_o=s5_sda_o,
+        sda_t=s5_sda_t,
+        abw=1,
+        address=[0x60, 0x64],
+        address_mask=0x7e,
+        map_address=True,
+        name='slave5'
+    )
+
+    # I2C wired AND, ideal until a pull-up and capacitance are set
+    i2c_bus_inst = i2c.I2CBus()
+
+    bus = i2c_bus_inst.create_logic(
+        drivers=[
+            (m_scl_o, m_sda_o),
+            (s1_scl_o, s1_sda_o),
+            (s2_scl_o, s2_sda_o),
+            (s3_scl_o, s3_sda_o),
+            (s4_scl_o, s4_sda_o),
+            (s5_scl_o, s5_sda_o),
+            (t_scl_o, t_sda_o)
+        ],
+        endpoints={
+            'master': (m_scl_i, m_sda_i),
+            'slave1': (s1_scl_i, s1_sda_i),
+            'slave2': (s2_scl_i, s2_sda_i),
+            'slave3': (s3_scl_i, s3_sda_i),
+            'slave4': (s4_scl_i, s4_sda_i),
+            'slave5': (s5_scl_i, s5_sda_i)
+        },
+        scl_pullup=scl_pu
+    )
+
+    # bus monitor
+    i2c_monitor_inst = i2c.I2CMonitor()
+
+    i2c_monitor_logic = i2c_monitor_inst.create_logic(
+        scl_i=m_scl_i,
+        sda_i=m_sda_i,
+        drivers={
+            'master': (m_scl_o, m_sda_o),
+            'slave1': (s1_scl_o, s1_sda_o),
+            'slave2': (s2_scl_o, s2_sda_o),
+            'slave3': (s3_scl_o, s3_sda_o),
+            'slave4': (s4_scl_o, s4_sda_o),
+            'slave5': (s5_scl_o, s5_sda_o)
+        }
+    )
+
+    # timing checker
+    i2c_timing_inst = i2c.I2CTimingChecker()
+
+    i2c_timing_logic = i2c_timing_inst.create_logic(
+        decoder=i2c_monitor_inst.decoder
+    )
+
+    # glitch injector, noisy copy of the bus
+    i2c_glitch_inst = i2c.I2CGlitchInjector()
+
+    i2c_glitch_logic = i2c_glitch_inst.create_logic(
+        scl_i=m_scl_i,
+        sda_i=m_sda_i,
+        scl_o=n_scl,
+        sda_o=n_sda,
+        seed=1
+    )
+
+    # clock, stopped while the bus is idle or stretched
+    ff = fast_forward.FastForward()
+
+    clkgen = ff.create_logic(
+        clk,
+        watch=[m_scl_i, m_sda_i],
+        period=8
+    )
+
+    bus_trace = []
+    noise_trace = []
+    bus_trace_en = [False]
+
+    @instance
+    def bus_monitor():
+        while True:
+            yield m_scl_i, m_sda_i, n_scl, n_sda
+            if bus_trace_en[0]:
+                bus_trace.append((now(), int(m_scl_i), int(m_sda_i)))
+                noise_trace.append((now(), int(n_scl), int(n_sda)))
+
+    # first SCL rise per endpoint since the last clear
+    scl_rise = {}
+
+    @instance
+    def scl_rise_monitor():
+        while True:
+            yield m_scl_i.posedge, s1_scl_i.posedge
+            for n, sig in (('master', m_scl_i), ('slave1', s1_scl_i)):
+                if sig and n not in scl_rise:
+                    scl_rise[n] = now()
+
+    def line_changes(trace, k):
+        c = []
+        for e in trace:
+            if c and c[-1][0] == e[0]:
+                # last value of each time step
+                c.pop()
+            if not c or e[k] != c[-1][1]:
+                c.append((e[0], e[k]))
+        return c
 
-        s1_scl_i.next = m_scl_o & s1_scl_o & s2_scl_o;
-        s1_sda_i.next = m_sda_o & s1_sda_o & s2_sda_o;
+    def deglitch(changes, width):
+        # drop pulses of at most width
+        c = []
+        for t, v in changes:
+            if c and t - c[-1][0] <= width:
+                c.pop()
+            else:
+                c.append((t, v))
+        return c
 
-        s2_scl_i.next = m_scl_o & s1_scl_o & s2_scl_o;
-        s2_sda_i.next = m_sda_o & s1_sda_o & s2_sda_o;
+    # watchdog
+    wd = watchdog.Watchdog()
 
-    @always(delay(4))
-    def clkgen():
-        clk.next = not clk
+    wd_logic = wd.create_logic(
+        current_test=current_test,
+        models={
+            'i2c_master': i2c_master_inst,
+            'i2c_mem1': i2c_mem_inst1,
+            'i2c_mem2': i2c_mem_inst2,
+            'i2c_reg': i2c_reg_inst,
+            'i2c_mem4': i2c_mem_inst4,
+            'i2c_mem5': i2c_mem_inst5,
+            'i2c_monitor': i2c_monitor_inst
+        },
+        i2c={'i2c': i2c_monitor_inst}
+    )
 
     @instance
     def check():
@@ -180,6 +380,8 @@ def bench():
         print("test 4: read via I2C")
         current_test.next = 4
 
+        i2c_timing_inst.reset()
+
         i2c_master_inst.init_write(0x50, b'\x00\x04')
         i2c_master_inst.init_read(0x50, 4)
 
@@ -190,12 +392,46 @@ def bench():
         assert data[0] == 0x50
         assert data[1] == b'\x11\x22\x33\x44'
 
+        # check decoded bus traffic, pointer write then repeated start and read
+        while i2c_monitor_inst.queue[-1][1] != 'stop':
+            yield i2c_monitor_inst.sync
+
+        t = i2c_monitor_inst.transactions[-2:]
+        assert t[0][2:] == (0x50, 0, bytearray(b'\x00\x04'), [True, True, True])
+        assert t[1][2:] == (0x50, 1, bytearray(b'\x11\x22\x33\x44'), [True, True, True, True, False])
+
+        ev = i2c_monitor_inst.queue
+        k = max(i for i, e in enumerate(ev) if e[1] == 'repeated_start')
+        assert ev[k][3] == 'master'
+        assert ev[k+1][1:] == ('address', (0x50, 1), 'master')
+        assert ev[k+2][1:] == ('ack', None, 'slave1')
+        assert ev[k+3][1:] == ('data', 0x11, 'slave1')
+        assert ev[k+4][1:] == ('ack', None, 'master')
+        assert ev[-1][1:] == ('stop', None, 'master')
+
+        # prescale 2, 8 ns clock, one extra cycle where the master waits
+        # to see SCL released
+        i2c_timing_inst.report('fast')
+
+        v = i2c_timing_inst.min_values
+        assert v['t_hd_sta'] == 2*8
+        assert v['t_su_sta'] == (2+1)*8
+        assert v['t_su_sto'] == (2+1)*8
+        assert v['t_low'] == 2*2*8
+        assert v['t_high'] == (2*2+1)*8
+        assert v['t_su_dat'] == 2*8
+        assert v['t_hd_dat'] == 0
+        assert i2c_timing_inst.margins('fast-plus')['t_low'] == 2*2*8 - 500
+        assert 't_hd_dat' not in i2c_timing_inst.violations('standard')
+
         yield delay(100)
 
         yield clk.posedge
         print("test 5: access slave 2")
         current_test.next = 3
 
+        i2c_monitor_inst.reset_stats()
+
         i2c_master_inst.init_write(0x51, b'\x00\x04'+b'\x11\x22\x33\x44')
 
         yield i2c_master_inst.wait()
@@ -219,16 +455,579 @@ def bench():
 
         yield delay(100)
 
+        i2c_monitor_inst.report()
+
+        st = i2c_monitor_inst.stats()
+        assert st['per_address'] == {0x51: {'transactions': 3, 'bytes': 12, 'nacks': 0, 'stretch': st['stretch']['slave2']}}
+        assert list(st['stretch']) == ['slave2']
+        # latency of 1000 before each of 10 data bytes, less the SCL low time
+        assert 10*900 < st['stretch']['slave2'] < 10*1000
+        assert st['scl_period'] == 2*2*8 + (2*2+1)*8
+        assert 0.9 < st['busy_fraction'] <= 1.0
+        assert st['goodput_ratio'] < 0.5
+
+        yield clk.posedge
+        print("test 6: asymmetric SCL timing")
+        current_test.next = 6
+
+        i2c_master_inst.prescale = 3
+        i2c_master_inst.prescale_high = 4
+        i2c_mem_inst1.reset_timing()
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x55\x66\x77\x88')
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x55\x66\x77\x88'
+
+        print(i2c_mem_inst1.scl_timing)
+
+        # 8 ns clock period, one extra cycle of high time to see SCL released
+        assert i2c_mem_inst1.scl_timing['fs'] == [3*2*8, (4+1)*8]
+
+        i2c_master_inst.prescale = 2
+        i2c_master_inst.prescale_high = None
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 7: high-speed mode")
+        current_test.next = 7
+
+        i2c_master_inst.hs_mode = True
+        i2c_master_inst.hs_master_code = 5
+        i2c_mem_inst1.reset_timing()
+        hs_count = i2c_mem_inst1.hs_count
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x99\xaa\xbb\xcc')
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x99\xaa\xbb\xcc'
+
+        # wait for stop
+        yield delay(500)
+
+        print(i2c_mem_inst1.scl_timing)
+
+        assert i2c_mem_inst1.hs_count == hs_count + 1
+        assert not i2c_mem_inst1.hs_mode
+        assert i2c_mem_inst1.scl_timing['fs'] == [2*2*8, (2*2+1)*8]
+        assert i2c_mem_inst1.scl_timing['hs'] == [1*2*8, (1*2+1)*8]
+        # the other models left HS mode at the stop, without timing tracking
+        assert not i2c_mem_inst2.hs_mode
+        assert i2c_mem_inst2.hs_count == i2c_mem_inst1.hs_count
+        assert i2c_mem_inst2.scl_timing == {}
+
+        i2c_master_inst.hs_mode = False
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 8: fast-forward over clock stretching")
+        current_test.next = 8
+
+        # same accesses with and without skipping must produce the same
+        # bus waveform
+        traces = []
+
+        for en in [False, True]:
+            ff.enabled = en
+            skipped = ff.skipped_cycles
+
+            yield clk.posedge
+            del bus_trace[:]
+            bus_trace_en[0] = True
+
+            i2c_master_inst.init_write(0x51, b'\x00\x08'+b'\xaa\xbb')
+            i2c_master_inst.init_write(0x51, b'\x00\x08')
+            i2c_master_inst.init_read(0x51, 2)
+
+            yield i2c_master_inst.wait()
+            yield clk.posedge
+
+            bus_trace_en[0] = False
+            traces.append([(t-bus_trace[0][0], scl, sda) for t, scl, sda in bus_trace])
+
+            data = i2c_master_inst.get_read_data()
+            assert data[1] == b'\xaa\xbb'
+
+            if en:
+                assert ff.skipped_cycles > skipped
+            else:
+                assert ff.skipped_cycles == skipped
+
+            yield delay(100)
+
+        assert traces[0] == traces[1]
+
+        yield clk.posedge
+        print("test 9: glitch injection")
+        current_test.next = 9
+
+        i2c_glitch_inst.spike_interval = 200
+        i2c_glitch_inst.spike_width = (1, 6)
+        i2c_glitch_inst.ring_count = 2
+        i2c_glitch_inst.ring_width = 1
+
+        yield clk.posedge
+        del bus_trace[:]
+        del noise_trace[:]
+        bus_trace_en[0] = True
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x11\x22\x33\x44')
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        bus_trace_en[0] = False
+
+        i2c_glitch_inst.spike_interval = 0
+        i2c_glitch_inst.ring_count = 0
+
+        print("spikes: %d, ringing edges: %d" % (i2c_glitch_inst.spikes, i2c_glitch_inst.rings))
+
+        assert i2c_glitch_inst.spikes > 0
+        assert i2c_glitch_inst.rings > 0
+
+        # with pulses up to the spike width removed, the noisy lines follow
+        # the bus, early by up to one spike that overlaps an edge, late by
+        # up to the ringing plus a spike that starts right after it
+        for k in [1, 2]:
+            clean = line_changes(bus_trace, k)
+            noisy = deglitch(line_changes(noise_trace, k), 6)
+            assert len(clean) == len(noisy)
+            for (t1, v1), (t2, v2) in zip(clean, noisy):
+                assert v1 == v2
+                assert -6 <= t2 - t1 <= 2*2*1 + 6 + 6
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 10: bus rise time")
+        current_test.next = 10
+
+        i2c_master_inst.get_read_data()
+
+        # 2k pull-up, 5 pF, the master (V_IH 0.7) sees SCL high 12 ns after
+        # release, which stretches every SCL low period
+        i2c_bus_inst.r_pullup = 2000
+        i2c_bus_inst.c_bus = 5
+        i2c_monitor_inst.reset_stats()
+        i2c_timing_inst.reset()
+
+        print("rise time: %g ns" % i2c_bus_inst.rise_time())
+
+        assert i2c_bus_inst.rise_delay('master') == 12
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x5a\xa5\x3c\xc3')
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x5a\xa5\x3c\xc3'
+
+        assert i2c_timing_inst.min_values['t_low'] == 2*2*8 + 12
+        assert i2c_monitor_inst.stats()['scl_period'] == 2*2*8 + (2*2+1)*8 + 8
+
+        yield delay(100)
+
+        # 3k pull-up, 10 pF, slave 1 with V_IH at 0.9 sees SCL high for
+        # only a few ns and the read fails
+        i2c_bus_inst.r_pullup = 3000
+        i2c_bus_inst.c_bus = 10
+        i2c_bus_inst.thresholds['slave1'] = 0.9
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x01\x02\x03\x04')
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert i2c_mem_inst1.read_mem(4, 4) == b'\x01\x02\x03\x04'
+        assert data[1] != b'\x01\x02\x03\x04'
+
+        yield delay(1000)
+
+        # each endpoint reads SCL high at its own threshold crossing, 36 for
+        # the master and 69 for slave 1, or as soon as the pull-up is on
+        for pulse in [None, 20, 50]:
+            t_scl_o.next = 0
+            yield delay(100)
+            scl_rise.clear()
+            t_scl_o.next = 1
+            yield t_scl_o.posedge
+            t0 = now()
+            if pulse is not None:
+                yield delay(pulse)
+                scl_pu.next = 1
+                yield delay(1)
+                scl_pu.next = 0
+            yield delay(100)
+            t_m = scl_rise['master'] - t0
+            t_s1 = scl_rise['slave1'] - t0
+            if pulse is None:
+                assert (t_m, t_s1) == (36, 69)
+            elif pulse < 36:
+                assert (t_m, t_s1) == (pulse, pulse)
+            else:
+                assert (t_m, t_s1) == (36, pulse)
+
+            yield delay(100)
+
+        # a driver event that leaves the line released does not cut the
+        # rise short
+        t_scl_o.next = 0
+        yield delay(100)
+        scl_rise.clear()
+        t_scl_o.next = 1
+        yield delay(1)
+        t0 = now() - 1
+        yield delay(19)
+        t_scl_o.next = 3
+        yield delay(100)
+        assert (scl_rise['master'] - t0, scl_rise['slave1'] - t0) == (36, 69)
+        t_scl_o.next = 1
+
+        yield delay(100)
+
+        # ideal bus again
+        i2c_bus_inst.r_pullup = None
+        i2c_bus_inst.c_bus = None
+        i2c_bus_inst.thresholds = {}
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x01\x02\x03\x04'
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 11: fault injection")
+        current_test.next = 11
+
+        # NACK the address
+        i2c_mem_inst1.add_fault('nack', byte=0)
+
+        i2c_master_inst.init_write(0x50, b'\x00\x10'+b'\xaa')
+
+        yield i2c_master_inst.wait()
+        while i2c_monitor_inst.queue[-1][1] != 'stop':
+            yield i2c_monitor_inst.sync
+
+        # the model ignores the rest of the transaction
+        assert i2c_monitor_inst.transactions[-1][5] == [False]*4
+        assert i2c_mem_inst1.read_mem(0x10, 1) == b'\x00'
+
+        # flip the MSB of the byte read from 0x0005
+        i2c_mem_inst1.add_fault('flip', ptr=0x0005, bit=7)
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x01\x82\x03\x04'
+
+        # stretch SCL before the first pointer byte
+        i2c_mem_inst1.add_fault('stretch', byte=1, time=3000)
+        i2c_monitor_inst.reset_stats()
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        # measured from the master releasing SCL
+        st = i2c_monitor_inst.stats()
+        assert 3000 - 2*2*8 <= st['stretch']['slave1'] <= 3000
+
+        # hold SDA low for 9 clocks from the second data byte of the read
+        # after the next transaction
+        i2c_mem_inst1.add_fault('stuck_sda', transaction=i2c_mem_inst1.transaction_count+1, byte=2, cycles=9)
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+        # zeros while SDA is held, ones once the model stops driving
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x01\x00\xff\xff'
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+        # next transaction works
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x01\x02\x03\x04'
+
+        assert [f[1] for f in i2c_mem_inst1.fault_log] == ['nack', 'flip', 'stretch', 'stuck_sda']
+        assert [f[3] for f in i2c_mem_inst1.fault_log] == [0, 2, 1, 2]
+        assert all(f['count'] == 0 for f in i2c_mem_inst1.faults)
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 12: latency profiles")
+        current_test.next = 12
+
+        # callable, sees the pointer of every stretched byte
+        calls = []
+        i2c_mem_inst1.latency = lambda ptr, rw: calls.append((ptr, rw)) or 100
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x11\x22')
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+        i2c_master_inst.init_read(0x50, 2)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x11\x22'
+        # the write loop also stretches before the byte that turns out to be a stop
+        assert calls == [(None, 0), (4, 0), (5, 0), (6, 0), (None, 0), (4, 0), (None, 1), (4, 1), (5, 1)]
+
+        # per phase, seeded ranges
+        i2c_mem_inst1.latency = 0
+
+        i2c_master_inst.init_write(0x50, b'\x00\x04')
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        profile = {'address': 500, 'first': (2000, 3000), 'next': 0, 'seed': 1}
+        i2c_mem_inst1.latency = profile
+        i2c_monitor_inst.reset_stats()
+
+        i2c_master_inst.init_read(0x50, 4)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        data = i2c_master_inst.get_read_data()
+        assert data[1] == b'\x11\x22\x03\x04'
+
+        first = random.Random(1).randint(2000, 3000)
+        st = i2c_monitor_inst.stats()
+        assert 500 + first - 2*2*2*8 <= st['stretch']['slave1'] <= 500 + first
+
+        # the generator is kept in the model, the profile is not modified
+        assert profile == {'address': 500, 'first': (2000, 3000), 'next': 0, 'seed': 1}
+
+        i2c_mem_inst1.latency = 0
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 13: register device")
+        current_test.next = 13
+
+        # 16 bit reading, read only, pointer stays on it
+        samples = [0x1900, 0x1910]
+        temp = i2c_reg_inst.add_register(0x00, width=2, mask=0, next=0x00,
+            read=lambda reg: samples.pop(0))
+        # config, bit 7 read only
+        written = []
+        i2c_reg_inst.add_register(0x01, value=0x80, mask=0x7f,
+            write=lambda reg, v: written.append(v))
+        # status, alert bit cleared on read
+        i2c_reg_inst.add_register(0x02, value=0x81, clear_on_read=0x01)
+        # PMBus style little endian word
+        i2c_reg_inst.add_register(0x03, width=2, value=0x1234, byteorder='little')
+
+        i2c_master_inst.init_write(0x48, b'\x01\x05')
+        i2c_master_inst.init_write(0x48, b'\x00\xff\xff')
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        assert i2c_reg_inst.read_reg(0x01) == 0x85
+        assert written == [0x05]
+        assert temp['value'] == 0
+
+        # stop after each read
+        i2c_master_inst.init_write(0x48, b'\x00')
+        i2c_master_inst.init_read(0x48, 4)
+        yield i2c_master_inst.wait()
+        i2c_master_inst.init_write(0x48, b'\x02')
+        i2c_master_inst.init_read(0x48, 3)
+        yield i2c_master_inst.wait()
+        i2c_master_inst.init_write(0x48, b'\x02')
+        i2c_master_inst.init_read(0x48, 1)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        assert i2c_master_inst.get_read_data()[1] == b'\x19\x00\x19\x10'
+        assert i2c_master_inst.get_read_data()[1] == b'\x81\x34\x12'
+        assert i2c_master_inst.get_read_data()[1] == b'\x80'
+
+        # partial write dropped, unmapped pointers use the memory
+        i2c_master_inst.init_write(0x48, b'\x03\xff')
+        i2c_master_inst.init_write(0x48, b'\x10\xaa\xbb')
+        i2c_master_inst.init_write(0x48, b'\x10')
+        i2c_master_inst.init_read(0x48, 2)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        assert i2c_reg_inst.read_reg(0x03) == 0x1234
+        assert i2c_reg_inst.read_mem(0x10, 2) == b'\xaa\xbb'
+        assert i2c_master_inst.get_read_data()[1] == b'\xaa\xbb'
+
+        # an address only write (bus probe) keeps the pointer
+        i2c_master_inst.init_write(0x48, [0x10])
+        i2c_master_inst.init_write(0x48, b'')
+        i2c_master_inst.init_read(0x48, 2)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        assert i2c_master_inst.get_read_data()[1] == b'\xaa\xbb'
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 14: address mask")
+        current_test.next = 14
+
+        for k in range(4):
+            i2c_master_inst.init_write(0x58+k, b'\x10'+bytearray([k, k+0x10]))
+
+        # current address read continues in the selected block
+        i2c_master_inst.init_write(0x5a, b'\x10')
+        i2c_master_inst.init_read(0x5a, 1)
+        yield i2c_master_inst.wait()
+        i2c_master_inst.init_read(0x5a, 1)
+        yield i2c_master_inst.wait()
+        i2c_master_inst.init_read(0x59, 1)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        for k in range(4):
+            assert i2c_mem_inst4.read_mem(k*256+0x10, 2) == bytearray([k, k+0x10])
+
+        assert i2c_master_inst.get_read_data()[1] == b'\x02'
+        assert i2c_master_inst.get_read_data()[1] == b'\x12'
+        # pointer 0x12 carried over into block 1
+        assert i2c_master_inst.get_read_data()[1] == b'\x00'
+
+        # outside the mask, not acknowledged
+        i2c_master_inst.init_write(0x5c, b'\x10\xaa')
+
+        yield i2c_master_inst.wait()
+        while i2c_monitor_inst.queue[-1][1] != 'stop':
+            yield i2c_monitor_inst.sync
+
+        assert i2c_monitor_inst.transactions[-1][5] == [False]*3
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 15: address list")
+        current_test.next = 15
+
+        addrs = [0x60, 0x61, 0x64, 0x65]
+
+        for k, a in enumerate(addrs):
+            i2c_master_inst.init_write(a, b'\x20'+bytearray([a, k]))
+
+        # list position selects the upper block, pointer carries over
+        i2c_master_inst.init_write(0x64, b'\x20')
+        i2c_master_inst.init_read(0x64, 2)
+        yield i2c_master_inst.wait()
+        i2c_master_inst.init_read(0x65, 1)
+
+        yield i2c_master_inst.wait()
+        yield clk.posedge
+
+        for k, a in enumerate(addrs):
+            assert i2c_mem_inst5.read_mem(k*256+0x20, 2) == bytearray([a, k])
+
+        assert i2c_master_inst.get_read_data()[1] == b'\x64\x02'
+        assert i2c_master_inst.get_read_data()[1] == b'\x00'
+
+        # between the list entries, not acknowledged
+        i2c_master_inst.init_write(0x62, b'\x20\xaa')
+
+        yield i2c_master_inst.wait()
+        while i2c_monitor_inst.queue[-1][1] != 'stop':
+            yield i2c_monitor_inst.sync
+
+        assert i2c_monitor_inst.transactions[-1][5] == [False]*3
+        assert i2c_mem_inst5.read_mem(0x20, 1) == b'\x60'
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 16: repeated start after read")
+        current_test.next = 16
+
+        i2c_mem_inst1.write_mem(0x0040, b'\x11\x22\x33\x44')
+
+        # no stop between the commands, each read ends with a NACK
+        # directly followed by a repeated start
+        i2c_master_inst.init_write(0x50, b'\x00\x40')
+        i2c_master_inst.init_read(0x50, 2)
+        i2c_master_inst.init_read(0x50, 1)
+        i2c_master_inst.init_write(0x50, b'\x00\x48\x55')
+        i2c_master_inst.init_write(0x50, b'\x00\x43')
+        i2c_master_inst.init_read(0x50, 1)
+        i2c_master_inst.init_read(0x50, 1)
+
+        yield i2c_master_inst.wait()
+        while i2c_monitor_inst.queue[-1][1] != 'stop':
+            yield i2c_monitor_inst.sync
+
+        assert i2c_master_inst.get_read_data()[1] == b'\x11\x22'
+        assert i2c_master_inst.get_read_data()[1] == b'\x33'
+        assert i2c_master_inst.get_read_data()[1] == b'\x44'
+        assert i2c_master_inst.get_read_data()[1] == b'\x00'
+        assert i2c_mem_inst1.read_mem(0x0048, 1) == b'\x55'
+
+        trans = i2c_monitor_inst.transactions[-7:]
+        assert [t[5] for t in trans] == [[True]*3, [True, True, False], [True, False], [True]*4, [True]*3, [True, False], [True, False]]
+
+        yield delay(100)
+
         raise StopSimulation
 
-    return i2c_master_logic, i2c_mem_logic1, i2c_mem_logic2, bus, clkgen, check
+    return i2c_master_logic, i2c_mem_logic1, i2c_mem_logic2, i2c_reg_logic, i2c_mem_logic4, i2c_mem_logic5, i2c_monitor_logic, i2c_timing_logic, i2c_glitch_logic, bus, clkgen, bus_monitor, scl_rise_monitor, wd_logic, check
 
 def test_bench():
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
     #sim = Simulation(bench())
-    traceSignals.name = os.path.basename(__file__).rsplit('.',1)[0]
-    sim = Simulation(traceSignals(bench))
+    if sim_build.dump_enabled():
+        traceSignals.name = os.path.basename(__file__).rsplit('.',1)[0]
+        sim = Simulation(sim_profile.instrument(traceSignals(bench)))
+    else:
+        sim = Simulation(sim_profile.instrument(bench()))
     sim.run()
+    sim_profile.report()
 
 if __name__ == '__main__':
     print("Running test...")
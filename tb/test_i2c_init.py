@@ -27,6 +27,11 @@ from myhdl import *
 import os
 
 import axis_ep
+import sim_build
+import sim_profile
+import watchdog
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
 
 module = 'i2c_init'
 testbench = 'test_%s' % module
@@ -36,10 +41,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("%s.v" % testbench)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o %s.vvp %s" % (testbench, src)
-
 def bench():
 
     # Parameters
@@ -97,11 +98,10 @@ def bench():
     )
 
     # DUT
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-
-    dut = Cosimulation(
-        "vvp -m myhdl %s.vvp -lxt2" % testbench,
+    dut = sim_build.cosimulation(
+        testbench,
+        srcs,
+        src_dir=tb_dir,
         clk=clk,
         rst=rst,
         current_test=current_test,
@@ -125,6 +125,18 @@ def bench():
     def clkgen():
         clk.next = not clk
 
+    # watchdog
+    wd = watchdog.Watchdog()
+
+    wd_logic = wd.create_logic(
+        current_test=current_test,
+        models={
+            'cmd_sink': cmd_sink,
+            'data_sink': data_sink
+        },
+        signals={'busy': busy, 'm_axis_cmd_valid': m_axis_cmd_valid, 'm_axis_data_tvalid': m_axis_data_tvalid}
+    )
+
     @instance
     def check():
         yield delay(100)
@@ -256,8 +268,9 @@ def bench():
     return instances()
 
 def test_bench():
-    sim = Simulation(bench())
+    sim = Simulation(sim_profile.instrument(bench()))
     sim.run()
+    sim_profile.report()
 
 if __name__ == '__main__':
     print("Running test...")
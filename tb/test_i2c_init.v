@@ -55,6 +55,14 @@ wire m_axis_data_tvalid;
 wire m_axis_data_tlast;
 wire busy;
 
+// waveform dump control
+integer dump_depth = 0;
+reg [31:0] dump_start = 0;
+reg [31:0] dump_stop = 0;
+reg [31:0] dump_test = 0;
+reg dump_window = 0;
+reg dump_on = 1;
+
 initial begin
     // myhdl integration
     $from_myhdl(
@@ -79,8 +87,40 @@ initial begin
     );
 
     // dump file
-    $dumpfile("test_i2c_init.lxt");
-    $dumpvars(0, test_i2c_init);
+    // +nodump disables dumping, +dump_depth=N limits the hierarchy depth
+    if (!$test$plusargs("nodump")) begin
+        if (!$value$plusargs("dump_depth=%d", dump_depth))
+            dump_depth = 0;
+        $dumpfile("test_i2c_init.lxt");
+`ifdef DUMP_SCOPE
+        $dumpvars(dump_depth, `DUMP_SCOPE);
+`else
+        $dumpvars(dump_depth, test_i2c_init);
+`endif
+        // +dump_start=T, +dump_stop=T and +dump_test=N limit dumping to
+        // a time window and/or a current_test value
+        dump_window = $value$plusargs("dump_start=%d", dump_start);
+        dump_window = $value$plusargs("dump_stop=%d", dump_stop) | dump_window;
+        dump_window = $value$plusargs("dump_test=%d", dump_test) | dump_window;
+        if (dump_window) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
+end
+
+always @(posedge clk) begin
+    if (dump_window) begin
+        if ($time >= dump_start && (dump_stop == 0 || $time < dump_stop) && (dump_test == 0 || current_test == dump_test)) begin
+            if (!dump_on) begin
+                $dumpon;
+                dump_on = 1;
+            end
+        end else if (dump_on) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
 end
 
 i2c_init
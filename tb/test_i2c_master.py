@@ -27,7 +27,13 @@ from myhdl import *
 import os
 
 import axis_ep
+import fast_forward
 import i2c
+import sim_build
+import sim_profile
+import watchdog
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
 
 module = 'i2c_master'
 testbench = 'test_%s' % module
@@ -37,10 +43,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("%s.v" % testbench)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o %s.vvp %s" % (testbench, src)
-
 def bench():
 
     # Parameters
@@ -65,6 +67,11 @@ def bench():
     scl_i = Signal(bool(1))
     sda_i = Signal(bool(1))
     prescale = Signal(intbv(0)[16:])
+    prescale_high = Signal(intbv(0)[16:])
+    hs_mode = Signal(bool(0))
+    hs_master_code = Signal(intbv(0)[3:])
+    hs_prescale = Signal(intbv(0)[16:])
+    hs_prescale_high = Signal(intbv(0)[16:])
     stop_on_idle = Signal(bool(0))
 
     s1_scl_i = Signal(bool(1))
@@ -87,6 +94,8 @@ def bench():
     bus_control = Signal(bool(0))
     bus_active = Signal(bool(0))
     missed_ack = Signal(bool(0))
+    hs_active = Signal(bool(0))
+    hs_pullup = Signal(bool(0))
 
     s1_scl_o = Signal(bool(1))
     s1_scl_t = Signal(bool(1))
@@ -154,6 +163,7 @@ def bench():
         abw=2,
         address=0x50,
         latency=0,
+        track_timing=True,
         name='slave1'
     )
 
@@ -174,11 +184,10 @@ def bench():
     )
 
     # DUT
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-
-    dut = Cosimulation(
-        "vvp -m myhdl %s.vvp -lxt2" % testbench,
+    dut = sim_build.cosimulation(
+        testbench,
+        srcs,
+        src_dir=tb_dir,
         clk=clk,
         rst=rst,
         current_test=current_test,
@@ -213,8 +222,15 @@ def bench():
         bus_control=bus_control,
         bus_active=bus_active,
         missed_ack=missed_ack,
+        hs_active=hs_active,
+        hs_pullup=hs_pullup,
 
         prescale=prescale,
+        prescale_high=prescale_high,
+        hs_mode=hs_mode,
+        hs_master_code=hs_master_code,
+        hs_prescale=hs_prescale,
+        hs_prescale_high=hs_prescale_high,
         stop_on_idle=stop_on_idle
     )
 
@@ -230,9 +246,47 @@ def bench():
         s2_scl_i.next = scl_o & s1_scl_o & s2_scl_o;
         s2_sda_i.next = sda_o & s1_sda_o & s2_sda_o;
 
-    @always(delay(4))
-    def clkgen():
-        clk.next = not clk
+    # clock, stopped while the DUT waits for a slave to release SCL; the
+    # PHY holds its state until it sees SCL high, and the stretch ends on a
+    # scheduled I2CMem delay
+    ff = fast_forward.FastForward()
+
+    clkgen = ff.create_logic(
+        clk,
+        watch=[scl_i, sda_i, scl_o, sda_o, busy, s_axis_cmd_ready, s_axis_data_tready, m_axis_data_tvalid],
+        idle=[lambda: scl_o and not scl_i],
+        period=8
+    )
+
+    # I2C bus monitor, statistics only
+    i2c_monitor_inst = i2c.I2CMonitor()
+    i2c_monitor_inst.record = False
+
+    i2c_monitor_logic = i2c_monitor_inst.create_logic(
+        scl_i=scl_i,
+        sda_i=sda_i,
+        drivers={
+            'master': (scl_o, sda_o),
+            'slave1': (s1_scl_o, s1_sda_o),
+            'slave2': (s2_scl_o, s2_sda_o)
+        }
+    )
+
+    # watchdog
+    wd = watchdog.Watchdog()
+
+    wd_logic = wd.create_logic(
+        current_test=current_test,
+        models={
+            'cmd_source': cmd_source,
+            'data_source': data_source,
+            'data_sink': data_sink,
+            'i2c_mem1': i2c_mem_inst1,
+            'i2c_mem2': i2c_mem_inst2
+        },
+        i2c={'i2c': i2c_monitor_inst},
+        signals={'busy': busy, 'bus_active': bus_active}
+    )
 
     @instance
     def check():
@@ -329,6 +383,8 @@ def bench():
         print("test 3: write to slave 2")
         current_test.next = 3
 
+        skipped = ff.skipped_cycles
+
         cmd_source.send([(
             0x51, # address
             0,    # start
@@ -352,6 +408,10 @@ def bench():
 
         assert i2c_mem_inst2.read_mem(4,4) == b'\x44\x33\x22\x11'
 
+        # slave 2 stretches were skipped
+        if fast_forward.supported():
+            assert ff.skipped_cycles > skipped
+
         yield delay(100)
 
         yield clk.posedge
@@ -430,13 +490,127 @@ def bench():
 
         yield delay(100)
 
+        yield clk.posedge
+        print("test 6: asymmetric SCL timing")
+        current_test.next = 6
+
+        prescale_high.next = 6
+        i2c_mem_inst1.reset_timing()
+
+        yield clk.posedge
+
+        cmd_source.send([(
+            0x50, # address
+            0,    # start
+            0,    # read
+            0,    # write
+            1,    # write_multiple
+            1     # stop
+        )])
+        data_source.send((b'\x00\x04'+b'\x55\x66\x77\x88'))
+
+        yield clk.posedge
+        yield clk.posedge
+        yield clk.posedge
+        while busy or bus_active or not cmd_source.empty():
+            yield clk.posedge
+        yield clk.posedge
+
+        print(i2c_mem_inst1.scl_timing)
+
+        assert i2c_mem_inst1.read_mem(4,4) == b'\x55\x66\x77\x88'
+
+        # SCL high time follows prescale_high, low time stays at 2*prescale (8 ns clock)
+        t_low, t_high = i2c_mem_inst1.scl_timing['fs']
+        assert t_high >= 6*8
+        assert t_low >= 2*2*8
+        assert t_high > t_low
+
+        prescale_high.next = 0
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 7: high-speed mode")
+        current_test.next = 7
+
+        hs_mode.next = 1
+        hs_master_code.next = 3
+        hs_prescale.next = 1
+        i2c_mem_inst1.reset_timing()
+        hs_count = i2c_mem_inst1.hs_count
+
+        yield clk.posedge
+
+        cmd_source.send([(
+            0x50, # address
+            0,    # start
+            0,    # read
+            0,    # write
+            1,    # write_multiple
+            0     # stop
+        )])
+        data_source.send((b'\x00\x04'))
+
+        for i in range(3):
+            cmd_source.send([(
+                0x50, # address
+                0,    # start
+                1,    # read
+                0,    # write
+                0,    # write_multiple
+                0     # stop
+            )])
+
+        cmd_source.send([(
+            0x50, # address
+            0,    # start
+            1,    # read
+            0,    # write
+            0,    # write_multiple
+            1     # stop
+        )])
+
+        got_hs_active = False
+        got_hs_pullup = False
+
+        yield clk.posedge
+        yield clk.posedge
+        yield clk.posedge
+        while busy or bus_active or not cmd_source.empty():
+            got_hs_active |= bool(hs_active)
+            got_hs_pullup |= bool(hs_pullup)
+            yield clk.posedge
+        yield clk.posedge
+
+        print(i2c_mem_inst1.scl_timing)
+
+        data = data_sink.recv()
+        assert data.data == b'\x55\x66\x77\x88'
+
+        assert got_hs_active
+        assert got_hs_pullup
+        assert not hs_active
+        assert i2c_mem_inst1.hs_count == hs_count + 1
+        assert not i2c_mem_inst1.hs_mode
+
+        # master code sent at F/S speed, rest of transfer at HS speed
+        assert i2c_mem_inst1.scl_timing['hs'][0] < i2c_mem_inst1.scl_timing['fs'][0]
+
+        hs_mode.next = 0
+
+        yield delay(100)
+
+        i2c_monitor_inst.report()
+
         raise StopSimulation
 
     return instances()
 
 def test_bench():
-    sim = Simulation(bench())
+    sim = Simulation(sim_profile.instrument(bench()))
     sim.run()
+    sim_profile.report()
 
 if __name__ == '__main__':
     print("Running test...")
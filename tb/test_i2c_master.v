@@ -52,6 +52,11 @@ reg m_axis_data_tready = 0;
 reg scl_i = 1;
 reg sda_i = 1;
 reg [15:0] prescale = 0;
+reg [15:0] prescale_high = 0;
+reg hs_mode = 0;
+reg [2:0] hs_master_code = 0;
+reg [15:0] hs_prescale = 0;
+reg [15:0] hs_prescale_high = 0;
 reg stop_on_idle = 0;
 
 // Outputs
@@ -68,6 +73,16 @@ wire busy;
 wire bus_control;
 wire bus_active;
 wire missed_ack;
+wire hs_active;
+wire hs_pullup;
+
+// waveform dump control
+integer dump_depth = 0;
+reg [31:0] dump_start = 0;
+reg [31:0] dump_stop = 0;
+reg [31:0] dump_test = 0;
+reg dump_window = 0;
+reg dump_on = 1;
 
 initial begin
     // myhdl integration
@@ -89,6 +104,11 @@ initial begin
         scl_i,
         sda_i,
         prescale,
+        prescale_high,
+        hs_mode,
+        hs_master_code,
+        hs_prescale,
+        hs_prescale_high,
         stop_on_idle
     );
     $to_myhdl(
@@ -104,12 +124,46 @@ initial begin
         busy,
         bus_control,
         bus_active,
-        missed_ack
+        missed_ack,
+        hs_active,
+        hs_pullup
     );
 
     // dump file
-    $dumpfile("test_i2c_master.lxt");
-    $dumpvars(0, test_i2c_master);
+    // +nodump disables dumping, +dump_depth=N limits the hierarchy depth
+    if (!$test$plusargs("nodump")) begin
+        if (!$value$plusargs("dump_depth=%d", dump_depth))
+            dump_depth = 0;
+        $dumpfile("test_i2c_master.lxt");
+`ifdef DUMP_SCOPE
+        $dumpvars(dump_depth, `DUMP_SCOPE);
+`else
+        $dumpvars(dump_depth, test_i2c_master);
+`endif
+        // +dump_start=T, +dump_stop=T and +dump_test=N limit dumping to
+        // a time window and/or a current_test value
+        dump_window = $value$plusargs("dump_start=%d", dump_start);
+        dump_window = $value$plusargs("dump_stop=%d", dump_stop) | dump_window;
+        dump_window = $value$plusargs("dump_test=%d", dump_test) | dump_window;
+        if (dump_window) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
+end
+
+always @(posedge clk) begin
+    if (dump_window) begin
+        if ($time >= dump_start && (dump_stop == 0 || $time < dump_stop) && (dump_test == 0 || current_test == dump_test)) begin
+            if (!dump_on) begin
+                $dumpon;
+                dump_on = 1;
+            end
+        end else if (dump_on) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
 end
 
 i2c_master
@@ -142,7 +196,14 @@ UUT (
     .bus_control(bus_control),
     .bus_active(bus_active),
     .missed_ack(missed_ack),
+    .hs_active(hs_active),
+    .hs_pullup(hs_pullup),
     .prescale(prescale),
+    .prescale_high(prescale_high),
+    .hs_mode(hs_mode),
+    .hs_master_code(hs_master_code),
+    .hs_prescale(hs_prescale),
+    .hs_prescale_high(hs_prescale_high),
     .stop_on_idle(stop_on_idle)
 );
 
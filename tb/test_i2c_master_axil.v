@@ -46,14 +46,14 @@ reg clk = 0;
 reg rst = 0;
 reg [7:0] current_test = 0;
 
-reg [3:0] s_axil_awaddr = 0;
+reg [5:0] s_axil_awaddr = 0;
 reg [2:0] s_axil_awprot = 0;
 reg s_axil_awvalid = 0;
 reg [31:0] s_axil_wdata = 0;
 reg [3:0] s_axil_wstrb = 0;
 reg s_axil_wvalid = 0;
 reg s_axil_bready = 0;
-reg [3:0] s_axil_araddr = 0;
+reg [5:0] s_axil_araddr = 0;
 reg [2:0] s_axil_arprot = 0;
 reg s_axil_arvalid = 0;
 reg s_axil_rready = 0;
@@ -73,6 +73,16 @@ wire i2c_scl_o;
 wire i2c_scl_t;
 wire i2c_sda_o;
 wire i2c_sda_t;
+wire i2c_hs_pullup;
+wire irq;
+
+// waveform dump control
+integer dump_depth = 0;
+reg [31:0] dump_start = 0;
+reg [31:0] dump_stop = 0;
+reg [31:0] dump_test = 0;
+reg dump_window = 0;
+reg dump_on = 1;
 
 initial begin
     // myhdl integration
@@ -106,12 +116,46 @@ initial begin
         i2c_scl_o,
         i2c_scl_t,
         i2c_sda_o,
-        i2c_sda_t
+        i2c_sda_t,
+        i2c_hs_pullup,
+        irq
     );
 
     // dump file
-    $dumpfile("test_i2c_master_axil.lxt");
-    $dumpvars(0, test_i2c_master_axil);
+    // +nodump disables dumping, +dump_depth=N limits the hierarchy depth
+    if (!$test$plusargs("nodump")) begin
+        if (!$value$plusargs("dump_depth=%d", dump_depth))
+            dump_depth = 0;
+        $dumpfile("test_i2c_master_axil.lxt");
+`ifdef DUMP_SCOPE
+        $dumpvars(dump_depth, `DUMP_SCOPE);
+`else
+        $dumpvars(dump_depth, test_i2c_master_axil);
+`endif
+        // +dump_start=T, +dump_stop=T and +dump_test=N limit dumping to
+        // a time window and/or a current_test value
+        dump_window = $value$plusargs("dump_start=%d", dump_start);
+        dump_window = $value$plusargs("dump_stop=%d", dump_stop) | dump_window;
+        dump_window = $value$plusargs("dump_test=%d", dump_test) | dump_window;
+        if (dump_window) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
+end
+
+always @(posedge clk) begin
+    if (dump_window) begin
+        if ($time >= dump_start && (dump_stop == 0 || $time < dump_stop) && (dump_test == 0 || current_test == dump_test)) begin
+            if (!dump_on) begin
+                $dumpon;
+                dump_on = 1;
+            end
+        end else if (dump_on) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
 end
 
 i2c_master_axil #(
@@ -151,7 +195,9 @@ UUT (
     .i2c_scl_t(i2c_scl_t),
     .i2c_sda_i(i2c_sda_i),
     .i2c_sda_o(i2c_sda_o),
-    .i2c_sda_t(i2c_sda_t)
+    .i2c_sda_t(i2c_sda_t),
+    .i2c_hs_pullup(i2c_hs_pullup),
+    .irq(irq)
 );
 
 endmodule
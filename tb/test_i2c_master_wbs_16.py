@@ -28,6 +28,12 @@ import os
 
 import i2c
 import wb
+import i2c_master_driver
+import sim_build
+import sim_profile
+import watchdog
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
 
 module = 'i2c_master_wbs_16'
 testbench = 'test_%s' % module
@@ -39,28 +45,32 @@ srcs.append("../rtl/i2c_master.v")
 srcs.append("../rtl/axis_fifo.v")
 srcs.append("%s.v" % testbench)
 
-src = ' '.join(srcs)
+# performance figures collected by the bench, reported by run_tests and sweep
+metrics = {}
 
-build_cmd = "iverilog -o %s.vvp %s" % (testbench, src)
+def bench(**params):
 
-def bench():
+    metrics.clear()
 
     # Parameters
-    DEFAULT_PRESCALE = 1
-    FIXED_PRESCALE = 0
-    CMD_FIFO = 1
-    CMD_FIFO_DEPTH = 32
-    WRITE_FIFO = 1
-    WRITE_FIFO_DEPTH = 32
-    READ_FIFO = 1
-    READ_FIFO_DEPTH = 32
+    DEFAULT_PRESCALE = params.get('DEFAULT_PRESCALE', 1)
+    FIXED_PRESCALE = params.get('FIXED_PRESCALE', 0)
+    CMD_FIFO = params.get('CMD_FIFO', 1)
+    CMD_FIFO_DEPTH = params.get('CMD_FIFO_DEPTH', 32)
+    WRITE_FIFO = params.get('WRITE_FIFO', 1)
+    WRITE_FIFO_DEPTH = params.get('WRITE_FIFO_DEPTH', 32)
+    READ_FIFO = params.get('READ_FIFO', 1)
+    READ_FIFO_DEPTH = params.get('READ_FIFO_DEPTH', 32)
+
+    # bus pull-up and capacitance, not wrapper parameters
+    bus_rc = dict((k, params.pop(k)) for k in ['BUS_R', 'BUS_C'] if k in params)
 
     # Inputs
     clk = Signal(bool(0))
     rst = Signal(bool(0))
     current_test = Signal(intbv(0)[8:])
 
-    wbs_adr_i = Signal(intbv(0)[3:])
+    wbs_adr_i = Signal(intbv(0)[5:])
     wbs_dat_i = Signal(intbv(0)[16:])
     wbs_we_i = Signal(bool(0))
     wbs_sel_i = Signal(intbv(0)[2:])
@@ -82,6 +92,8 @@ def bench():
     i2c_scl_t = Signal(bool(1))
     i2c_sda_o = Signal(bool(1))
     i2c_sda_t = Signal(bool(1))
+    i2c_hs_pullup = Signal(bool(0))
+    irq = Signal(bool(0))
 
     s1_scl_o = Signal(bool(1))
     s1_scl_t = Signal(bool(1))
@@ -109,6 +121,24 @@ def bench():
         name='master'
     )
 
+    # I2C master driver
+    drv_inst = i2c_master_driver.I2CMasterWBS16Driver(
+        wbm_inst,
+        cmd_fifo_depth=CMD_FIFO_DEPTH,
+        write_fifo_depth=WRITE_FIFO_DEPTH,
+        read_fifo_depth=READ_FIFO_DEPTH,
+        prescale=DEFAULT_PRESCALE
+    )
+
+    drv_irq_inst = i2c_master_driver.I2CMasterWBS16Driver(
+        wbm_inst,
+        cmd_fifo_depth=CMD_FIFO_DEPTH,
+        write_fifo_depth=WRITE_FIFO_DEPTH,
+        read_fifo_depth=READ_FIFO_DEPTH,
+        prescale=DEFAULT_PRESCALE,
+        irq=irq
+    )
+
     # I2C memory model 1
     i2c_mem_inst1 = i2c.I2CMem(1024)
 
@@ -142,11 +172,11 @@ def bench():
     )
 
     # DUT
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-
-    dut = Cosimulation(
-        "vvp -m myhdl %s.vvp -lxt2" % testbench,
+    dut = sim_build.cosimulation(
+        testbench,
+        srcs,
+        parameters=params,
+        src_dir=tb_dir,
         clk=clk,
         rst=rst,
         current_test=current_test,
@@ -163,25 +193,80 @@ def bench():
         i2c_scl_t=i2c_scl_t,
         i2c_sda_i=i2c_sda_i,
         i2c_sda_o=i2c_sda_o,
-        i2c_sda_t=i2c_sda_t
-    )
-
-    @always_comb
-    def bus():
-        # emulate I2C wired AND
-        i2c_scl_i.next = i2c_scl_o & s1_scl_o & s2_scl_o;
-        i2c_sda_i.next = i2c_sda_o & s1_sda_o & s2_sda_o;
+        i2c_sda_t=i2c_sda_t,
+        i2c_hs_pullup=i2c_hs_pullup,
 
-        s1_scl_i.next = i2c_scl_o & s1_scl_o & s2_scl_o;
-        s1_sda_i.next = i2c_sda_o & s1_sda_o & s2_sda_o;
+        irq=irq
+    )
 
-        s2_scl_i.next = i2c_scl_o & s1_scl_o & s2_scl_o;
-        s2_sda_i.next = i2c_sda_o & s1_sda_o & s2_sda_o;
+    # I2C wired AND, with rise time from BUS_R (ohms) and BUS_C (pF)
+    i2c_bus_inst = i2c.I2CBus()
+
+    bus = i2c_bus_inst.create_logic(
+        drivers=[
+            (i2c_scl_o, i2c_sda_o),
+            (s1_scl_o, s1_sda_o),
+            (s2_scl_o, s2_sda_o)
+        ],
+        endpoints={
+            'master': (i2c_scl_i, i2c_sda_i),
+            'slave1': (s1_scl_i, s1_sda_i),
+            'slave2': (s2_scl_i, s2_sda_i)
+        },
+        r_pullup=bus_rc.get('BUS_R'),
+        c_bus=bus_rc.get('BUS_C'),
+        scl_pullup=i2c_hs_pullup
+    )
 
     @always(delay(4))
     def clkgen():
         clk.next = not clk
 
+    # I2C bus monitor, statistics only
+    i2c_monitor_inst = i2c.I2CMonitor()
+    i2c_monitor_inst.record = False
+
+    i2c_monitor_logic = i2c_monitor_inst.create_logic(
+        scl_i=i2c_scl_i,
+        sda_i=i2c_sda_i,
+        drivers={
+            'master': (i2c_scl_o, i2c_sda_o),
+            'slave1': (s1_scl_o, s1_sda_o),
+            'slave2': (s2_scl_o, s2_sda_o)
+        }
+    )
+
+    # I2C timing checker
+    i2c_timing_inst = i2c.I2CTimingChecker()
+
+    i2c_timing_logic = i2c_timing_inst.create_logic(
+        decoder=i2c_monitor_inst.decoder
+    )
+
+    # watchdog
+    wd = watchdog.Watchdog()
+
+    wd_logic = wd.create_logic(
+        current_test=current_test,
+        models={
+            'wbm': wbm_inst,
+            'drv': drv_inst,
+            'drv_irq': drv_irq_inst,
+            'i2c_mem1': i2c_mem_inst1,
+            'i2c_mem2': i2c_mem_inst2
+        },
+        i2c={'i2c': i2c_monitor_inst}
+    )
+
+    # irq rising edges, to time the DUT's reaction to a fault
+    irq_rise = []
+
+    @instance
+    def irq_monitor():
+        while True:
+            yield irq.posedge
+            irq_rise.append(now())
+
     @instance
     def check():
         yield delay(100)
@@ -369,13 +454,147 @@ def bench():
 
         yield delay(100)
 
+        yield clk.posedge
+        print("test 6: driver write and read")
+        current_test.next = 6
+
+        drv_inst.reset_stats()
+        i2c_timing_inst.reset()
+        i2c_monitor_inst.reset_stats()
+
+        t = now()
+
+        yield drv_inst.write(0x50, b'\x00\x08'+bytearray(range(64)))
+        yield drv_inst.wait_idle()
+
+        metrics['write_time'] = now() - t
+
+        data = i2c_mem_inst1.read_mem(0, 80)
+        for i in range(0, len(data), 16):
+            print(" ".join(("{:02x}".format(c) for c in bytearray(data[i:i+16]))))
+
+        assert i2c_mem_inst1.read_mem(8, 64) == bytearray(range(64))
+
+        t = now()
+
+        yield drv_inst.write_then_read(0x50, b'\x00\x08', 64)
+
+        metrics['read_time'] = now() - t
+
+        data = drv_inst.get_read_data()
+        assert data[0] == 0x50
+        assert data[1] == bytes(bytearray(range(64)))
+
+        print("bus read cycles: %d, bus write cycles: %d, status polls: %d" % (drv_inst.bus_read_cycles, drv_inst.bus_write_cycles, drv_inst.status_polls))
+
+        # 64 byte transfers, 1 ns time unit
+        metrics['write_kbps'] = 64*8*1e6 / metrics['write_time']
+        metrics['read_kbps'] = 64*8*1e6 / metrics['read_time']
+        metrics['bus_cycles'] = drv_inst.bus_read_cycles + drv_inst.bus_write_cycles
+        metrics['status_polls'] = drv_inst.status_polls
+
+        metrics['rise_time'] = i2c_bus_inst.rise_time()
+
+        # minimum margin to the fast mode timing limits, ns
+        for p, m in i2c_timing_inst.margins('fast').items():
+            metrics['margin_' + p] = m
+
+        # bus utilization of the driver transfers
+        st = i2c_monitor_inst.stats()
+        metrics['bus_busy'] = st['busy_fraction']
+        metrics['goodput_kbps'] = st['goodput_kbps']
+        metrics['goodput_ratio'] = st['goodput_ratio']
+        metrics['byte_gap_overhead'] = st['byte_gap_overhead']
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 7: driver interrupt mode")
+        current_test.next = 7
+
+        drv_irq_inst.reset_stats()
+
+        yield drv_irq_inst.write(0x50, b'\x00\x08'+bytearray(range(64, 128)))
+        yield drv_irq_inst.wait_idle()
+
+        assert i2c_mem_inst1.read_mem(8, 64) == bytearray(range(64, 128))
+
+        yield drv_irq_inst.write_then_read(0x50, b'\x00\x08', 64)
+
+        data = drv_irq_inst.get_read_data()
+        assert data[0] == 0x50
+        assert data[1] == bytes(bytearray(range(64, 128)))
+
+        yield drv_irq_inst.wait_idle()
+
+        print("polling: bus read cycles: %d, bus write cycles: %d, status polls: %d" % (drv_inst.bus_read_cycles, drv_inst.bus_write_cycles, drv_inst.status_polls))
+        print("interrupt: bus read cycles: %d, bus write cycles: %d, status polls: %d, irq waits: %d" % (drv_irq_inst.bus_read_cycles, drv_irq_inst.bus_write_cycles, drv_irq_inst.status_polls, drv_irq_inst.irq_waits))
+
+        assert drv_irq_inst.status_polls < drv_inst.status_polls
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 8: fault detection and recovery")
+        current_test.next = 8
+
+        i2c_mem_inst1.write_mem(8, bytearray(16))
+
+        yield drv_inst.clear_missed_ack()
+
+        # the missed ACK interrupt marks when the DUT saw the NACK
+        yield drv_irq_inst.enable_irq(i2c_master_driver.IRQ_MISS_ACK)
+        yield drv_irq_inst.clear_irq(i2c_master_driver.IRQ_MISS_ACK)
+        yield clk.posedge
+        yield clk.posedge
+        assert not irq
+        del irq_rise[:]
+
+        # slave 1 NACKs the fourth data byte of the next transaction (after
+        # the address and two pointer bytes) and ignores the rest
+        i2c_mem_inst1.add_fault('nack', transaction=i2c_mem_inst1.transaction_count, byte=1+2+3)
+
+        yield drv_inst.write(0x50, b'\x00\x08'+bytearray(range(16)))
+        yield drv_inst.wait_idle()
+
+        t_fault = i2c_mem_inst1.fault_log[-1][0]
+
+        v = []
+        yield drv_inst.read_field('miss_ack', v)
+        assert v[0]
+
+        assert irq_rise
+        metrics['nack_detect_time'] = irq_rise[0] - t_fault
+
+        assert i2c_mem_inst1.read_mem(8, 16) == bytearray(range(3)) + bytearray(13)
+
+        # retry
+        yield drv_inst.clear_missed_ack()
+        yield drv_inst.write(0x50, b'\x00\x08'+bytearray(range(16)))
+        yield drv_inst.wait_idle()
+
+        metrics['nack_recovery_time'] = now() - t_fault
+
+        v = []
+        yield drv_inst.read_field('miss_ack', v)
+        assert not v[0]
+
+        assert i2c_mem_inst1.read_mem(8, 16) == bytearray(range(16))
+
+        print("NACK detected after %d, recovered after %d" % (metrics['nack_detect_time'], metrics['nack_recovery_time']))
+
+        yield delay(100)
+
+        i2c_monitor_inst.report()
+
         raise StopSimulation
 
     return instances()
 
-def test_bench():
-    sim = Simulation(bench())
+def test_bench(**params):
+    sim = Simulation(sim_profile.instrument(bench(**params)))
     sim.run()
+    sim_profile.report()
 
 if __name__ == '__main__':
     print("Running test...")
@@ -46,7 +46,7 @@ reg clk = 0;
 reg rst = 0;
 reg [7:0] current_test = 0;
 
-reg [2:0] wbs_adr_i = 0;
+reg [4:0] wbs_adr_i = 0;
 reg [7:0] wbs_dat_i = 0;
 reg wbs_we_i = 0;
 reg wbs_stb_i = 0;
@@ -61,6 +61,16 @@ wire i2c_scl_o;
 wire i2c_scl_t;
 wire i2c_sda_o;
 wire i2c_sda_t;
+wire i2c_hs_pullup;
+wire irq;
+
+// waveform dump control
+integer dump_depth = 0;
+reg [31:0] dump_start = 0;
+reg [31:0] dump_stop = 0;
+reg [31:0] dump_test = 0;
+reg dump_window = 0;
+reg dump_on = 1;
 
 initial begin
     // myhdl integration
@@ -82,12 +92,46 @@ initial begin
         i2c_scl_o,
         i2c_scl_t,
         i2c_sda_o,
-        i2c_sda_t
+        i2c_sda_t,
+        i2c_hs_pullup,
+        irq
     );
 
     // dump file
-    $dumpfile("test_i2c_master_wbs_8.lxt");
-    $dumpvars(0, test_i2c_master_wbs_8);
+    // +nodump disables dumping, +dump_depth=N limits the hierarchy depth
+    if (!$test$plusargs("nodump")) begin
+        if (!$value$plusargs("dump_depth=%d", dump_depth))
+            dump_depth = 0;
+        $dumpfile("test_i2c_master_wbs_8.lxt");
+`ifdef DUMP_SCOPE
+        $dumpvars(dump_depth, `DUMP_SCOPE);
+`else
+        $dumpvars(dump_depth, test_i2c_master_wbs_8);
+`endif
+        // +dump_start=T, +dump_stop=T and +dump_test=N limit dumping to
+        // a time window and/or a current_test value
+        dump_window = $value$plusargs("dump_start=%d", dump_start);
+        dump_window = $value$plusargs("dump_stop=%d", dump_stop) | dump_window;
+        dump_window = $value$plusargs("dump_test=%d", dump_test) | dump_window;
+        if (dump_window) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
+end
+
+always @(posedge clk) begin
+    if (dump_window) begin
+        if ($time >= dump_start && (dump_stop == 0 || $time < dump_stop) && (dump_test == 0 || current_test == dump_test)) begin
+            if (!dump_on) begin
+                $dumpon;
+                dump_on = 1;
+            end
+        end else if (dump_on) begin
+            $dumpoff;
+            dump_on = 0;
+        end
+    end
 end
 
 i2c_master_wbs_8 #(
@@ -115,7 +159,9 @@ UUT (
     .i2c_scl_t(i2c_scl_t),
     .i2c_sda_i(i2c_sda_i),
     .i2c_sda_o(i2c_sda_o),
-    .i2c_sda_t(i2c_sda_t)
+    .i2c_sda_t(i2c_sda_t),
+    .i2c_hs_pullup(i2c_hs_pullup),
+    .irq(irq)
 );
 
 endmodule
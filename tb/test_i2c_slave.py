@@ -28,6 +28,11 @@ import os
 
 import axis_ep
 import i2c
+import sim_build
+import sim_profile
+import watchdog
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
 
 module = 'i2c_slave'
 testbench = 'test_%s' % module
@@ -37,14 +42,18 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("%s.v" % testbench)
 
-src = ' '.join(srcs)
+# performance figures collected by the bench, reported by run_tests and sweep
+metrics = {}
 
-build_cmd = "iverilog -o %s.vvp %s" % (testbench, src)
+def bench(**params):
 
-def bench():
+    metrics.clear()
 
     # Parameters
-    FILTER_LEN = 1
+    FILTER_LEN = params.get('FILTER_LEN', 1)
+
+    # bus noise at the DUT inputs, NOISE_* are not wrapper parameters
+    noise = dict((k, params.pop(k)) for k in list(params) if k.startswith('NOISE_'))
 
     # Inputs
     clk = Signal(bool(0))
@@ -65,6 +74,9 @@ def bench():
     m_scl_i = Signal(bool(1))
     m_sda_i = Signal(bool(1))
 
+    bus_scl = Signal(bool(1))
+    bus_sda = Signal(bool(1))
+
     s2_scl_i = Signal(bool(1))
     s2_sda_i = Signal(bool(1))
 
@@ -155,11 +167,11 @@ def bench():
     )
 
     # DUT
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-
-    dut = Cosimulation(
-        "vvp -m myhdl %s.vvp -lxt2" % testbench,
+    dut = sim_build.cosimulation(
+        testbench,
+        srcs,
+        parameters=params,
+        src_dir=tb_dir,
         clk=clk,
         rst=rst,
         current_test=current_test,
@@ -193,8 +205,8 @@ def bench():
         m_scl_i.next = m_scl_o & scl_o & s2_scl_o;
         m_sda_i.next = m_sda_o & sda_o & s2_sda_o;
 
-        scl_i.next = m_scl_o & scl_o & s2_scl_o;
-        sda_i.next = m_sda_o & sda_o & s2_sda_o;
+        bus_scl.next = m_scl_o & scl_o & s2_scl_o;
+        bus_sda.next = m_sda_o & sda_o & s2_sda_o;
 
         s2_scl_i.next = m_scl_o & scl_o & s2_scl_o;
         s2_sda_i.next = m_sda_o & sda_o & s2_sda_o;
@@ -203,6 +215,50 @@ def bench():
     def clkgen():
         clk.next = not clk
 
+    # glitch injector between the bus and the DUT inputs
+    i2c_glitch_inst = i2c.I2CGlitchInjector()
+
+    i2c_glitch_logic = i2c_glitch_inst.create_logic(
+        scl_i=bus_scl,
+        sda_i=bus_sda,
+        scl_o=scl_i,
+        sda_o=sda_i,
+        seed=noise.get('NOISE_SEED', 1),
+        spike_interval=noise.get('NOISE_SPIKE_INTERVAL', 0),
+        spike_width=(1, noise.get('NOISE_SPIKE_WIDTH', 1)),
+        ring_count=noise.get('NOISE_RING_COUNT', 0),
+        ring_width=noise.get('NOISE_RING_WIDTH', 1)
+    )
+
+    # I2C bus monitor, statistics only
+    i2c_monitor_inst = i2c.I2CMonitor()
+    i2c_monitor_inst.record = False
+
+    i2c_monitor_logic = i2c_monitor_inst.create_logic(
+        scl_i=bus_scl,
+        sda_i=bus_sda,
+        drivers={
+            'master': (m_scl_o, m_sda_o),
+            'slave': (scl_o, sda_o),
+            'slave2': (s2_scl_o, s2_sda_o)
+        }
+    )
+
+    # watchdog
+    wd = watchdog.Watchdog()
+
+    wd_logic = wd.create_logic(
+        current_test=current_test,
+        models={
+            'data_source': data_source,
+            'data_sink': data_sink,
+            'i2c_master': i2c_master_inst,
+            'i2c_mem2': i2c_mem_inst2
+        },
+        i2c={'i2c': i2c_monitor_inst},
+        signals={'busy': busy, 'bus_active': bus_active}
+    )
+
     @instance
     def check():
         yield delay(100)
@@ -224,6 +280,9 @@ def bench():
         print("test 1: write")
         current_test.next = 1
 
+        i2c_monitor_inst.reset_stats()
+        t = now()
+
         i2c_master_inst.init_write(0x50, b'\x00\x04'+b'\x11\x22\x33\x44')
 
         yield i2c_master_inst.wait()
@@ -234,6 +293,8 @@ def bench():
             yield clk.posedge
             data = data_sink.recv()
 
+        metrics['write_time'] = now() - t
+
         assert data.data == b'\x00\x04'+b'\x11\x22\x33\x44'
 
         yield delay(100)
@@ -242,6 +303,8 @@ def bench():
         print("test 2: read")
         current_test.next = 2
 
+        t = now()
+
         i2c_master_inst.init_write(0x50, b'\x00\x04')
         i2c_master_inst.init_read(0x50, 4)
 
@@ -250,6 +313,8 @@ def bench():
         yield i2c_master_inst.wait()
         yield clk.posedge
 
+        metrics['read_time'] = now() - t
+
         data = None
         while not data:
             yield clk.posedge
@@ -267,6 +332,8 @@ def bench():
         print("test 3: read with delays")
         current_test.next = 3
 
+        t = now()
+
         i2c_master_inst.init_write(0x50, b'\x00\x04')
         i2c_master_inst.init_read(0x50, 4)
 
@@ -284,6 +351,17 @@ def bench():
         yield i2c_master_inst.wait()
         yield clk.posedge
 
+        metrics['stalled_read_time'] = now() - t
+        metrics['write_kbps'] = 6*8*1e6 / metrics['write_time']
+        metrics['read_kbps'] = 4*8*1e6 / metrics['read_time']
+
+        # bus statistics over tests 1 to 3, stretch is the DUT holding SCL
+        st = i2c_monitor_inst.stats()
+        metrics['bus_busy'] = st['busy_fraction']
+        metrics['goodput_kbps'] = st['goodput_kbps']
+        metrics['goodput_ratio'] = st['goodput_ratio']
+        metrics['slave_stretch'] = st['stretch'].get('slave', 0)
+
         data = None
         while not data:
             yield clk.posedge
@@ -324,13 +402,19 @@ def bench():
 
         yield delay(100)
 
+        i2c_monitor_inst.report()
+
+        if noise:
+            print("noise at DUT inputs: %d spikes, %d ringing edges" % (i2c_glitch_inst.spikes, i2c_glitch_inst.rings))
+
         raise StopSimulation
 
     return instances()
 
-def test_bench():
-    sim = Simulation(bench())
+def test_bench(**params):
+    sim = Simulation(sim_profile.instrument(bench(**params)))
     sim.run()
+    sim_profile.report()
 
 if __name__ == '__main__':
     print("Running test...")
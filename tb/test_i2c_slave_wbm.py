@@ -29,6 +29,11 @@ import struct
 
 import i2c
 import wb
+import sim_build
+import sim_profile
+import watchdog
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
 
 module = 'i2c_slave_wbm'
 testbench = 'test_%s' % module
@@ -39,18 +44,22 @@ srcs.append("../rtl/%s.v" % module)
 srcs.append("../rtl/i2c_slave.v")
 srcs.append("%s.v" % testbench)
 
-src = ' '.join(srcs)
+# performance figures collected by the bench, reported by run_tests and sweep
+metrics = {}
 
-build_cmd = "iverilog -o %s.vvp %s" % (testbench, src)
+def bench(**params):
 
-def bench():
+    metrics.clear()
 
     # Parameters
-    FILTER_LEN = 4
-    WB_DATA_WIDTH = 32
-    WB_ADDR_WIDTH = 16
+    FILTER_LEN = params.get('FILTER_LEN', 4)
+    WB_DATA_WIDTH = params.get('WB_DATA_WIDTH', 32)
+    WB_ADDR_WIDTH = params.get('WB_ADDR_WIDTH', 16)
     WB_SELECT_WIDTH = WB_DATA_WIDTH/8
 
+    # bus noise at the DUT inputs, NOISE_* are not wrapper parameters
+    noise = dict((k, params.pop(k)) for k in list(params) if k.startswith('NOISE_'))
+
     # Inputs
     clk = Signal(bool(0))
     rst = Signal(bool(0))
@@ -67,6 +76,9 @@ def bench():
     m_scl_i = Signal(bool(1))
     m_sda_i = Signal(bool(1))
 
+    bus_scl = Signal(bool(1))
+    bus_sda = Signal(bool(1))
+
     s2_scl_i = Signal(bool(1))
     s2_sda_i = Signal(bool(1))
 
@@ -146,11 +158,11 @@ def bench():
     )
 
     # DUT
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-
-    dut = Cosimulation(
-        "vvp -m myhdl %s.vvp -lxt2" % testbench,
+    dut = sim_build.cosimulation(
+        testbench,
+        srcs,
+        parameters=params,
+        src_dir=tb_dir,
         clk=clk,
         rst=rst,
         current_test=current_test,
@@ -185,8 +197,8 @@ def bench():
         m_scl_i.next = scl;
         m_sda_i.next = sda;
 
-        i2c_scl_i.next = scl
-        i2c_sda_i.next = sda
+        bus_scl.next = scl
+        bus_sda.next = sda
 
         s2_scl_i.next = scl
         s2_sda_i.next = sda
@@ -195,6 +207,49 @@ def bench():
     def clkgen():
         clk.next = not clk
 
+    # glitch injector between the bus and the DUT inputs
+    i2c_glitch_inst = i2c.I2CGlitchInjector()
+
+    i2c_glitch_logic = i2c_glitch_inst.create_logic(
+        scl_i=bus_scl,
+        sda_i=bus_sda,
+        scl_o=i2c_scl_i,
+        sda_o=i2c_sda_i,
+        seed=noise.get('NOISE_SEED', 1),
+        spike_interval=noise.get('NOISE_SPIKE_INTERVAL', 0),
+        spike_width=(1, noise.get('NOISE_SPIKE_WIDTH', 1)),
+        ring_count=noise.get('NOISE_RING_COUNT', 0),
+        ring_width=noise.get('NOISE_RING_WIDTH', 1)
+    )
+
+    # I2C bus monitor, statistics only
+    i2c_monitor_inst = i2c.I2CMonitor()
+    i2c_monitor_inst.record = False
+
+    i2c_monitor_logic = i2c_monitor_inst.create_logic(
+        scl_i=bus_scl,
+        sda_i=bus_sda,
+        drivers={
+            'master': (m_scl_o, m_sda_o),
+            'slave': (i2c_scl_o, i2c_sda_o),
+            'slave2': (s2_scl_o, s2_sda_o)
+        }
+    )
+
+    # watchdog
+    wd = watchdog.Watchdog()
+
+    wd_logic = wd.create_logic(
+        current_test=current_test,
+        models={
+            'i2c_master': i2c_master_inst,
+            'i2c_mem2': i2c_mem_inst2,
+            'wb_ram': wb_ram_inst
+        },
+        i2c={'i2c': i2c_monitor_inst},
+        signals={'busy': busy, 'bus_active': bus_active}
+    )
+
     @instance
     def check():
         yield delay(100)
@@ -251,8 +306,13 @@ def bench():
         print("test 3: various writes")
         current_test.next = 3
 
+        i2c_monitor_inst.reset_stats()
+        t = now()
+        write_bytes = 0
+
         for length in range(1,9):
             for offset in range(4):
+                write_bytes += length
                 i2c_master_inst.init_write(0x50, bytearray(struct.pack('>H', 256*(16*offset+length)+offset)+b'\x11\x22\x33\x44\x55\x66\x77\x88'[0:length]))
 
                 yield i2c_master_inst.wait()
@@ -267,14 +327,20 @@ def bench():
 
                 assert wb_ram_inst.read_mem(256*(16*offset+length)+offset,length) == b'\x11\x22\x33\x44\x55\x66\x77\x88'[0:length]
 
+        metrics['write_time'] = now() - t
+
         yield delay(100)
 
         yield clk.posedge
         print("test 4: various reads")
         current_test.next = 4
 
+        t = now()
+        read_bytes = 0
+
         for length in range(1,9):
             for offset in range(4):
+                read_bytes += length
                 i2c_master_inst.init_write(0x50, bytearray(struct.pack('>H', 256*(16*offset+length)+offset)))
                 i2c_master_inst.init_read(0x50, length)
 
@@ -285,6 +351,17 @@ def bench():
                 assert data[0] == 0x50
                 assert data[1] == b'\x11\x22\x33\x44\x55\x66\x77\x88'[0:length]
 
+        metrics['read_time'] = now() - t
+        metrics['write_kbps'] = write_bytes*8*1e6 / metrics['write_time']
+        metrics['read_kbps'] = read_bytes*8*1e6 / metrics['read_time']
+
+        # bus statistics over both tests, stretch is the DUT holding SCL
+        st = i2c_monitor_inst.stats()
+        metrics['bus_busy'] = st['busy_fraction']
+        metrics['goodput_kbps'] = st['goodput_kbps']
+        metrics['goodput_ratio'] = st['goodput_ratio']
+        metrics['slave_stretch'] = st['stretch'].get('slave', 0)
+
         yield delay(100)
 
         # TODO various reads and writes
@@ -350,13 +427,19 @@ def bench():
 
         yield delay(100)
 
+        i2c_monitor_inst.report()
+
+        if noise:
+            print("noise at DUT inputs: %d spikes, %d ringing edges" % (i2c_glitch_inst.spikes, i2c_glitch_inst.rings))
+
         raise StopSimulation
 
     return instances()
 
-def test_bench():
-    sim = Simulation(bench())
+def test_bench(**params):
+    sim = Simulation(sim_profile.instrument(bench(**params)))
     sim.run()
+    sim_profile.report()
 
 if __name__ == '__main__':
     print("Running test...")
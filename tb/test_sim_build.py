@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+import tempfile
+import time
+
+import sim_build
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+def test_build_hash_includes():
+    with tempfile.TemporaryDirectory() as d:
+        os.mkdir(os.path.join(d, 'inc'))
+        os.mkdir(os.path.join(d, 'src'))
+        write(os.path.join(d, 'src', 'top.v'), '`include "a.vh"\nmodule top; endmodule\n')
+        write(os.path.join(d, 'inc', 'a.vh'), '`include "b.vh"\n')
+        write(os.path.join(d, 'inc', 'b.vh'), '`define B 1\n')
+
+        srcs = ['src/top.v']
+        args = sim_build.build_args('top.vvp', srcs, flags=['-Iinc'])
+
+        h = sim_build.build_hash(srcs, args, d)
+        assert sim_build.build_hash(srcs, args, d) == h
+
+        # nested include change
+        write(os.path.join(d, 'inc', 'b.vh'), '`define B 2\n')
+        h2 = sim_build.build_hash(srcs, args, d)
+        assert h2 != h
+
+        # the including file's directory is not searched by default
+        write(os.path.join(d, 'src', 'a.vh'), '\n')
+        assert sim_build.build_hash(srcs, args, d) == h2
+
+        # but is first with -grelative-include
+        args = sim_build.build_args('top.vvp', srcs, flags=['-grelative-include', '-Iinc'])
+        h3 = sim_build.build_hash(srcs, args, d)
+        write(os.path.join(d, 'inc', 'b.vh'), '`define B 3\n')
+        assert sim_build.build_hash(srcs, args, d) == h3
+        write(os.path.join(d, 'src', 'a.vh'), '`define A 1\n')
+        assert sim_build.build_hash(srcs, args, d) != h3
+
+        # the working directory comes before -I
+        args = sim_build.build_args('top.vvp', srcs, flags=['-Iinc'])
+        h4 = sim_build.build_hash(srcs, args, d)
+        write(os.path.join(d, 'a.vh'), '\n')
+        h5 = sim_build.build_hash(srcs, args, d)
+        assert h5 != h4
+        write(os.path.join(d, 'inc', 'b.vh'), '`define B 4\n')
+        assert sim_build.build_hash(srcs, args, d) == h5
+
+def test_prune():
+    with tempfile.TemporaryDirectory() as d:
+        now = time.time()
+        for k in range(5):
+            write(os.path.join(d, '%d.vvp' % k), '')
+            os.utime(os.path.join(d, '%d.vvp' % k), (now-100+k, now-100+k))
+        # build in progress
+        write(os.path.join(d, 'tmpabc.vvp'), '')
+        os.utime(os.path.join(d, 'tmpabc.vvp'), (now-200, now-200))
+
+        # recently used entry survives
+        os.utime(os.path.join(d, '0.vvp'))
+
+        assert sim_build.prune(d, 3) == 2
+        assert sorted(os.listdir(d)) == ['0.vvp', '3.vvp', '4.vvp', 'tmpabc.vvp']
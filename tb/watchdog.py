@@ -0,0 +1,229 @@
+"""
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Per-test watchdog
+#
+# Wait loops such as "while busy: yield clk.posedge" spin forever when the
+# DUT hangs.  The watchdog aborts the simulation with WatchdogTimeout when a
+# test (one value of current_test) runs for more than a number of simulated
+# clock cycles or wall clock seconds.  Before aborting it prints the state of
+# the models it was given (every list attribute ending in "queue", plus busy
+# flags) and the last bus events: the events of the bench's I2CMonitor
+# instances, and value changes for other signals.
+#
+# The cycle limit is checked when it expires.  The wall clock limit is
+# checked CHECK_INTERVAL cycles after the last bus event, then at doubling
+# intervals while the bus stays quiet, so long idle stretches cost a few
+# wakeups and do not cut FastForward skips short.
+#
+# Limits default to SIM_WATCHDOG_CYCLES and SIM_WATCHDOG_SECONDS from the
+# environment; 0 disables a limit.
+
+import collections
+import os
+import time
+
+from myhdl import *
+
+DEFAULT_CYCLES = 1000000
+DEFAULT_SECONDS = 600
+
+# first wall clock check after bus activity, in clock cycles
+CHECK_INTERVAL = 1024
+
+
+class WatchdogTimeout(Exception):
+    pass
+
+
+def _env_limit(var, default):
+    v = os.environ.get(var)
+    if v is None or v == '':
+        return default
+    v = float(v)
+    return v if v > 0 else None
+
+
+def default_cycles():
+    v = _env_limit('SIM_WATCHDOG_CYCLES', DEFAULT_CYCLES)
+    return int(v) if v is not None else None
+
+
+def default_seconds():
+    return _env_limit('SIM_WATCHDOG_SECONDS', DEFAULT_SECONDS)
+
+
+class Watchdog(object):
+    def __init__(self):
+        self.has_logic = False
+        self.events = None
+        self.models = {}
+        self.test_start = 0
+        self.wall_start = 0.0
+        self.last_activity = 0
+        self.formatters = {}
+
+    def dump_state(self):
+        """Return model state and recent bus events as a list of lines"""
+        lines = []
+
+        lines.append("models:")
+        for name in sorted(self.models):
+            m = self.models[name]
+            lines.append("  %s (%s)" % (name, type(m).__name__))
+            if hasattr(m, 'busy'):
+                lines.append("    busy: %s" % m.busy)
+            for attr in sorted(vars(m)):
+                v = getattr(m, attr)
+                if attr.endswith('queue') and isinstance(v, list):
+                    lines.append("    %s: %d entries" % (attr, len(v)))
+                    for e in v[:4]:
+                        s = repr(e)
+                        lines.append("      %s" % (s if len(s) <= 100 else s[:97]+'...'))
+                    if len(v) > 4:
+                        lines.append("      ...")
+
+        lines.append("last %d bus events:" % len(self.events))
+        for t, src, v in self.events:
+            lines.append("  %12d  %-16s %s" % (t, src, self.formatters[src](v)))
+
+        return lines
+
+    def create_logic(self,
+                current_test=None,
+                models=None,
+                i2c=None,
+                signals=None,
+                cycles=None,
+                seconds=None,
+                period=8,
+                history=32,
+                name=None
+            ):
+
+        # current_test: limits apply per value of this signal
+        # models: dict of name to model object to dump on timeout
+        # i2c: dict of name to I2CMonitor of each I2C bus, its events are
+        #   kept in the history
+        # signals: dict of name to signal, value changes are logged
+        # cycles, seconds: limits, None for the environment defaults
+        # period: clock period, to convert cycles to simulation time
+        # history: number of bus events kept
+
+        if self.has_logic:
+            raise Exception("Logic already instantiated!")
+
+        self.has_logic = True
+
+        if cycles is None:
+            cycles = default_cycles()
+        if seconds is None:
+            seconds = default_seconds()
+
+        self.models = dict(models or {})
+        self.events = collections.deque(maxlen=history)
+
+        events = self.events
+
+        def i2c_listener(bus, monitor):
+            self.formatters[bus] = monitor.describe_event
+
+            def listen(ev):
+                events.append((ev[0], bus, ev))
+                self.last_activity = ev[0]
+
+            monitor.listeners.append(listen)
+
+        def signal_logger(sig_name, sig):
+            self.formatters[sig_name] = lambda v: "%x" % v
+
+            @instance
+            def log():
+                while True:
+                    yield sig
+                    events.append((now(), sig_name, int(sig)))
+                    self.last_activity = now()
+
+            return log
+
+        for k, v in sorted((i2c or {}).items()):
+            i2c_listener(k, v)
+
+        loggers = [signal_logger(k, v) for k, v in sorted((signals or {}).items())]
+
+        @instance
+        def check():
+            test = None
+            self.test_start = now()
+            self.wall_start = time.time()
+            interval = CHECK_INTERVAL*period
+
+            if cycles is None and seconds is None:
+                return
+
+            while True:
+                if seconds is not None:
+                    # doubling intervals from the last activity
+                    wait = interval
+                    while self.last_activity + wait <= now():
+                        wait *= 2
+                    t_next = self.last_activity + wait
+                else:
+                    t_next = None
+                if cycles is not None:
+                    t_limit = self.test_start + cycles*period + 1
+                    t_next = t_limit if t_next is None else min(t_next, t_limit)
+
+                if current_test is not None:
+                    yield current_test, delay(t_next - now())
+                else:
+                    yield delay(t_next - now())
+
+                if current_test is not None and int(current_test) != test:
+                    # new test, restart both limits
+                    test = int(current_test)
+                    self.test_start = now()
+                    self.wall_start = time.time()
+                    continue
+
+                reason = None
+
+                if cycles is not None and now() - self.test_start > cycles*period:
+                    reason = "%d cycles" % cycles
+                elif seconds is not None and time.time() - self.wall_start > seconds:
+                    reason = "%g seconds" % seconds
+
+                if reason is None:
+                    continue
+
+                msg = "Watchdog timeout after %s in test %s at time %d" % (reason, test, now())
+
+                print("")
+                print("[%s] %s" % (name or 'watchdog', msg))
+                for line in self.dump_state():
+                    print(line)
+
+                raise WatchdogTimeout(msg)
+
+        return instances()